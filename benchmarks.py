@@ -0,0 +1,605 @@
+"""Assignment 1 - Benchmarks
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains timing benchmarks for the data structures used by the
+simulation. Each benchmark returns its measurements so that they can be
+inspected or compared, and running this module prints them as a table.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, \
+    Sequence
+from concurrent.futures import ProcessPoolExecutor
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:
+    resource = None
+from container import Container, PriorityQueue, SortedListPriorityQueue
+from event import create_event_list, event_key, iter_events, \
+    sorted_events, CheckoutCompleted, CheckoutStarted, CloseLine, \
+    CustomerArrival, Event
+from event_trace import compile_events, EventTrace
+from simulation import timestamp_queue, GroceryStoreSimulation
+from store import Customer, GroceryStore, Item, RegularLine
+from workload import STAGGERED_CLOSURES, WorkloadModel
+
+# The line capacities benchmarked by default
+LINE_CAPACITIES = (10, 100, 1000, 10000)
+
+# The numbers of customers simulated by default. WorkloadModel can write
+# files of 10000000 customers as well, but simulating them takes a while.
+SIMULATION_SIZES = (1000, 10000, 100000, 1000000)
+
+# The store simulated by benchmark_simulation, as in config_642_05.json
+SIMULATION_CONFIG = json.dumps({'regular_count': 6, 'express_count': 4,
+                                'self_serve_count': 2, 'line_capacity': 5})
+
+# The file benchmark baselines are recorded in by default. Timings depend on
+# the machine, so it is recorded the first time this module is run on one,
+# and is not kept in version control.
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# How much slower, or larger, than its baseline a benchmark may be before it
+# is reported as a regression, by default
+TOLERANCE = 0.2
+
+
+def _fill_and_drain(queue: Container, items: Sequence[Any]) -> float:
+    """Return the number of seconds it takes to add every item in <items> to
+    <queue> and then remove them all again.
+    """
+    start = time.perf_counter()
+    for item in items:
+        queue.add(item)
+    while not queue.is_empty():
+        queue.remove()
+    return time.perf_counter() - start
+
+
+def benchmark_priority_queue(sizes: Sequence[int] = (1000, 10000, 100000),
+                             seed: int = 148) -> List[Dict[str, float]]:
+    """Return the time taken to fill and drain each priority queue
+    implementation with each number of items in <sizes>.
+
+    Items are random timestamps drawn from a window one tenth the size of the
+    queue, so that many of them tie, as event timestamps do.
+
+    >>> rows = benchmark_priority_queue([10])
+    >>> rows[0]['size']
+    10
+    >>> sorted(rows[0].keys())
+    ['heap', 'size', 'sorted_list']
+    """
+    queues: Dict[str, Callable[[], Container]] = {
+        'heap': PriorityQueue,
+        'sorted_list': SortedListPriorityQueue
+    }
+    rng = random.Random(seed)
+    rows = []
+    for size in sizes:
+        items = [rng.randrange(max(size // 10, 1)) for _ in range(size)]
+        row = {'size': size}
+        for name, make_queue in queues.items():
+            row[name] = _fill_and_drain(make_queue(), items)
+        rows.append(row)
+    return rows
+
+
+def benchmark_event_ordering(size: int = 100000, seed: int = 148
+                             ) -> List[Dict[str, float]]:
+    """Return how many comparisons per second, and how many queued events per
+    second, events can be ordered at by their rich comparison methods and by
+    event_key.
+
+    'compare' is the rate of comparisons between two events or two heap
+    entries, and 'fill_drain' is the rate at which <size> events with
+    random, often tied, timestamps pass through a PriorityQueue.
+
+    >>> rows = benchmark_event_ordering(10)
+    >>> [row['ordering'] for row in rows]
+    ['rich_comparison', 'event_key']
+    """
+    rng = random.Random(seed)
+    events = [CheckoutStarted(rng.randrange(max(size // 10, 1)), 0)
+              for _ in range(size)]
+    pairs = list(zip(events, events[1:]))
+    entries = [[event_key(e), i, e] for i, e in enumerate(events)]
+    entry_pairs = list(zip(entries, entries[1:]))
+    rows = []
+    for name, compared, make_queue in [
+            ('rich_comparison', pairs, PriorityQueue),
+            ('event_key', entry_pairs, lambda: PriorityQueue(key=event_key))]:
+        start = time.perf_counter()
+        for first, second in compared:
+            _ = first < second
+        compare = len(compared) / max(time.perf_counter() - start, 1e-9)
+        elapsed = _fill_and_drain(make_queue(), events)
+        rows.append({'ordering': name, 'compare': compare,
+                     'fill_drain': size / max(elapsed, 1e-9)})
+    return rows
+
+
+def benchmark_checkout_line(capacities: Sequence[int] = LINE_CAPACITIES
+                            ) -> List[Dict[str, float]]:
+    """Return the time taken to drain and to close a full RegularLine for each
+    capacity in <capacities>.
+
+    'drain' completes every checkout one at a time, 'drain_list' does the
+    same with a plain list in place of the line's deque, and 'close' closes
+    a full line.
+
+    >>> rows = benchmark_checkout_line([10])
+    >>> sorted(rows[0].keys())
+    ['capacity', 'close', 'drain', 'drain_list']
+    """
+    rows = []
+    for capacity in capacities:
+        customers = [Customer(str(i), [Item('Gum', 1)])
+                     for i in range(capacity)]
+        row = {'capacity': capacity}
+
+        line = _full_line(capacity, customers)
+        start = time.perf_counter()
+        while line.complete_checkout():
+            pass
+        row['drain'] = time.perf_counter() - start
+
+        queue = list(customers)
+        start = time.perf_counter()
+        while queue:
+            queue.pop(0)
+        row['drain_list'] = time.perf_counter() - start
+
+        line = _full_line(capacity, customers)
+        start = time.perf_counter()
+        line.close()
+        row['close'] = time.perf_counter() - start
+        rows.append(row)
+    return rows
+
+
+def _full_line(capacity: int, customers: List[Customer]) -> RegularLine:
+    """Return a RegularLine with <capacity> that holds all of <customers>.
+    """
+    line = RegularLine(capacity)
+    for customer in customers:
+        line.accept(customer)
+    return line
+
+
+class _DictItem(Item):
+    """An Item that keeps its attributes in a __dict__, as Item used to."""
+
+
+class _DictCustomer(Customer):
+    """A Customer that keeps its attributes in a __dict__, as Customer used
+    to."""
+
+
+class _DictCheckoutStarted(CheckoutStarted):
+    """A CheckoutStarted that keeps its attributes in a __dict__, as events
+    used to."""
+
+
+def _traced_bytes(build: Callable[[], Any]) -> int:
+    """Return the number of bytes allocated by <build>() that are still in use
+    once it returns.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def _unshared_customers(lines: List[str]) -> List[Customer]:
+    """Return the customers on the Arrive <lines>, with a separate, dict-based
+    Item for every item token, as create_event_list used to build them.
+    """
+    customers = []
+    for line in lines:
+        tokens = line.split()
+        items = [_DictItem(tokens[i], int(tokens[i + 1]))
+                 for i in range(3, len(tokens), 2)]
+        customers.append(_DictCustomer(tokens[2], items))
+    return customers
+
+
+def benchmark_memory(num_customers: int = 10000, basket_size: int = 20
+                     ) -> List[Dict[str, float]]:
+    """Return the bytes used per customer, and per pending event, with the
+    compact representations and with dict-based objects.
+
+    Each customer has <basket_size> items, drawn from a handful of names as
+    in the sample event files. The pending events are CheckoutStarted events
+    in a PriorityQueue.
+
+    >>> rows = benchmark_memory(10, 3)
+    >>> [row['measure'] for row in rows]
+    ['bytes_per_customer', 'bytes_per_pending_event']
+    """
+    rng = random.Random(148)
+    lines = []
+    for i in range(num_customers):
+        items = ' '.join(rng.choice(['Gum 1', 'Bread 3', 'Chips 2',
+                                     'Bananas 7', 'Cheese 3'])
+                         for _ in range(basket_size))
+        lines.append('{} Arrive Customer{} {}'.format(i, i, items))
+    text = '\n'.join(lines) + '\n'
+
+    def _compact_customers() -> List[Event]:
+        return create_event_list(io.StringIO(text))
+
+    def _dict_customers() -> List[Customer]:
+        customers = _unshared_customers(lines)
+        return [CustomerArrival(i, c) for i, c in enumerate(customers)]
+
+    def _compact_events() -> PriorityQueue:
+        return PriorityQueue.from_iterable(
+            CheckoutStarted(i, i % 10) for i in range(num_customers))
+
+    def _dict_events() -> PriorityQueue:
+        return PriorityQueue.from_iterable(
+            _DictCheckoutStarted(i, i % 10) for i in range(num_customers))
+
+    return [
+        {'measure': 'bytes_per_customer',
+         'dict': _traced_bytes(_dict_customers) / num_customers,
+         'compact': _traced_bytes(_compact_customers) / num_customers},
+        {'measure': 'bytes_per_pending_event',
+         'dict': _traced_bytes(_dict_events) / num_customers,
+         'compact': _traced_bytes(_compact_events) / num_customers}
+    ]
+
+
+def _write_event_file(path: str, num_lines: int, seed: int) -> int:
+    """Write <num_lines> random Arrive lines to the file at <path>, with items
+    often repeated several times in a row, and return the file's size in
+    bytes.
+    """
+    rng = random.Random(seed)
+    items = ['Gum 1', 'Bread 3', 'Chips 2', 'Bananas 7', 'Cheese 3']
+    size = 0
+    with open(path, 'w') as event_file:
+        for i in range(num_lines):
+            basket = ' '.join(' '.join([rng.choice(items)] *
+                                       rng.choice([1, 1, 2, 3, 11]))
+                              for _ in range(rng.randint(1, 4)))
+            line = '{} Arrive Customer{} {}\n'.format(i, i, basket)
+            size += len(line)
+            event_file.write(line)
+    return size
+
+
+def _per_token_events(lines: Iterable[str]) -> Iterator[Event]:
+    """Yield the events on <lines> by splitting every line into tokens and
+    building a list entry for every item, as create_event_list used to.
+    """
+    shared_items = {}
+    for line in lines:
+        tokens = line.split()
+        if not tokens:
+            continue
+        if tokens[1] == 'Arrive':
+            items = []
+            for i in range(3, len(tokens), 2):
+                key = (tokens[i], tokens[i + 1])
+                item = shared_items.get(key)
+                if item is None:
+                    item = Item(tokens[i], int(tokens[i + 1]))
+                    shared_items[key] = item
+                items.append(item)
+            yield CustomerArrival(int(tokens[0]), Customer(tokens[2], items))
+        else:
+            yield CloseLine(int(tokens[0]), int(tokens[2]))
+
+
+def benchmark_parser(num_lines: int = 10000000, seed: int = 148
+                     ) -> List[Dict[str, float]]:
+    """Return the lines and bytes per second that a synthetic event file with
+    <num_lines> lines is parsed at, by iter_events and by splitting every
+    line into tokens.
+
+    >>> rows = benchmark_parser(10)
+    >>> [row['parser'] for row in rows]
+    ['per_token', 'item_runs']
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.txt')
+        size = _write_event_file(path, num_lines, seed)
+        rows = []
+        for name, parse in [('per_token', _per_token_events),
+                            ('item_runs', iter_events)]:
+            with open(path) as event_file:
+                start = time.perf_counter()
+                for _ in parse(event_file):
+                    pass
+                elapsed = max(time.perf_counter() - start, 1e-9)
+            rows.append({'parser': name, 'lines_per_sec': num_lines / elapsed,
+                         'bytes_per_sec': size / elapsed})
+    return rows
+
+
+def benchmark_trace(num_lines: int = 1000000, seed: int = 148
+                    ) -> List[Dict[str, float]]:
+    """Return the events per second read from a synthetic event file with
+    <num_lines> lines, as text and as a compiled EventTrace, and the seconds
+    taken to get the first event.
+
+    The file's lines are shuffled, so the text has to be sorted before its
+    first event is known, while the trace is sorted when it is compiled.
+
+    >>> rows = benchmark_trace(10)
+    >>> [row['source'] for row in rows]
+    ['text', 'trace']
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, 'events.txt')
+        trace_path = os.path.join(directory, 'events.bin')
+        _write_event_file(text_path, num_lines, seed)
+        with open(text_path) as event_file:
+            lines = event_file.readlines()
+        random.Random(seed).shuffle(lines)
+        with open(text_path, 'w') as event_file:
+            event_file.writelines(lines)
+        del lines
+        with open(text_path) as event_file:
+            compile_events(event_file, trace_path)
+
+        rows = []
+        with open(text_path) as event_file:
+            rows.append(_time_events('text', lambda: sorted_events(
+                event_file)))
+        with EventTrace(trace_path) as trace:
+            rows.append(_time_events('trace', trace.events))
+    return rows
+
+
+def _time_events(source: str, events: Callable[[], Iterator[Event]]
+                 ) -> Dict[str, float]:
+    """Return the events per second yielded by <events>(), and the seconds
+    taken to get the first one, in a row for <source>.
+    """
+    start = time.perf_counter()
+    count = 0
+    first = 0.0
+    for _ in events():
+        if count == 0:
+            first = time.perf_counter() - start
+        count += 1
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    return {'source': source, 'events_sec': count / elapsed,
+            'first_event': first}
+
+
+def benchmark_simulation(sizes: Sequence[int] = SIMULATION_SIZES,
+                         seed: int = 148) -> List[Dict[str, float]]:
+    """Return the wall time, the events per second and the peak resident set
+    size of simulating a synthetic workload of each number of customers in
+    <sizes>, in the store in SIMULATION_CONFIG.
+
+    The workload has customers arriving at 0.5 a second, a little below the
+    rate at which the store can check them out, while two lines close. Each
+    size is written to an event file and simulated in a fresh process, so
+    that its peak RSS is its own. 'events_sec' is the number of events in
+    the file simulated per second, and 'peak_rss' is in bytes, or None if
+    this platform cannot measure it.
+
+    >>> rows = benchmark_simulation([10])
+    >>> sorted(rows[0].keys())
+    ['customers', 'events', 'events_sec', 'peak_rss', 'wall_time']
+    """
+    rows = []
+    for size in sizes:
+        with ProcessPoolExecutor(1) as pool:
+            rows.append(pool.submit(_simulate_workload, size, seed).result())
+    return rows
+
+
+def _simulate_workload(num_customers: int, seed: int) -> Dict[str, float]:
+    """Return a row of benchmark_simulation for <num_customers> customers,
+    measured in this process.
+    """
+    model = WorkloadModel(num_customers, 0.5, num_closures=2,
+                          closures=STAGGERED_CLOSURES, num_lines=12)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.txt')
+        num_events = model.write(path, seed)
+        simulation = GroceryStoreSimulation(io.StringIO(SIMULATION_CONFIG))
+        with open(path) as event_file:
+            start = time.perf_counter()
+            simulation.run(event_file)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+    return {'customers': num_customers, 'events': num_events,
+            'wall_time': elapsed, 'events_sec': num_events / elapsed,
+            'peak_rss': _peak_rss()}
+
+
+def benchmark_event_loop(num_customers: int = 1000000, seed: int = 148
+                         ) -> List[Dict[str, Any]]:
+    """Return the CPU time and the events per second of simulating a
+    compiled trace of <num_customers> customers with a bare event loop, and
+    with run(), in the store in SIMULATION_CONFIG.
+
+    The bare loop only takes the events one at a time and handles them, so
+    the difference is what run()'s own bookkeeping costs, and a change to
+    how run() takes events from the queue can be measured against it. The
+    customers arrive at 0.5 a second and no lines close. Customers who
+    cannot join a line retry every second in both loops. 'same' is True iff
+    both give the same statistics.
+
+    >>> rows = benchmark_event_loop(10)
+    >>> [row['loop'] for row in rows], [row['same'] for row in rows]
+    (['bare loop', 'run()'], [True, True])
+    """
+    model = WorkloadModel(num_customers, 0.5)
+    with tempfile.TemporaryDirectory() as directory:
+        text = os.path.join(directory, 'events.txt')
+        path = os.path.join(directory, 'events.bin')
+        num_events = model.write(text, seed)
+        with open(text) as event_file:
+            compile_events(event_file, path)
+        rows = []
+        with EventTrace(path) as trace:
+            for loop, simulate in [
+                    ('bare loop', _one_event_at_a_time),
+                    ('run()', lambda events: GroceryStoreSimulation(
+                        io.StringIO(SIMULATION_CONFIG),
+                        park_blocked=False).run(events))]:
+                start = time.process_time()
+                stats = simulate(trace)
+                elapsed = max(time.process_time() - start, 1e-9)
+                rows.append({'loop': loop, 'events': num_events,
+                             'cpu_time': elapsed,
+                             'events_sec': num_events / elapsed,
+                             'stats': stats})
+    expected = rows[0]['stats']
+    for row in rows:
+        row['same'] = row.pop('stats') == expected
+    return rows
+
+
+def _one_event_at_a_time(trace: EventTrace) -> Dict[str, int]:
+    """Return the statistics of simulating <trace> in the store in
+    SIMULATION_CONFIG, taking the events one at a time: the trace's next
+    event if it is no later than the queue's, and otherwise the queue's.
+    """
+    store = GroceryStore(io.StringIO(SIMULATION_CONFIG))
+    queue = timestamp_queue()
+    stats = {'num_customers': 0, 'total_time': 0, 'max_wait': -1}
+    events = trace.events()
+    upcoming = next(events, None)
+    while True:
+        if upcoming is not None and (
+                queue.is_empty()
+                or upcoming.timestamp <= queue.peek().timestamp):
+            event = upcoming
+            upcoming = next(events, None)
+            if isinstance(event, CustomerArrival):
+                stats['num_customers'] += 1
+        elif not queue.is_empty():
+            event = queue.remove()
+        else:
+            break
+        stats['total_time'] = event.timestamp
+        if isinstance(event, CheckoutCompleted):
+            stats['max_wait'] = max(stats['max_wait'], event.timestamp -
+                                    event.customer.arrival_time)
+        for new_event in event.do(store):
+            queue.add(new_event)
+    return stats
+
+
+def _peak_rss() -> Optional[int]:
+    """Return the peak resident set size of this process in bytes, or None if
+    it cannot be measured on this platform.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, and macOS reports bytes
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def record_baseline(rows: List[Dict[str, float]],
+                    path: str = BASELINE_FILE) -> None:
+    """Record the <rows> of benchmark_simulation as the baseline in the JSON
+    file at <path>, replacing any baseline already there.
+    """
+    with open(path, 'w') as baseline:
+        json.dump({'python': platform.python_version(),
+                   'machine': platform.machine(), 'simulation': rows},
+                  baseline, indent=2)
+        baseline.write('\n')
+
+
+def find_regressions(rows: List[Dict[str, float]], path: str = BASELINE_FILE,
+                     tolerance: float = TOLERANCE) -> List[str]:
+    """Return a description of each regression in the <rows> of
+    benchmark_simulation, compared to the baseline in the JSON file at
+    <path>.
+
+    A size regresses if it is simulated at fewer events per second, or with
+    a larger peak RSS, than in the baseline, by more than <tolerance> of the
+    baseline. Sizes that are not in the baseline are ignored.
+
+    >>> old = [{'customers': 10, 'events_sec': 100.0, 'peak_rss': 1000}]
+    >>> new = [{'customers': 10, 'events_sec': 70.0, 'peak_rss': 1100}]
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     path = os.path.join(directory, 'baseline.json')
+    ...     record_baseline(old, path)
+    ...     find_regressions(new, path)
+    ['10 customers: events_sec 70.0 is below the baseline of 100.0']
+    """
+    with open(path) as baseline:
+        recorded = {row['customers']: row
+                    for row in json.load(baseline)['simulation']}
+    regressions = []
+    for row in rows:
+        old = recorded.get(row['customers'])
+        if old is None:
+            continue
+        if row['events_sec'] < old['events_sec'] * (1 - tolerance):
+            regressions.append(
+                '{} customers: events_sec {:.1f} is below the baseline of '
+                '{:.1f}'.format(row['customers'], row['events_sec'],
+                                old['events_sec']))
+        if row['peak_rss'] is not None and old['peak_rss'] is not None \
+                and row['peak_rss'] > old['peak_rss'] * (1 + tolerance):
+            regressions.append(
+                '{} customers: peak_rss {} is above the baseline of '
+                '{}'.format(row['customers'], row['peak_rss'],
+                            old['peak_rss']))
+    return regressions
+
+
+def print_table(title: str, rows: List[Dict[str, float]]) -> None:
+    """Print <rows> as a table under the heading <title>.
+
+    Every row must have the same keys.
+    """
+    print(title)
+    columns = list(rows[0].keys())
+    print(''.join('{:>14}'.format(column) for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row[column]
+            if isinstance(value, float):
+                cells.append('{:>14.4f}'.format(value))
+            else:
+                cells.append('{:>14}'.format(value))
+        print(''.join(cells))
+    print()
+
+
+if __name__ == '__main__':
+    print_table('PriorityQueue fill and drain (seconds)',
+                benchmark_priority_queue())
+    print_table('Event ordering (per second)', benchmark_event_ordering())
+    print_table('CheckoutLine drain and close (seconds)',
+                benchmark_checkout_line())
+    print_table('Memory (bytes)', benchmark_memory())
+    print_table('Event file parsing (per second)', benchmark_parser())
+    print_table('Compiled traces', benchmark_trace())
+    simulated = benchmark_simulation()
+    print_table('Simulating synthetic workloads', simulated)
+    print_table('Event loops (1000000 customers)', benchmark_event_loop())
+    if os.path.exists(BASELINE_FILE):
+        for regression in find_regressions(simulated):
+            print('Regression: ' + regression)
+    else:
+        record_baseline(simulated)
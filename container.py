@@ -21,7 +21,10 @@ Copyright (c) 2019 Jacqueline Smith
 """
 
 from __future__ import annotations
-from typing import Any, List
+from typing import Any, Callable, Deque, Iterable, List, Optional
+from collections import deque
+import bisect
+import heapq
 
 
 class Container:
@@ -57,25 +60,59 @@ class PriorityQueue(Container):
     removed.
 
     Priority is defined by the rich comparison methods for the objects in the
-    container (__lt__, __le__, __gt__, __ge__).
+    container (__lt__, __le__, __gt__, __ge__), or by the keys the objects
+    are given by a key function.
 
     If x < y, then x has a *HIGHER* priority than y.
 
     All objects in the container must be of the same type.
 
     === Private Attributes ===
-    _items: The items stored in the priority queue.
+    _items: The items stored in the priority queue, as [priority, sequence,
+            item] entries arranged in a binary min-heap.
+    _counter: The sequence number to give to the next item added.
+    _key: The function that gives each item its priority, or None if items
+          are their own priorities.
 
     === Representation Invariants ===
-    _items is a sorted list, where the front item is the one with the
-    highest priority.
+    _items is a binary min-heap of [priority, sequence, item] entries, so the
+    front entry holds the item with the highest priority.
+    No two entries in _items share a sequence number, and every sequence
+    number is less than _counter. Entries are therefore ordered by priority
+    and sequence alone, and items are never compared directly.
     """
-    _items: List
+    _items: List[List]
+    _counter: int
+    _key: Optional[Callable[[Any], Any]]
 
-    def __init__(self) -> None:
+    def __init__(self, key: Optional[Callable[[Any], Any]] = None) -> None:
         """Initialize an empty PriorityQueue.
+
+        If <key> is not None, each item's priority is <key>(item) instead of
+        the item itself. A key that returns an int or a tuple is compared
+        natively, without calling any comparison methods of the items.
+        <key>(item) must not change while the item is in the queue.
+
+        >>> pq = PriorityQueue(key=len)
+        >>> pq.add('fred')
+        >>> pq.add('hat')
+        >>> pq.remove()
+        'hat'
         """
         self._items = []
+        self._counter = 0
+        self._key = key
+
+    def __len__(self) -> int:
+        """Return the number of items in this PriorityQueue.
+
+        >>> pq = PriorityQueue()
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> len(pq)
+        2
+        """
+        return len(self._items)
 
     def remove(self) -> Any:
         """Remove and return the next item from this PriorityQueue.
@@ -96,7 +133,22 @@ class PriorityQueue(Container):
         >>> pq.remove()
         'mona'
         """
-        return self._items.pop(0)
+        return heapq.heappop(self._items)[2]
+
+    def peek(self) -> Any:
+        """Return the next item from this PriorityQueue without removing it.
+
+        Precondition: <self> should not be empty.
+
+        >>> pq = PriorityQueue()
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.peek()
+        'arju'
+        >>> len(pq)
+        2
+        """
+        return self._items[0][2]
 
     def is_empty(self) -> bool:
         """
@@ -119,10 +171,509 @@ class PriorityQueue(Container):
         >>> pq.add('arju')
         >>> pq.add('mona')
         >>> pq.add('hana')
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['arju', 'fred', 'hana', 'mona']
+        """
+        priority = item if self._key is None else self._key(item)
+        heapq.heappush(self._items, [priority, self._counter, item])
+        self._counter += 1
+
+    def add_many(self, items: Iterable[Any]) -> None:
+        """Add every item in <items> to this PriorityQueue, in order.
+
+        Ties between the new items, and with items already in the queue, are
+        resolved in FIFO order as if each item had been added with add().
+        When at least as many items are added as are already in the queue,
+        the heap is rebuilt in linear time instead of adding the items one at
+        a time; fewer items are pushed one at a time, which takes constant
+        time on average rather than time linear in the size of the queue.
+
+        >>> pq = PriorityQueue()
+        >>> pq.add('fred')
+        >>> pq.add_many(['mona', 'arju', 'fred'])
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['arju', 'fred', 'fred', 'mona']
+        """
+        start = self._counter
+        if self._key is None:
+            entries = [[item, seq, item]
+                       for seq, item in enumerate(items, start)]
+        else:
+            key = self._key
+            entries = [[key(item), seq, item]
+                       for seq, item in enumerate(items, start)]
+        self._counter += len(entries)
+        if len(entries) < len(self._items):
+            for entry in entries:
+                heapq.heappush(self._items, entry)
+        else:
+            self._items.extend(entries)
+            heapq.heapify(self._items)
+
+    @classmethod
+    def from_iterable(cls, items: Iterable[Any],
+                      key: Optional[Callable[[Any], Any]] = None
+                      ) -> PriorityQueue:
+        """Return a new PriorityQueue holding every item in <items>, ordered
+        by <key> as described in __init__.
+
+        Ties are resolved in the order the items appear in <items>.
+
+        >>> pq = PriorityQueue.from_iterable(['fred', 'arju', 'mona'])
+        >>> pq.remove()
+        'arju'
+        """
+        pq = cls(key)
+        pq.add_many(items)
+        return pq
+
+
+class SortedListPriorityQueue(Container):
+    """A priority queue kept as a fully sorted list.
+
+    This has the same interface and ordering as PriorityQueue, but every add
+    and remove is O(n). It is kept as a reference implementation to compare
+    PriorityQueue against.
+
+    === Private Attributes ===
+    _items: The items stored in the priority queue.
+
+    === Representation Invariants ===
+    _items is a sorted list, where the front item is the one with the
+    highest priority. Equal items appear in the order they were added.
+    """
+    _items: List
+
+    def __init__(self) -> None:
+        """Initialize an empty SortedListPriorityQueue.
+        """
+        self._items = []
+
+    def __len__(self) -> int:
+        """Return the number of items in this SortedListPriorityQueue.
+        """
+        return len(self._items)
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this SortedListPriorityQueue.
+
+        Precondition: <self> should not be empty.
+        """
+        return self._items.pop(0)
+
+    def peek(self) -> Any:
+        """Return the next item without removing it.
+
+        Precondition: <self> should not be empty.
+        """
+        return self._items[0]
+
+    def is_empty(self) -> bool:
+        """Return True iff this SortedListPriorityQueue is empty.
+        """
+        return len(self._items) == 0
+
+    def add(self, item: Any) -> None:
+        """Add <item> to this SortedListPriorityQueue.
+
+        >>> pq = SortedListPriorityQueue()
+        >>> pq.add('fred')
+        >>> pq.add('arju')
+        >>> pq.add('mona')
+        >>> pq.add('hana')
         >>> pq._items
         ['arju', 'fred', 'hana', 'mona']
         """
-        # TODO: Implement this method.
+        bisect.insort_right(self._items, item)
+
+    def add_many(self, items: Iterable[Any]) -> None:
+        """Add every item in <items> to this SortedListPriorityQueue, in order.
+
+        >>> pq = SortedListPriorityQueue()
+        >>> pq.add_many(['fred', 'arju'])
+        >>> pq._items
+        ['arju', 'fred']
+        """
+        self._items.extend(items)
+        self._items.sort()
+
+
+class IndexedPriorityQueue(Container):
+    """A priority queue whose items can be cancelled or rescheduled.
+
+    Items are removed in the same order as from a PriorityQueue: by priority,
+    with ties resolved in FIFO order. By default an item is its own priority,
+    or its key if the queue has a key function, but a separate priority can
+    be given when it is added. For events, the event's timestamp can be used
+    as its priority, since events are ordered by timestamp alone.
+
+    add() returns a handle for the item. The handle can be passed to cancel()
+    to take the item out of the queue, or to reschedule() to give it a new
+    priority; both take O(log n) time.
+
+    === Private Attributes ===
+    _heap: [priority, sequence, item, position] entries arranged in a binary
+           min-heap. The entries are the handles given out by add().
+    _counter: The sequence number to give to the next entry.
+    _key: The function that gives each item its default priority, or None if
+          items are their own priorities.
+
+    === Representation Invariants ===
+    - _heap is a binary min-heap on (priority, sequence).
+    - For every index i, _heap[i][3] == i.
+    - The position of an entry that is no longer in _heap is -1.
+    """
+    _heap: List[List]
+    _counter: int
+    _key: Optional[Callable[[Any], Any]]
+
+    def __init__(self, key: Optional[Callable[[Any], Any]] = None) -> None:
+        """Initialize an empty IndexedPriorityQueue, whose items are ordered
+        by <key> as in PriorityQueue.
+        """
+        self._heap = []
+        self._counter = 0
+        self._key = key
+
+    def __len__(self) -> int:
+        """Return the number of items in this IndexedPriorityQueue.
+        """
+        return len(self._heap)
+
+    def is_empty(self) -> bool:
+        """Return True iff this IndexedPriorityQueue is empty.
+
+        >>> pq = IndexedPriorityQueue()
+        >>> pq.is_empty()
+        True
+        >>> _ = pq.add('fred')
+        >>> pq.is_empty()
+        False
+        """
+        return len(self._heap) == 0
+
+    def add(self, item: Any, priority: Any = None) -> List:
+        """Add <item> to this IndexedPriorityQueue and return its handle.
+
+        <item> is ordered by <priority>, or by its default priority if
+        <priority> is None.
+
+        >>> pq = IndexedPriorityQueue()
+        >>> _ = pq.add('fred')
+        >>> _ = pq.add('arju')
+        >>> _ = pq.add('mona', 'a')
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['mona', 'arju', 'fred']
+        """
+        if priority is None:
+            priority = item if self._key is None else self._key(item)
+        entry = [priority, self._counter, item, len(self._heap)]
+        self._counter += 1
+        self._heap.append(entry)
+        self._sift_up(entry[3])
+        return entry
+
+    def add_many(self, items: Iterable[Any]) -> None:
+        """Add every item in <items> to this IndexedPriorityQueue, in order.
+
+        Use add() instead for items that need a handle.
+        """
+        for item in items:
+            self.add(item)
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this IndexedPriorityQueue.
+
+        Precondition: <self> should not be empty.
+        """
+        entry = self._heap[0]
+        self._delete(0)
+        return entry[2]
+
+    def peek(self) -> Any:
+        """Return the next item from this IndexedPriorityQueue without
+        removing it.
+
+        Precondition: <self> should not be empty.
+        """
+        return self._heap[0][2]
+
+    def cancel(self, handle: List) -> bool:
+        """Remove the item with <handle> from this IndexedPriorityQueue.
+
+        Return True iff the item was still in the queue.
+
+        >>> pq = IndexedPriorityQueue()
+        >>> fred = pq.add('fred')
+        >>> _ = pq.add('mona')
+        >>> pq.cancel(fred)
+        True
+        >>> pq.cancel(fred)
+        False
+        >>> pq.remove()
+        'mona'
+        """
+        if handle[3] == -1:
+            return False
+        self._delete(handle[3])
+        return True
+
+    def reschedule(self, handle: List, new_priority: Any) -> None:
+        """Give the item with <handle> the priority <new_priority>.
+
+        The item is ordered after any items already in the queue with an
+        equal priority, as though it had just been added.
+
+        Precondition: the item with <handle> is still in the queue.
+
+        >>> pq = IndexedPriorityQueue()
+        >>> fred = pq.add('fred', 5)
+        >>> _ = pq.add('mona', 3)
+        >>> _ = pq.add('arju', 1)
+        >>> pq.reschedule(fred, 1)
+        >>> [pq.remove() for _ in range(len(pq))]
+        ['arju', 'fred', 'mona']
+        """
+        handle[0] = new_priority
+        handle[1] = self._counter
+        self._counter += 1
+        self._sift_down(handle[3])
+        self._sift_up(handle[3])
+
+    def _delete(self, position: int) -> None:
+        """Remove the entry at <position> in _heap.
+        """
+        heap = self._heap
+        entry = heap[position]
+        last = heap.pop()
+        entry[3] = -1
+        if last is not entry:
+            heap[position] = last
+            last[3] = position
+            self._sift_down(position)
+            self._sift_up(last[3])
+
+    def _sift_up(self, position: int) -> None:
+        """Move the entry at <position> towards the root of _heap until its
+        parent is no greater than it.
+        """
+        heap = self._heap
+        entry = heap[position]
+        while position > 0:
+            parent_position = (position - 1) // 2
+            parent = heap[parent_position]
+            if not entry < parent:
+                break
+            heap[position] = parent
+            parent[3] = position
+            position = parent_position
+        heap[position] = entry
+        entry[3] = position
+
+    def _sift_down(self, position: int) -> None:
+        """Move the entry at <position> away from the root of _heap until
+        neither of its children is less than it.
+        """
+        heap = self._heap
+        entry = heap[position]
+        size = len(heap)
+        child_position = 2 * position + 1
+        while child_position < size:
+            right_position = child_position + 1
+            if right_position < size and \
+                    heap[right_position] < heap[child_position]:
+                child_position = right_position
+            child = heap[child_position]
+            if not child < entry:
+                break
+            heap[position] = child
+            child[3] = position
+            position = child_position
+            child_position = 2 * position + 1
+        heap[position] = entry
+        entry[3] = position
+
+
+class CalendarQueue(Container):
+    """A queue of events that operates in timestamp order.
+
+    Events are kept in a ring of buckets with one bucket per timestamp, like
+    the days of a calendar. The events with the earliest timestamp are removed
+    first, and events with the same timestamp are removed in FIFO order, so
+    this removes events in exactly the same order as a PriorityQueue of
+    events would.
+
+    Events that are too far in the future for the ring are held in an overflow
+    heap, and moved into the ring as the current time approaches them. When
+    most events are close to the current time, add and remove both take
+    amortized constant time.
+
+    Every object in the container must have an integer timestamp attribute.
+
+    === Private Attributes ===
+    _ring: The buckets of events. The bucket for timestamp t is
+           _ring[t % len(_ring)].
+    _now: The earliest timestamp that may have events in _ring, or None if no
+          event has been added yet.
+    _in_ring: The number of events in _ring.
+    _overflow: [timestamp, sequence, event] entries for the events that are
+               not in _ring, arranged in a binary min-heap.
+    _counter: The sequence number to give to the next overflow entry.
+
+    === Representation Invariants ===
+    - Every event in _ring has a timestamp t with
+      _now <= t < _now + len(_ring), and is in the bucket for t.
+    - Every event in _overflow has a timestamp t >= _now + len(_ring).
+    - Each bucket holds its events in the order they were added.
+    """
+    _ring: List[Deque]
+    _now: Optional[int]
+    _in_ring: int
+    _overflow: List[List]
+    _counter: int
+
+    def __init__(self, width: int = 1024) -> None:
+        """Initialize an empty CalendarQueue whose ring covers <width>
+        consecutive timestamps.
+
+        Precondition: width >= 1
+        """
+        self._ring = [deque() for _ in range(width)]
+        self._now = None
+        self._in_ring = 0
+        self._overflow = []
+        self._counter = 0
+
+    def __len__(self) -> int:
+        """Return the number of events in this CalendarQueue.
+
+        >>> from event import Event
+        >>> cq = CalendarQueue()
+        >>> cq.add(Event(3))
+        >>> cq.add(Event(5000))
+        >>> len(cq)
+        2
+        """
+        return self._in_ring + len(self._overflow)
+
+    def is_empty(self) -> bool:
+        """Return True iff this CalendarQueue is empty.
+
+        >>> from event import Event
+        >>> cq = CalendarQueue()
+        >>> cq.is_empty()
+        True
+        >>> cq.add(Event(3))
+        >>> cq.is_empty()
+        False
+        """
+        return self._in_ring == 0 and len(self._overflow) == 0
+
+    def add(self, item: Any) -> None:
+        """Add the event <item> to this CalendarQueue.
+
+        >>> from event import Event
+        >>> cq = CalendarQueue(4)
+        >>> for t in [9, 2, 30, 2]:
+        ...     cq.add(Event(t))
+        >>> [cq.remove().timestamp for _ in range(len(cq))]
+        [2, 2, 9, 30]
+        """
+        timestamp = item.timestamp
+        if self._now is None or (self.is_empty() and timestamp < self._now):
+            self._now = timestamp
+        elif timestamp < self._now:
+            self._rewind(timestamp)
+        if timestamp < self._now + len(self._ring):
+            self._ring[timestamp % len(self._ring)].append(item)
+            self._in_ring += 1
+        else:
+            heapq.heappush(self._overflow, [timestamp, self._counter, item])
+            self._counter += 1
+
+    def add_many(self, items: Iterable[Any]) -> None:
+        """Add every event in <items> to this CalendarQueue, in order.
+
+        >>> from event import Event
+        >>> cq = CalendarQueue()
+        >>> cq.add_many([Event(5), Event(1)])
+        >>> cq.remove().timestamp
+        1
+        """
+        for item in items:
+            self.add(item)
+
+    def remove(self) -> Any:
+        """Remove and return the event with the earliest timestamp.
+
+        Precondition: <self> should not be empty.
+
+        >>> from event import Event
+        >>> cq = CalendarQueue()
+        >>> first, second = Event(4), Event(4)
+        >>> cq.add(first)
+        >>> cq.add(second)
+        >>> cq.remove() is first
+        True
+        """
+        bucket = self._next_bucket()
+        self._in_ring -= 1
+        return bucket.popleft()
+
+    def peek(self) -> Any:
+        """Return the event with the earliest timestamp without removing it.
+
+        Precondition: <self> should not be empty.
+
+        >>> from event import Event
+        >>> cq = CalendarQueue()
+        >>> cq.add(Event(8))
+        >>> cq.add(Event(6))
+        >>> cq.peek().timestamp
+        6
+        """
+        return self._next_bucket()[0]
+
+    def _next_bucket(self) -> Deque:
+        """Advance _now to the earliest timestamp that has an event, and
+        return the bucket for that timestamp.
+
+        Precondition: <self> should not be empty.
+        """
+        if self._in_ring == 0:
+            self._now = self._overflow[0][0]
+            self._pull_overflow()
+        width = len(self._ring)
+        bucket = self._ring[self._now % width]
+        while not bucket:
+            self._now += 1
+            self._pull_overflow()
+            bucket = self._ring[self._now % width]
+        return bucket
+
+    def _pull_overflow(self) -> None:
+        """Move the overflow events that now fit in the ring into it.
+        """
+        horizon = self._now + len(self._ring)
+        while self._overflow and self._overflow[0][0] < horizon:
+            timestamp, _, item = heapq.heappop(self._overflow)
+            self._ring[timestamp % len(self._ring)].append(item)
+            self._in_ring += 1
+
+    def _rewind(self, timestamp: int) -> None:
+        """Move _now back to the earlier <timestamp>, moving the events that
+        no longer fit in the ring to the overflow heap.
+        """
+        width = len(self._ring)
+        old_now = self._now
+        self._now = timestamp
+        for t in range(max(timestamp + width, old_now), old_now + width):
+            bucket = self._ring[t % width]
+            while bucket:
+                heapq.heappush(self._overflow,
+                               [t, self._counter, bucket.popleft()])
+                self._counter += 1
+                self._in_ring -= 1
 
 
 if __name__ == '__main__':
@@ -130,5 +681,5 @@ if __name__ == '__main__':
     doctest.testmod()
     import python_ta
     python_ta.check_all(config={
-        'allowed-import-modules': ['__future__', 'typing',
-                                   'python_ta', 'doctest']})
+        'allowed-import-modules': ['__future__', 'typing', 'bisect', 'heapq',
+                                   'collections', 'python_ta', 'doctest']})
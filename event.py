@@ -20,8 +20,13 @@ All of the files in this directory and all subdirectories are:
 Copyright (c) 2019 Jacqueline Smith
 """
 from __future__ import annotations
-from typing import List, TextIO
-from store import GroceryStore, Customer, Item
+from typing import Deque, Dict, Iterable, Iterator, List, TextIO, Tuple
+import heapq
+import operator
+import re
+import sys
+import tempfile
+from store import run_totals, GroceryStore, Customer, Item
 
 
 class Event:
@@ -39,6 +44,7 @@ class Event:
     timestamp: A timestamp for this event.
     """
     timestamp: int
+    __slots__ = ('timestamp',)
 
     def __init__(self, timestamp: int) -> None:
         """Initialize an Event with a given timestamp.
@@ -143,16 +149,42 @@ class Event:
 
         Return a list of new events spawned by this event (making sure the
         timestamps are correct).
+
+        The events are those that do_into appends to an empty list.
+        """
+        events = []
+        self.do_into(store, events)
+        return events
+
+    def do_into(self, store: GroceryStore, events: List[Event]) -> None:
+        """Perform this event, as in do(), appending the new events spawned by
+        it to <events> instead of returning a new list.
         """
         raise NotImplementedError('Implemented in a subclass')
 
 
-# TODO: Complete the subclasses for the different types of events below.
-# You should use the provided attributes in your solution. However, if you need
-# to, you may add private attributes and helper methods, but do not change the
-# public interface.
-# Write docstrings for all methods you write, and document your attributes
-# in the class docstring.
+# The sort key of an event: its timestamp. A queue given this key compares
+# plain ints, which orders events exactly as Event.__lt__ does, without a
+# method call per comparison.
+event_key = operator.attrgetter('timestamp')
+
+# The most event lines sorted_events holds in memory at once
+RUN_SIZE = 100000
+
+# The longest run of one item whose (item, count) pair iter_events shares
+MAX_SHARED_RUN = 64
+
+# The most distinct baskets whose runs iter_events remembers at once
+MAX_SHARED_BASKETS = 65536
+
+# The most spilled runs sorted_events keeps open before merging them
+MAX_OPEN_RUNS = 64
+
+# Matches an item's 'name time' tokens, followed by every repeat of the same
+# tokens right after them
+_ITEM_RUNS = re.compile(r'(\S+ \S+)((?: \1(?!\S))*)')
+
+
 class CustomerArrival(Event):
     """A customer arrives at the checkout area ready to check out.
 
@@ -160,6 +192,7 @@ class CustomerArrival(Event):
     customer: The arriving customer
     """
     customer: Customer
+    __slots__ = ('customer',)
 
     def __init__(self, timestamp: int, c: Customer) -> None:
         """Initialize a CustomerArrival event with <timestamp> and customer <c>.
@@ -167,9 +200,9 @@ class CustomerArrival(Event):
         super().__init__(timestamp)
         self.customer = c
 
-    def do(self, store: GroceryStore) -> List[Event]:
-        """Return a list of events representing this customer joining a line in
-        GroceryStore.
+    def do_into(self, store: GroceryStore, events: List[Event]) -> None:
+        """Append to <events> the events representing this customer joining a
+        line in GroceryStore.
 
         A customer cannot join a line that does not have capacity for them.
         When there are no lines the customer can join, the “new customer”
@@ -181,17 +214,15 @@ class CustomerArrival(Event):
         “begin checking out” event is added with the same timestamp
         as the join event.
         """
+        if self.customer.arrival_time == -1:
+            self.customer.arrival_time = self.timestamp
         line_entered = store.enter_line(self.customer)
-        result = []
-        marker = True
-        while marker is True:
-            if line_entered == -1:
-                self.timestamp += 1
-            else:
-                event = CustomerArrival(self.timestamp, self.customer)
-                result.append(event)
-                marker = False
-        return result
+        if line_entered == -1:
+            self.timestamp += 1
+            events.append(self)
+        elif store.line_is_ready(line_entered):
+            events.append(CheckoutStarted(self.timestamp, line_entered))
+
 
 class CheckoutStarted(Event):
     """A customer starts the checkout process.
@@ -203,6 +234,7 @@ class CheckoutStarted(Event):
     line_number: The number of the checkout line.
     """
     line_number: int
+    __slots__ = ('line_number',)
 
     def __init__(self, timestamp: int, line_number: int) -> None:
         """Initialize a CheckoutStarted event with <timestamp> and
@@ -211,24 +243,19 @@ class CheckoutStarted(Event):
         super().__init__(timestamp)
         self.line_number = line_number
 
-
-    def do(self, store: GroceryStore) -> List[Event]:
-        """Return an event representing when checkout will be completed
+    def do_into(self, store: GroceryStore, events: List[Event]) -> None:
+        """Append to <events> an event representing when checkout will be
+        completed
 
         If a customer begins checking out, a new “finish checking out” event is
         added with the same timestamp as the “begin” timestamp, plus the
         appropriate amount of time based on the type of checkout line and
         the time required by the customer’s items.
         """
-        total_waiting_time = self.timestamp #should encompass wait time of entire queue
-        for customer in store.get_line_list()[0].queue[:-1]:
-            total_waiting_time += customer.get_item_time()
-
-        event = CheckoutStarted(total_waiting_time, self.line_number)
-
-
-    # create timestamp when checkout will be completed
-    #emit the event
+        checkout_time = store.start_checkout(self.line_number)
+        customer = store.get_first_in_line(self.line_number)
+        events.append(CheckoutCompleted(self.timestamp + checkout_time,
+                                        self.line_number, customer))
 
 
 class CheckoutCompleted(Event):
@@ -242,6 +269,7 @@ class CheckoutCompleted(Event):
     """
     line_number: int
     customer: Customer
+    __slots__ = ('line_number', 'customer')
 
     def __init__(self, timestamp: int, line_number: int, c: Customer) -> None:
         """Initialize a CheckoutCompleted event with <timestamp>, <line_number>,
@@ -251,16 +279,17 @@ class CheckoutCompleted(Event):
         self.line_number = line_number
         self.customer = c
 
+    def do_into(self, store: GroceryStore, events: List[Event]) -> None:
+        """Append to <events> the events generated by this customer leaving
+        their line.
 
-    def do(self, store: GroceryStore) ->:
-        """
         If a customer finishes checking out, the next customer in the line
         (if there is one) gets a “begin checking out” event with the same
         timestamp as the “finish” event.
-        Remove customer from the line
         """
-        #remove them from the line
-        # no events to emit?
+        if store.complete_checkout(self.line_number):
+            events.append(CheckoutStarted(self.timestamp, self.line_number))
+
 
 class CloseLine(Event):
     """A CheckoutLine gets closed.
@@ -269,28 +298,263 @@ class CloseLine(Event):
     line_number: The number of the checkout line.
     """
     line_number: int
+    __slots__ = ('line_number',)
 
     def __init__(self, timestamp: int, line_number: int) -> None:
         """Initialize a CloseLine event with <timestamp> and <line_number>.
         """
+        super().__init__(timestamp)
+        self.line_number = line_number
+
+    def do_into(self, store: GroceryStore, events: List[Event]) -> None:
+        """Append to <events> the events for the customers moved out of this
+        line.
 
-    def do(self, store: GroceryStore):
-        """
         If a line closes, there is one “new customer” event per customer in the
         checkout line after the first one. The new events should be spaced 1
         second apart, with the last customer in the line having the earliest
         “new customer” event, which is the same as the “line close” event.
         """
+        moved = store.close_line(self.line_number)
+        for i, customer in enumerate(moved):
+            events.append(CustomerArrival(self.timestamp + i, customer))
+
 
+class BlockedArrivals(Event):
+    """A group of customers who could not join any line try again.
+
+    This stands in for one “new customer” retry event per customer. The
+    customers were turned away one after the other, so their retries would be
+    processed one after the other at every later timestamp; this event
+    processes them together instead, in the same order.
+
+    While no checkout has completed, no line can have made room for these
+    customers, so they are not offered a line at all.
+
+    === Attributes ===
+    customers: The waiting customers, in the order they will try again.
+    checkouts_seen: How many checkouts the store had completed when these
+                    customers last tried to join a line.
+    """
+    customers: Deque[Customer]
+    checkouts_seen: int
+    __slots__ = ('customers', 'checkouts_seen')
+
+    def __init__(self, timestamp: int, customers: Deque[Customer],
+                 checkouts_seen: int) -> None:
+        """Initialize a BlockedArrivals event with <timestamp>, the waiting
+        <customers> and <checkouts_seen>.
+        """
+        super().__init__(timestamp)
+        self.customers = customers
+        self.checkouts_seen = checkouts_seen
+
+    def do_into(self, store: GroceryStore, events: List[Event]) -> None:
+        """Append to <events> the events representing the waiting customers
+        who join a line.
+
+        Each customer is offered a line in the same way as CustomerArrival.do
+        would, and customers who join a line are removed from this event.
+        Customers who still cannot join a line are left in this event, which
+        should go back into the container if any remain.
+        """
+        checkouts = store.get_checkouts_completed()
+        if checkouts == self.checkouts_seen:
+            return
+        self.checkouts_seen = checkouts
+        for line_number in store.admit_waiting(self.customers):
+            events.append(CheckoutStarted(self.timestamp, line_number))
 
 
-# TODO: Complete this function, which creates a list of events from a file.
 def create_event_list(event_file: TextIO) -> List[Event]:
     """Return a list of Events based on raw list of events in <event_file>.
 
     Precondition: <event_file> is in the format specified by the assignment
     handout.
+
+    Items never change, so every item with the same name and time is
+    represented by a single shared Item, whose name is interned.
+
+    >>> import io
+    >>> events = create_event_list(io.StringIO('''10 Arrive Tamara Bananas 7
+    ... 4 Close 1
+    ... '''))
+    >>> events[0].timestamp, events[0].customer.get_item_time()
+    (10, 7)
+    >>> events[1].timestamp, events[1].line_number
+    (4, 1)
+    """
+    return list(iter_events(event_file))
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[Event]:
+    """Yield the Events in <lines>, in the order they appear, reading each
+    line only when its event is needed.
+
+    Precondition: <lines> is in the format specified by the assignment
+    handout. In particular, an open event file may be given.
+
+    As in create_event_list, items with the same name and time are shared.
+    Each customer holds their items as (item, count) runs, as parsed by
+    _parse_runs, and customers with the same basket share one list of runs
+    and its totals.
+    Up to MAX_SHARED_BASKETS baskets are remembered at once.
+
+    >>> events = list(iter_events(['4 Close 1\\n', '\\n',
+    ...                            '2 Arrive Bo Gum 1 Gum 1 Gum 10\\n']))
+    >>> [event.timestamp for event in events]
+    [4, 2]
+    >>> runs = events[1].customer.get_item_runs()
+    >>> [(item.name, item.get_time(), count) for item, count in runs]
+    [('Gum', 1, 2), ('Gum', 10, 1)]
+    """
+    shared_runs = {}
+    baskets = {}
+    for line in lines:
+        tokens = line.split(None, 3)
+        if not tokens:
+            continue
+        if tokens[1] == 'Arrive':
+            basket = tokens[3] if len(tokens) == 4 else ''
+            shared = baskets.get(basket)
+            if shared is None:
+                runs = _parse_runs(basket, shared_runs)
+                shared = (runs, run_totals(runs))
+                if len(baskets) == MAX_SHARED_BASKETS:
+                    baskets.clear()
+                baskets[basket] = shared
+            yield CustomerArrival(int(tokens[0]),
+                                  Customer.from_runs(tokens[2], *shared))
+        else:
+            yield CloseLine(int(tokens[0]), int(tokens[2]))
+
+
+def _parse_runs(basket: str, shared_runs: Dict[str, List[Tuple[Item, int]]]
+                ) -> List[Tuple[Item, int]]:
+    """Return the items in <basket>, the 'name time' tokens of an Arrive
+    line, as (item, count) pairs for each run of the same item in a row.
+
+    Each run is found by a single regular expression match, instead of
+    comparing the tokens one at a time. <shared_runs> maps each item's
+    tokens to its pairs for runs of 1, 2, ... items, so that equal pairs of
+    up to MAX_SHARED_RUN items are shared; it is extended as needed.
+
+    >>> runs = _parse_runs('Gum 1 Gum 1  Gum 1 Bread 3\\n', {})
+    >>> [(item.name, count) for item, count in runs]
+    [('Gum', 3), ('Bread', 1)]
+    """
+    if '  ' in basket or '\t' in basket:
+        basket = ' '.join(basket.split())
+    runs = []
+    for item_token, repeats in _ITEM_RUNS.findall(basket):
+        count = 1 + len(repeats) // (len(item_token) + 1)
+        item_runs = shared_runs.get(item_token)
+        if item_runs is None:
+            name, time = item_token.split()
+            item_runs = [(Item(sys.intern(name), int(time)), 1)]
+            shared_runs[item_token] = item_runs
+        if count > len(item_runs):
+            item = item_runs[0][0]
+            if count > MAX_SHARED_RUN:
+                runs.append((item, count))
+                continue
+            item_runs.extend((item, n)
+                             for n in range(len(item_runs) + 1, count + 1))
+        runs.append(item_runs[count - 1])
+    return runs
+
+
+def sorted_events(event_file: TextIO, run_size: int = RUN_SIZE
+                  ) -> Iterator[Event]:
+    """Yield the Events in <event_file> in order of timestamp, with events
+    that have the same timestamp in the order they appear in the file.
+
+    At most <run_size> lines are held in memory at once. A file with more
+    lines than that is sorted <run_size> lines at a time, each sorted run is
+    spilled to a temporary file, and the runs are merged as events are
+    needed. Whenever MAX_OPEN_RUNS runs of the same size have been spilled,
+    they are merged into a single, larger run, so only a few temporary files
+    are open at once even for very large files.
+
+    Precondition: <event_file> is in the format specified by the assignment
+    handout, and run_size > 0.
+
+    >>> import io
+    >>> events = sorted_events(io.StringIO('''4 Close 1
+    ... 10 Close 2
+    ... 2 Close 3
+    ... 4 Close 4
+    ... '''), run_size=2)
+    >>> [(event.timestamp, event.line_number) for event in events]
+    [(2, 3), (4, 1), (4, 4), (10, 2)]
+    """
+    run = []
+    # levels[i] holds the spilled runs made by merging MAX_OPEN_RUNS runs
+    # from levels[i - 1], or by sorting <run_size> lines if i is 0
+    levels = [[]]
+    try:
+        for line in event_file:
+            if not line.strip():
+                continue
+            run.append(line if line.endswith('\n') else line + '\n')
+            if len(run) == run_size:
+                levels[0].append(_spill(run))
+                run = []
+                for i, level in enumerate(levels):
+                    if len(level) < MAX_OPEN_RUNS:
+                        break
+                    if i + 1 == len(levels):
+                        levels.append([])
+                    levels[i + 1].append(_merge_runs(level))
+                    level.clear()
+        run.sort(key=_line_timestamp)
+        if not any(levels):
+            yield from iter_events(run)
+            return
+        levels[0].append(_spill(run))
+        del run
+        runs = [spilled for level in reversed(levels) for spilled in level]
+        yield from iter_events(heapq.merge(*runs, key=_line_timestamp))
+    finally:
+        for level in levels:
+            for spilled in level:
+                spilled.close()
+
+
+def _merge_runs(runs: List[TextIO]) -> TextIO:
+    """Merge the spilled <runs> into a new temporary file, ready to be read,
+    and close them.
+
+    Lines with the same timestamp are kept in the order of <runs>.
+    """
+    merged = tempfile.TemporaryFile('w+')
+    try:
+        merged.writelines(heapq.merge(*runs, key=_line_timestamp))
+    finally:
+        for spilled in runs:
+            spilled.close()
+    merged.seek(0)
+    return merged
+
+
+def _line_timestamp(line: str) -> int:
+    """Return the timestamp of the event on <line>.
+
+    >>> _line_timestamp('10 Arrive Tamara Bananas 7\\n')
+    10
+    """
+    return int(line.split(None, 1)[0])
+
+
+def _spill(lines: List[str]) -> TextIO:
+    """Sort <lines> by timestamp, keeping lines with the same timestamp in
+    order, and return a temporary file holding them, ready to be read.
     """
+    lines.sort(key=_line_timestamp)
+    spilled = tempfile.TemporaryFile('w+')
+    spilled.writelines(lines)
+    spilled.seek(0)
+    return spilled
 
 
 if __name__ == '__main__':
@@ -298,5 +562,6 @@ if __name__ == '__main__':
     doctest.testmod()
     import python_ta
     python_ta.check_all(config={
-        'allowed-import-modules': ['__future__', 'typing', 'store',
-                                   'python_ta', 'doctest']})
+        'allowed-import-modules': ['__future__', 'typing', 'heapq',
+                                   'operator', 're', 'sys', 'tempfile',
+                                   'store', 'python_ta', 'doctest']})
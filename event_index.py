@@ -0,0 +1,218 @@
+"""Assignment 1 - Event file indexes
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module builds sidecar indexes for event files, so that the events in a
+window of time can be read without reading the whole file.
+
+The index for an event file at <path> is written to <path>.idx. If the event
+file is sorted by timestamp, the index records the timestamp and byte offset
+of every INDEX_STRIDE-th line. Otherwise, the event file is compiled into a
+sorted EventTrace at <path>.trace, which can be searched directly, and the
+index records that it was. Either way, the index also records the size and
+modification time of the event file, and is ignored once the file changes.
+
+All numbers in an index are little-endian. It has a header of the bytes
+b'GSIX', the format version, the kind of index (SORTED_TEXT or COMPILED),
+the size and modification time of the event file in nanoseconds, and the
+number of entries, followed by the (timestamp, offset) entries.
+"""
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+import bisect
+import io
+import itertools
+import os
+import struct
+from event import iter_events, sorted_events, Event
+from event_trace import compile_events, EventTrace
+
+# The format version written by build_index
+VERSION = 1
+
+# The kinds of index
+SORTED_TEXT = 0
+COMPILED = 1
+
+# The number of lines between index entries for a sorted event file
+INDEX_STRIDE = 1024
+
+_HEADER = struct.Struct('<4sHHQqQ')
+_ENTRY = struct.Struct('<qQ')
+_MAGIC = b'GSIX'
+
+
+def index_path(event_path: str) -> str:
+    """Return the path of the index for the event file at <event_path>.
+
+    >>> index_path('input_files/events_base.txt')
+    'input_files/events_base.txt.idx'
+    """
+    return event_path + '.idx'
+
+
+def trace_path(event_path: str) -> str:
+    """Return the path of the compiled trace for the event file at
+    <event_path>, which is only written if that file is not sorted.
+
+    >>> trace_path('input_files/events_base.txt')
+    'input_files/events_base.txt.trace'
+    """
+    return event_path + '.trace'
+
+
+def build_index(event_path: str, stride: int = INDEX_STRIDE) -> bool:
+    """Build the index for the event file at <event_path>, replacing any old
+    index, and return whether the file is sorted by timestamp.
+
+    If the file is not sorted, it is compiled into a trace at
+    trace_path(<event_path>) as well.
+
+    Precondition: the file at <event_path> is in the format specified by the
+    assignment handout, and stride > 0.
+    """
+    entries: List[Tuple[int, int]] = []
+    is_sorted = True
+    previous = None
+    offset = 0
+    count = 0
+    with open(event_path, 'rb') as event_file:
+        for line in event_file:
+            tokens = line.split(None, 1)
+            if tokens:
+                timestamp = int(tokens[0])
+                if previous is not None and timestamp < previous:
+                    is_sorted = False
+                    break
+                if count % stride == 0:
+                    entries.append((timestamp, offset))
+                previous = timestamp
+                count += 1
+            offset += len(line)
+
+    kind = SORTED_TEXT
+    if not is_sorted:
+        kind = COMPILED
+        entries = []
+        with open(event_path, encoding='utf-8') as event_file:
+            compile_events(event_file, trace_path(event_path))
+    status = os.stat(event_path)
+    with open(index_path(event_path), 'wb') as index:
+        index.write(_HEADER.pack(_MAGIC, VERSION, kind, status.st_size,
+                                 status.st_mtime_ns, len(entries)))
+        for entry in entries:
+            index.write(_ENTRY.pack(*entry))
+    return is_sorted
+
+
+def windowed_events(event_file: TextIO, start: Optional[int] = None,
+                    end: Optional[int] = None, skip: int = 0
+                    ) -> Iterator[Event]:
+    """Yield the events in <event_file> from time <start> up to but not
+    including time <end>, in order of timestamp, with events that have the
+    same timestamp in the order they appear in the file.
+
+    A bound that is None leaves that side of the window open. If
+    <event_file> has a current index, the window is found through it, and
+    <event_file> itself is not read. Otherwise, the whole file is read with
+    sorted_events.
+
+    The first <skip> events in the window are left out as well. If the
+    index compiled <event_file> into a trace, they are not read at all;
+    otherwise, they are read and dropped.
+
+    Precondition: <event_file> is in the format specified by the assignment
+    handout.
+    """
+    path = getattr(event_file, 'name', None)
+    index = _read_index(path) if isinstance(path, str) else None
+    if index is None:
+        events = sorted_events(event_file)
+        if start is not None:
+            events = (event for event in events if event.timestamp >= start)
+        yield from itertools.islice(_until(events, end), skip, None)
+    elif index[0] == COMPILED:
+        with EventTrace(trace_path(path)) as trace:
+            yield from trace.events(start, end, skip)
+    else:
+        timestamps, offsets = index[1]
+        position = 0
+        if start is not None:
+            entry = bisect.bisect_left(timestamps, start)
+            if entry > 0:
+                position = offsets[entry - 1]
+        with open(path, 'rb') as raw:
+            raw.seek(position)
+            lines = io.TextIOWrapper(raw, encoding='utf-8')
+            yield from itertools.islice(
+                _until(iter_events(_from(lines, start)), end), skip, None)
+
+
+def _read_index(event_path: str
+                ) -> Optional[Tuple[int, Tuple[List[int], List[int]]]]:
+    """Return the kind of index for the event file at <event_path>, and the
+    timestamps and offsets of its entries, or None if that file has no
+    current index.
+    """
+    try:
+        status = os.stat(event_path)
+        with open(index_path(event_path), 'rb') as index:
+            data = index.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, kind, size, mtime, num_entries = \
+        _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != VERSION or size != status.st_size \
+            or mtime != status.st_mtime_ns \
+            or len(data) != _HEADER.size + _ENTRY.size * num_entries \
+            or kind == COMPILED and not os.path.exists(trace_path(event_path)):
+        return None
+    timestamps = []
+    offsets = []
+    for timestamp, offset in _ENTRY.iter_unpack(data[_HEADER.size:]):
+        timestamps.append(timestamp)
+        offsets.append(offset)
+    return kind, (timestamps, offsets)
+
+
+def _from(lines: Iterable[str], start: Optional[int]) -> Iterator[str]:
+    """Yield the lines in <lines> from the first one with an event at or
+    after time <start>, or all of them if <start> is None.
+
+    Precondition: the events in <lines> are sorted by timestamp.
+    """
+    lines = iter(lines)
+    if start is not None:
+        for line in lines:
+            tokens = line.split(None, 1)
+            if tokens and int(tokens[0]) >= start:
+                yield line
+                break
+    yield from lines
+
+
+def _until(events: Iterable[Event], end: Optional[int]) -> Iterator[Event]:
+    """Yield the events in <events> up to the first one at or after time
+    <end>, or all of them if <end> is None.
+
+    Precondition: <events> are sorted by timestamp.
+    """
+    for event in events:
+        if end is not None and event.timestamp >= end:
+            return
+        yield event
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'bisect', 'io',
+                                   'itertools', 'os', 'struct', 'event',
+                                   'event_trace', 'python_ta', 'doctest']})
@@ -0,0 +1,144 @@
+"""Assignment 1 - Simulation profiling
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains an opt-in profile of where a GroceryStoreSimulation
+spends its time, for the simulation to update as it processes each event.
+
+For each type of event, the profile counts the events, times their handlers,
+and counts the retries: customers they turn away from the lines, who will
+try joining one again. It also records the most events that were ever
+pending at once. The whole run can be profiled with cProfile as well.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import cProfile
+import time
+
+
+class SimulationProfile:
+    """A profile of the events processed by a GroceryStoreSimulation.
+
+    Pass a SimulationProfile to a GroceryStoreSimulation to have it updated
+    by run(). A simulation without one does no timing at all.
+
+    === Attributes ===
+    dump_path: The file to write cProfile statistics for each run to, or
+               None if runs are not profiled with cProfile.
+
+    === Private Attributes ===
+    _stats: For each type of event, by name, a list of how many were
+            processed, the total and the longest time in seconds spent in
+            their handlers, the time spent outside their handlers, and how
+            many customers they turned away.
+    _high_water: The most events that were pending at once.
+    _wall_time: The total time spent in run().
+    _started: The time the current run started, or None if no run is in
+              progress.
+    _profiler: The cProfile profiler for the current run, or None.
+    """
+    dump_path: Optional[str]
+    _stats: Dict[str, List[Any]]
+    _high_water: int
+    _wall_time: float
+    _started: Optional[float]
+    _profiler: Optional[cProfile.Profile]
+
+    def __init__(self, dump_path: Optional[str] = None) -> None:
+        """Initialize an empty profile, which writes cProfile statistics for
+        each run to <dump_path> unless it is None.
+        """
+        self.dump_path = dump_path
+        self._stats = {}
+        self._high_water = 0
+        self._wall_time = 0.0
+        self._started = None
+        self._profiler = None
+
+    def start(self) -> None:
+        """Start timing a run, and profiling it with cProfile if dump_path is
+        not None.
+        """
+        if self.dump_path is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        """Stop timing the current run, and write its cProfile statistics to
+        dump_path if it is not None.
+        """
+        if self._started is not None:
+            self._wall_time += time.perf_counter() - self._started
+            self._started = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.dump_path)
+            self._profiler = None
+
+    def record(self, event_type: str, handler_time: float, other_time: float,
+               pending: int, retries: int) -> None:
+        """Record that an event of type <event_type> was processed, spending
+        <handler_time> seconds in its handler and <other_time> seconds
+        outside it, that <pending> events were pending afterwards, and that
+        it turned <retries> customers away from the lines.
+
+        >>> profile = SimulationProfile()
+        >>> profile.record('CustomerArrival', 0.5, 0.25, 3, 1)
+        >>> profile.record('CustomerArrival', 0.25, 0.25, 2, 0)
+        >>> profile.report()['events']['CustomerArrival']['max_time']
+        0.5
+        """
+        stats = self._stats.get(event_type)
+        if stats is None:
+            stats = [0, 0.0, 0.0, 0.0, 0]
+            self._stats[event_type] = stats
+        stats[0] += 1
+        stats[1] += handler_time
+        if handler_time > stats[2]:
+            stats[2] = handler_time
+        stats[3] += other_time
+        stats[4] += retries
+        if pending > self._high_water:
+            self._high_water = pending
+
+    def report(self) -> Dict[str, Any]:
+        """Return a dictionary of this profile.
+
+        'events' maps the name of each type of event to its 'count', the
+        'total_time' and 'max_time' of its handlers, its 'other_time' spent
+        taking events from the queue and adding the events they caused, and
+        the customers it turned away, who will retry ('retries').
+        'queue_high_water' is the most events that were pending at once, and
+        'wall_time' is the total time spent in run().
+
+        >>> profile = SimulationProfile()
+        >>> profile.record('CloseLine', 0.5, 0.25, 3, 2)
+        >>> report = profile.report()
+        >>> report['events']
+        {'CloseLine': {'count': 1, 'total_time': 0.5, 'max_time': 0.5, \
+'other_time': 0.25, 'retries': 2}}
+        >>> report['queue_high_water']
+        3
+        """
+        return {
+            'events': {
+                event_type: {'count': stats[0], 'total_time': stats[1],
+                             'max_time': stats[2], 'other_time': stats[3],
+                             'retries': stats[4]}
+                for event_type, stats in self._stats.items()},
+            'queue_high_water': self._high_water,
+            'wall_time': self._wall_time
+        }
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'cProfile', 'time',
+                                   'python_ta', 'doctest']})
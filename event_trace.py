@@ -0,0 +1,362 @@
+"""Assignment 1 - Compiled event traces
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module compiles event files into a binary trace, which can be replayed
+many times without parsing the text again.
+
+A trace holds its events sorted by timestamp, with events that have the same
+timestamp in the order they appear in the event file, so it is read in the
+order the simulation needs. All numbers are little-endian, and the trace is
+made of these sections, one after another:
+
+- A header: the bytes b'GSET', the format version, and the number of events,
+  runs, items and strings.
+- The events, as fixed-width records of a timestamp, a type (ARRIVE or
+  CLOSE), a subject (the index of the customer's name in the string table,
+  or the line number for CLOSE), and the index and number of the customer's
+  item runs.
+- The item runs, as (item index, count) records. Customers with the same
+  basket share their runs.
+- The items, as (name index, time) records.
+- The string table: the offset of each string in the string data, followed
+  by one more offset for the end of the data, and then the string data, in
+  UTF-8, with a newline after each string. The customers' names come first,
+  in the order of their events, followed by the names of the items.
+
+EventTrace memory-maps a trace, and reads the records straight from the
+mapped file as events are needed.
+"""
+from __future__ import annotations
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+from event import sorted_events, CloseLine, CustomerArrival, Event, \
+    MAX_SHARED_BASKETS, RUN_SIZE
+from store import run_totals, Customer, Item
+
+# The format version written by compile_events
+VERSION = 1
+
+# The types of event records
+ARRIVE = 0
+CLOSE = 1
+
+_HEADER = struct.Struct('<4sHHQQQQ')
+_EVENT = struct.Struct('<qIIII')
+_PAIR = struct.Struct('<II')
+_OFFSET = struct.Struct('<Q')
+_STRING = struct.Struct('<QQ')
+_TIMESTAMP = struct.Struct('<q')
+_MAGIC = b'GSET'
+
+# The number of names EventTrace decodes at once
+_NAME_CHUNK = 4096
+
+
+def compile_events(event_file: TextIO, path: str, run_size: int = RUN_SIZE
+                   ) -> int:
+    """Compile the events in <event_file> into a trace at <path>, and return
+    the number of events in it.
+
+    The events are sorted as by sorted_events, holding at most <run_size>
+    lines of <event_file> in memory at once.
+
+    Precondition: <event_file> is in the format specified by the assignment
+    handout, and run_size > 0.
+    """
+    num_events = 0
+    num_runs = 0
+    num_names = 0
+    items: Dict[Tuple[str, int], int] = {}
+    item_names: Dict[str, int] = {}
+    item_records: List[Tuple[int, int]] = []
+    baskets: Dict[int, Tuple[List[Tuple[Item, int]], int]] = {}
+    with open(path, 'wb') as trace, \
+            tempfile.TemporaryFile() as runs, \
+            _StringTable() as strings:
+        trace.write(bytes(_HEADER.size))
+        for event in sorted_events(event_file, run_size):
+            num_events += 1
+            if isinstance(event, CloseLine):
+                trace.write(_EVENT.pack(event.timestamp, CLOSE,
+                                        event.line_number, 0, 0))
+                continue
+            customer_runs = event.customer.get_item_runs()
+            basket = baskets.get(id(customer_runs))
+            if basket is None or basket[0] is not customer_runs:
+                for item, count in customer_runs:
+                    key = (item.name, item.get_time())
+                    index = items.get(key)
+                    if index is None:
+                        index = len(item_records)
+                        items[key] = index
+                        item_records.append((
+                            item_names.setdefault(item.name, len(item_names)),
+                            item.get_time()))
+                    runs.write(_PAIR.pack(index, count))
+                if len(baskets) == MAX_SHARED_BASKETS:
+                    baskets.clear()
+                basket = (customer_runs, num_runs)
+                baskets[id(customer_runs)] = basket
+                num_runs += len(customer_runs)
+            strings.add(event.customer.name)
+            trace.write(_EVENT.pack(event.timestamp, ARRIVE, num_names,
+                                    basket[1], len(customer_runs)))
+            num_names += 1
+        for name in item_names:
+            strings.add(name)
+
+        runs.seek(0)
+        shutil.copyfileobj(runs, trace)
+        for name, time in item_records:
+            trace.write(_PAIR.pack(num_names + name, time))
+        strings.write_to(trace)
+        trace.seek(0)
+        trace.write(_HEADER.pack(_MAGIC, VERSION, 0, num_events, num_runs,
+                                 len(item_records), len(strings)))
+    return num_events
+
+
+class _StringTable:
+    """A string table being written to temporary files.
+
+    === Private Attributes ===
+    _offsets: The offsets of the strings added so far.
+    _data: The data of the strings added so far, each followed by a newline.
+    _size: The number of bytes in _data.
+    _count: The number of strings added so far.
+    """
+    _offsets: BinaryIO
+    _data: BinaryIO
+    _size: int
+    _count: int
+
+    def __init__(self) -> None:
+        """Initialize an empty string table.
+        """
+        self._offsets = tempfile.TemporaryFile()
+        self._data = tempfile.TemporaryFile()
+        self._size = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of strings in this table.
+        """
+        return self._count
+
+    def __enter__(self) -> _StringTable:
+        """Return this table, to be closed at the end of a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the temporary files of this table.
+        """
+        self._offsets.close()
+        self._data.close()
+
+    def add(self, text: str) -> None:
+        """Add <text> to the end of this table.
+
+        Precondition: <text> has no newlines.
+        """
+        data = text.encode('utf-8') + b'\n'
+        self._offsets.write(_OFFSET.pack(self._size))
+        self._data.write(data)
+        self._size += len(data)
+        self._count += 1
+
+    def write_to(self, trace: BinaryIO) -> None:
+        """Write this table to <trace>: the offsets, the offset of the end of
+        the data, and then the data.
+        """
+        self._offsets.seek(0)
+        shutil.copyfileobj(self._offsets, trace)
+        trace.write(_OFFSET.pack(self._size))
+        self._data.seek(0)
+        shutil.copyfileobj(self._data, trace)
+
+
+class EventTrace:
+    """A compiled event trace, memory-mapped for reading.
+
+    Records are read from the mapped file without copying it, and an Event
+    is only built when it is needed.
+
+    === Private Attributes ===
+    _map: The memory map of the trace file, or None if it has been closed.
+    _view: A view of all of _map.
+    _offsets_start: The position of the string offsets in _view.
+    _items: The items in the trace, in the order of their records.
+    _num_events: The number of events in the trace.
+    _num_strings: The number of strings in the string table.
+    _runs_start: The position of the item run records in _view.
+    _strings_start: The position of the string data in _view.
+    """
+    _map: Optional[mmap.mmap]
+    _view: memoryview
+    _offsets_start: int
+    _items: List[Item]
+    _num_events: int
+    _num_strings: int
+    _runs_start: int
+    _strings_start: int
+
+    def __init__(self, path: str) -> None:
+        """Open the trace at <path>, which was written by compile_events.
+
+        Raise ValueError if <path> is not a trace in this format version.
+        """
+        with open(path, 'rb') as trace:
+            header = trace.read(_HEADER.size)
+            if len(header) < _HEADER.size or header[:4] != _MAGIC:
+                raise ValueError('{} is not an event trace'.format(path))
+            _, version, _, num_events, num_runs, num_items, num_strings = \
+                _HEADER.unpack(header)
+            if version != VERSION:
+                raise ValueError('{} is not a version {} event trace'.format(
+                    path, VERSION))
+            self._map = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._num_events = num_events
+        self._num_strings = num_strings
+        self._runs_start = _HEADER.size + _EVENT.size * num_events
+        items_start = self._runs_start + _PAIR.size * num_runs
+        offsets_start = items_start + _PAIR.size * num_items
+        self._strings_start = offsets_start + \
+            _OFFSET.size * (num_strings + 1)
+        self._offsets_start = offsets_start
+        self._items = [Item(sys.intern(self._string(name)), time)
+                       for name, time in _PAIR.iter_unpack(
+                           self._view[items_start:offsets_start])]
+
+    def __len__(self) -> int:
+        """Return the number of events in this trace.
+        """
+        return self._num_events
+
+    def __enter__(self) -> EventTrace:
+        """Return this trace, to be closed at the end of a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close this trace.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Close this trace.
+
+        Events already built are not affected. If events() is still being
+        iterated over, the file stays mapped until that iteration is done.
+        """
+        if self._map is None:
+            return
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._map = None
+
+    def events(self, start: Optional[int] = None, end: Optional[int] = None,
+               skip: int = 0) -> Iterator[Event]:
+        """Yield the events in this trace, in order of timestamp, building
+        each one as it is needed.
+
+        If <start> is not None, events before time <start> are skipped, and
+        if <end> is not None, events at time <end> or later are left out.
+        The first <skip> events in the window are left out as well. The first
+        event yielded is found by binary search, without reading the records
+        before it.
+
+        Customers with the same basket share their list of item runs, as in
+        event.iter_events. A basket is known by both its first run and its
+        number of runs, since an empty basket starts at the same run as the
+        basket compiled after it.
+        """
+        first = 0 if start is None else self.find(start)
+        last = self._num_events if end is None else self.find(end)
+        first = min(first + skip, last)
+        baskets = {}
+        items = self._items
+        runs = self._view[self._runs_start:]
+        records = self._view[_HEADER.size + _EVENT.size * first:
+                             _HEADER.size + _EVENT.size * last]
+        names = None
+        for timestamp, kind, subject, first_run, num_runs in \
+                _EVENT.iter_unpack(records):
+            if kind == CLOSE:
+                yield CloseLine(timestamp, subject)
+                continue
+            if names is None:
+                names = self._names(subject)
+            basket = baskets.get((first_run, num_runs))
+            if basket is None:
+                offset = first_run * _PAIR.size
+                run_records = runs[offset:offset + num_runs * _PAIR.size]
+                basket_runs = [(items[item], count) for item, count in
+                               _PAIR.iter_unpack(run_records)]
+                basket = (basket_runs, run_totals(basket_runs))
+                if len(baskets) == MAX_SHARED_BASKETS:
+                    baskets.clear()
+                baskets[(first_run, num_runs)] = basket
+            yield CustomerArrival(timestamp,
+                                  Customer.from_runs(next(names), *basket))
+
+    def find(self, timestamp: int) -> int:
+        """Return the number of events in this trace before time
+        <timestamp>.
+        """
+        low = 0
+        high = self._num_events
+        while low < high:
+            middle = (low + high) // 2
+            if _TIMESTAMP.unpack_from(
+                    self._view, _HEADER.size + _EVENT.size * middle)[0] \
+                    < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _names(self, first: int) -> Iterator[str]:
+        """Yield the strings in the string table, starting at index <first>.
+
+        The strings are decoded _NAME_CHUNK at a time.
+        """
+        data = self._view[self._strings_start:]
+        while first < self._num_strings:
+            stop = min(first + _NAME_CHUNK, self._num_strings)
+            start, = _OFFSET.unpack_from(
+                self._view, self._offsets_start + _OFFSET.size * first)
+            end, = _OFFSET.unpack_from(
+                self._view, self._offsets_start + _OFFSET.size * stop)
+            yield from str(data[start:end - 1], 'utf-8').split('\n')
+            first = stop
+
+    def _string(self, index: int) -> str:
+        """Return the string at <index> in the string table.
+        """
+        start, end = _STRING.unpack_from(
+            self._view, self._offsets_start + _OFFSET.size * index)
+        return str(self._view[self._strings_start + start:
+                              self._strings_start + end - 1], 'utf-8')
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'mmap', 'shutil',
+                                   'struct', 'sys', 'tempfile', 'event',
+                                   'store', 'python_ta', 'doctest']})
@@ -0,0 +1,231 @@
+"""Assignment 1 - Incremental simulation of growing event logs
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module simulates an event log that a store keeps appending to, without
+simulating the whole log again each time it grows.
+
+The simulation is kept between updates. Each update reads only the lines
+appended since the last one, feeds their events to the simulation, and
+processes every event before the latest timestamp read so far, the
+committed horizon, since events appended later cannot happen before it. The
+statistics of the whole log are then found by finishing a copy of the
+simulation from a checkpoint, which only involves the events still pending.
+
+Checkpoints are also kept every so often. If an appended event is earlier
+than the committed horizon, the simulation is rolled back to the latest
+checkpoint whose horizon is not after that event, and the log is read again
+from where that checkpoint was taken.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from io import StringIO
+import os
+import tempfile
+from event import iter_events, Event
+from simulation import GroceryStoreSimulation
+
+# The number of events read from the log between the checkpoints kept for
+# rollback by default
+ROLLBACK_EVENTS = 10000
+
+# The number of checkpoints kept for rollback by default
+MAX_CHECKPOINTS = 8
+
+
+class IncrementalSimulation:
+    """A simulation of an event log that is only ever appended to.
+
+    Call update() whenever the log has grown to get the statistics of
+    simulating all of it, as GroceryStoreSimulation.run would give. Close
+    the simulation once it is no longer needed, to remove its checkpoints.
+
+    === Attributes ===
+    rollbacks: How many times an appended event was earlier than the
+               committed horizon, so that the simulation was rolled back.
+
+    === Private Attributes ===
+    _config: The store configuration, as the text of a config file.
+    _event_path: The path of the event log.
+    _directory: The temporary directory holding the checkpoints, or None
+                once this simulation is closed.
+    _simulation: The simulation of the events read from the log, with every
+                 event before _horizon processed.
+    _offset: The position in the log just after the last line read.
+    _horizon: The latest timestamp of the events read from the log, or None
+              if none have been read.
+    _checkpoints: The checkpoints kept for rollback, oldest first, as
+                  (horizon, offset, path) tuples: restoring the checkpoint at
+                  path gives the simulation as it was when _horizon was
+                  horizon and _offset was offset.
+    _events_read: How many events have been read from the log since the
+                  last checkpoint kept for rollback.
+    _rollback_events: How many events are read from the log between the
+                      checkpoints kept for rollback.
+    _max_checkpoints: The most checkpoints kept for rollback at once.
+    _checkpoints_taken: How many checkpoints have been kept for rollback.
+
+    === Representation Invariants ===
+    - The horizons of _checkpoints are in increasing order, and so are their
+      offsets.
+    - Every event in the log after the offset of a checkpoint is at or after
+      its horizon.
+    """
+    rollbacks: int
+    _config: str
+    _event_path: str
+    _directory: Optional[tempfile.TemporaryDirectory]
+    _simulation: GroceryStoreSimulation
+    _offset: int
+    _horizon: Optional[int]
+    _checkpoints: List[Tuple[int, int, str]]
+    _events_read: int
+    _rollback_events: int
+    _max_checkpoints: int
+    _checkpoints_taken: int
+
+    def __init__(self, config_path: str, event_path: str,
+                 rollback_events: int = ROLLBACK_EVENTS,
+                 max_checkpoints: int = MAX_CHECKPOINTS) -> None:
+        """Initialize a simulation of the event log at <event_path> in the
+        store configured by the file at <config_path>, which has not read
+        the log yet.
+
+        A checkpoint is kept for rollback each time at least
+        <rollback_events> events have been read since the last one, and
+        the <max_checkpoints> most recent ones are kept.
+
+        Precondition: rollback_events > 0 and max_checkpoints > 0
+        """
+        with open(config_path) as config_file:
+            self._config = config_file.read()
+        self._event_path = event_path
+        self._directory = tempfile.TemporaryDirectory()
+        self._simulation = GroceryStoreSimulation(StringIO(self._config))
+        self._offset = 0
+        self._horizon = None
+        self._checkpoints = []
+        self._events_read = 0
+        self._rollback_events = rollback_events
+        self._max_checkpoints = max_checkpoints
+        self._checkpoints_taken = 0
+        self.rollbacks = 0
+
+    def __enter__(self) -> IncrementalSimulation:
+        """Return this simulation, to be closed at the end of a with
+        statement.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close this simulation.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Remove the checkpoints of this simulation.
+        """
+        if self._directory is not None:
+            self._directory.cleanup()
+            self._directory = None
+
+    def update(self) -> Dict[str, int]:
+        """Read the events appended to the log since the last update, and
+        return the statistics of simulating every event in the log.
+
+        Only complete lines are read; a line still being written is read by
+        a later update. The time taken grows with the number of new events
+        and of pending events, not with the length of the log, unless an
+        event earlier than the committed horizon was appended.
+
+        Precondition: this simulation is not closed, and lines are only ever
+        appended to the log, in the format specified by the assignment
+        handout.
+        """
+        events, end = self._read()
+        if events and self._horizon is not None and \
+                events[0].timestamp < self._horizon:
+            self.rollbacks += 1
+            self._roll_back(events[0].timestamp)
+            events, end = self._read()
+        self._offset = end
+        if events:
+            self._simulation.feed(events)
+            self._horizon = events[-1].timestamp
+            self._simulation.advance(self._horizon)
+            self._events_read += len(events)
+        latest = os.path.join(self._directory.name, 'latest')
+        self._simulation.checkpoint(latest)
+        finished = GroceryStoreSimulation(StringIO(self._config))
+        finished.restore(latest)
+        stats = finished.advance()
+        if self._events_read >= self._rollback_events:
+            self._keep(latest)
+        return stats
+
+    def _read(self) -> Tuple[List[Event], int]:
+        """Return the events in the complete lines of the log after _offset,
+        sorted by timestamp, with events that have the same timestamp in
+        the order they appear, and the position just after those lines.
+        """
+        with open(self._event_path, 'rb') as log:
+            log.seek(self._offset)
+            data = log.read()
+        end = data.rfind(b'\n') + 1
+        events = list(iter_events(
+            data[:end].decode('utf-8').splitlines(keepends=True)))
+        events.sort(key=lambda event: event.timestamp)
+        return events, self._offset + end
+
+    def _keep(self, latest: str) -> None:
+        """Keep the checkpoint at <latest>, of the simulation as it is now,
+        for rollback, removing the oldest one if too many are kept.
+        """
+        path = os.path.join(self._directory.name,
+                            str(self._checkpoints_taken))
+        os.replace(latest, path)
+        self._checkpoints.append((self._horizon, self._offset, path))
+        self._checkpoints_taken += 1
+        self._events_read = 0
+        if len(self._checkpoints) > self._max_checkpoints:
+            os.remove(self._checkpoints.pop(0)[2])
+
+    def _roll_back(self, timestamp: int) -> None:
+        """Roll the simulation back to the latest checkpoint kept for rollback
+        whose horizon is at or before <timestamp>, or to the start of the
+        log if there is none, discarding the later checkpoints.
+        """
+        while self._checkpoints and self._checkpoints[-1][0] > timestamp:
+            os.remove(self._checkpoints.pop()[2])
+        self._simulation = GroceryStoreSimulation(StringIO(self._config))
+        self._events_read = 0
+        if self._checkpoints:
+            self._horizon, self._offset, path = self._checkpoints[-1]
+            self._simulation.restore(path)
+        else:
+            self._horizon = None
+            self._offset = 0
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as demo:
+        log_path = os.path.join(demo, 'events.txt')
+        with open('input_files/events_mixtures.txt') as source, \
+                open(log_path, 'w') as log_file, \
+                IncrementalSimulation('input_files/config_111_10.json',
+                                      log_path, rollback_events=5) as live:
+            for number, event_line in enumerate(source):
+                log_file.write(event_line)
+                log_file.flush()
+                print(number, live.update())
+            print('rollbacks:', live.rollbacks)
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'io', 'os',
+                                   'tempfile', 'event', 'simulation',
+                                   'python_ta', 'doctest']})
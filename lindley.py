@@ -0,0 +1,252 @@
+"""Assignment 1 - Single line fast path
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module computes the statistics of simulating a store with a single
+checkout line and no closures directly, without simulating its events.
+
+With one line, customers are checked out in the order they arrive, so each
+customer starts checking out when they arrive or when the customer before
+them finishes, whichever is later (Lindley's recurrence). A customer finds
+the line full if the customer <capacity> places ahead of them has not
+finished before they arrive, since everyone in between finishes no earlier.
+The recurrence is only used while no customer finds the line full; once one
+does, or the store or its events are not of this kind, the scenario is
+simulated by a GroceryStoreSimulation instead, so the statistics are always
+the same as the simulation's.
+
+Many scenarios are computed at once. If NumPy is installed, the recurrence
+runs across all the scenarios together, one customer at a time; otherwise,
+it runs over each scenario in turn.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from io import StringIO
+from event import iter_events, CustomerArrival
+from simulation import GroceryStoreSimulation
+from store import CheckoutLine, GroceryStore
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def lindley_stats(arrivals: Sequence[Sequence[int]],
+                  service_times: Sequence[Sequence[int]], capacity: int
+                  ) -> List[Optional[Dict[str, int]]]:
+    """Return the statistics of each scenario of customers arriving at a
+    single checkout line with <capacity>, or None for a scenario in which a
+    customer finds the line full.
+
+    The customers of scenario i arrive at the times in <arrivals>[i], in
+    the order they are processed, and take <service_times>[i] to check out.
+
+    Precondition: each arrivals[i] is sorted, has the same length as
+    service_times[i], and every service time is at least 0.
+
+    >>> lindley_stats([[0, 1, 10], [0, 0, 0]], [[5, 5, 1], [3, 3, 3]], 2)
+    [{'num_customers': 3, 'total_time': 11, 'max_wait': 9}, None]
+    >>> lindley_stats([[]], [[]], 1)
+    [{'num_customers': 0, 'total_time': 0, 'max_wait': -1}]
+    """
+    if numpy is not None and len(arrivals) > 1:
+        return _numpy_stats(arrivals, service_times, capacity)
+    return [_scenario_stats(scenario, times, capacity)
+            for scenario, times in zip(arrivals, service_times)]
+
+
+def _scenario_stats(arrivals: Sequence[int], service_times: Sequence[int],
+                    capacity: int) -> Optional[Dict[str, int]]:
+    """Return the statistics of one scenario of lindley_stats, or None if a
+    customer finds the line full.
+    """
+    # The finishing times of the last <capacity> customers
+    finished = deque(maxlen=max(capacity, 1))
+    done = 0
+    max_wait = -1
+    for arrival, service_time in zip(arrivals, service_times):
+        if capacity <= 0 or \
+                len(finished) == capacity and finished[0] >= arrival:
+            return None
+        done = max(arrival, done) + service_time
+        finished.append(done)
+        max_wait = max(max_wait, done - arrival)
+    return {'num_customers': len(arrivals), 'total_time': done,
+            'max_wait': max_wait}
+
+
+def _numpy_stats(arrivals: Sequence[Sequence[int]],
+                 service_times: Sequence[Sequence[int]], capacity: int
+                 ) -> List[Optional[Dict[str, int]]]:
+    """Return the statistics of lindley_stats, computing the recurrence for
+    every scenario at once with NumPy.
+    """
+    lengths = numpy.array([len(scenario) for scenario in arrivals],
+                          dtype=numpy.int64)
+    width = int(lengths.max(initial=0))
+    arrive = numpy.zeros((len(arrivals), width), dtype=numpy.int64)
+    serve = numpy.zeros((len(arrivals), width), dtype=numpy.int64)
+    for i, (scenario, times) in enumerate(zip(arrivals, service_times)):
+        arrive[i, :len(scenario)] = scenario
+        serve[i, :len(times)] = times
+    # The finishing times of the last <capacity> customers, by customer
+    # number modulo <capacity>
+    finished = numpy.zeros((len(arrivals), max(capacity, 1)),
+                           dtype=numpy.int64)
+    done = numpy.zeros(len(arrivals), dtype=numpy.int64)
+    max_wait = numpy.full(len(arrivals), -1, dtype=numpy.int64)
+    full = lengths > 0 if capacity <= 0 else numpy.zeros(len(arrivals),
+                                                        dtype=bool)
+    for k in range(width if capacity > 0 else 0):
+        active = k < lengths
+        column = arrive[:, k]
+        slot = k % capacity
+        if k >= capacity:
+            full |= active & (finished[:, slot] >= column)
+        finish = numpy.maximum(column, done) + serve[:, k]
+        done = numpy.where(active, finish, done)
+        finished[:, slot] = done
+        max_wait = numpy.where(
+            active, numpy.maximum(max_wait, finish - column), max_wait)
+    return [None if full[i] else
+            {'num_customers': int(lengths[i]), 'total_time': int(done[i]),
+             'max_wait': int(max_wait[i])}
+            for i in range(len(arrivals))]
+
+
+def run_single_line(config: str, event_texts: Sequence[str]
+                    ) -> List[Dict[str, int]]:
+    """Return the statistics of simulating each event file in <event_texts>
+    in the store configured by <config>, as GroceryStoreSimulation.run
+    would.
+
+    If the store has a single line, the event files without closures are
+    computed with lindley_stats, and the rest, as well as any in which a
+    customer finds the line full, are simulated.
+
+    Precondition: <config> and each of <event_texts> are the contents of
+    files in the format specified by the assignment handout.
+
+    >>> config = ('{"regular_count": 1, "express_count": 0, '
+    ...           '"self_serve_count": 0, "line_capacity": 1}')
+    >>> run_single_line(config, ['10 Arrive Tamara Bananas 7\\n'
+    ...                          '5 Arrive Jugo Bread 3 Cheese 3\\n'])
+    [{'num_customers': 2, 'total_time': 18, 'max_wait': 8}]
+    """
+    results: List[Optional[Dict[str, int]]] = [None] * len(event_texts)
+    line = _single_line(config)
+    if line is not None:
+        computed = []
+        arrivals = []
+        service_times = []
+        for i, text in enumerate(event_texts):
+            scenario = _scenario(text, type(line))
+            if scenario is not None:
+                computed.append(i)
+                arrivals.append(scenario[0])
+                service_times.append(scenario[1])
+        for i, stats in zip(computed, lindley_stats(arrivals, service_times,
+                                                    line.capacity)):
+            results[i] = stats
+    for i, text in enumerate(event_texts):
+        if results[i] is None:
+            simulation = GroceryStoreSimulation(StringIO(config))
+            results[i] = simulation.run(StringIO(text))
+    return results
+
+
+def _single_line(config: str) -> Optional[CheckoutLine]:
+    """Return the only line in the store configured by <config>, or None if
+    the store does not have exactly one line.
+
+    >>> line = _single_line('{"regular_count": 0, "express_count": 0, '
+    ...                     '"self_serve_count": 1, "line_capacity": 10}')
+    >>> type(line).__name__, line.capacity
+    ('SelfServeLine', 10)
+    >>> _single_line('{"regular_count": 1, "express_count": 1, '
+    ...              '"self_serve_count": 0, "line_capacity": 10}') is None
+    True
+    """
+    lines = GroceryStore(StringIO(config)).get_line_list()
+    return lines[0] if len(lines) == 1 else None
+
+
+def _scenario(text: str, line_type: Callable[[int], CheckoutLine]
+              ) -> Optional[Tuple[List[int], List[int]]]:
+    """Return the arrival times and service times of the customers in the
+    event file <text>, in the order they are processed, at a line of
+    <line_type>, or None if a line closes in it or a customer cannot join
+    that type of line.
+
+    >>> from store import SelfServeLine
+    >>> _scenario('5 Arrive Jugo Bread 3 Cheese 3\\n10 Arrive Bo Gum 1\\n',
+    ...           SelfServeLine)
+    ([5, 10], [12, 2])
+    """
+    # An empty line that each customer joins, by themselves, to be timed
+    probe = line_type(1)
+    customers = []
+    for event in iter_events(text.splitlines()):
+        if not isinstance(event, CustomerArrival) or \
+                not probe.accept(event.customer):
+            return None
+        customers.append((event.timestamp, probe.start_checkout()))
+        probe.complete_checkout()
+    # Events with the same timestamp are processed in the order they appear
+    customers.sort(key=lambda customer: customer[0])
+    return ([arrival for arrival, _ in customers],
+            [service_time for _, service_time in customers])
+
+
+def cross_check(config_paths: Sequence[str], event_paths: Sequence[str]
+                ) -> List[Tuple[str, str, bool]]:
+    """Return, for each config in <config_paths> with a single line and each
+    event file in <event_paths>, whether run_single_line gives the same
+    statistics as GroceryStoreSimulation.run, or raises the same kind of
+    exception.
+    """
+    texts = []
+    for path in event_paths:
+        with open(path) as event_file:
+            texts.append(event_file.read())
+    checks = []
+    for config_path in config_paths:
+        with open(config_path) as config_file:
+            config = config_file.read()
+        if _single_line(config) is None:
+            continue
+        for path, text in zip(event_paths, texts):
+            checks.append((config_path, path,
+                           _outcome(lambda: run_single_line(config, [text])[0])
+                           == _outcome(lambda: GroceryStoreSimulation(
+                               StringIO(config)).run(StringIO(text)))))
+    return checks
+
+
+def _outcome(compute: Callable[[], Dict[str, int]]) -> object:
+    """Return the result of <compute>(), or the type of exception it raises.
+    """
+    try:
+        return compute()
+    except Exception as error:
+        return type(error)
+
+
+if __name__ == '__main__':
+    import glob
+    for check in cross_check(
+            sorted(glob.glob('input_files/config_*.json')),
+            sorted(glob.glob('input_files/events_*.txt'))):
+        print('{}  {}  {}'.format(check[0], check[1],
+                                  'same' if check[2] else 'DIFFERENT'))
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'collections', 'io',
+                                   'numpy', 'event', 'simulation', 'store',
+                                   'glob', 'python_ta', 'doctest']})
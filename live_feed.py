@@ -0,0 +1,399 @@
+"""Assignment 1 - Live feeds
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module runs a GroceryStoreSimulation as a shadow of a live store, with
+asyncio. Arrivals and closures come in as lines of text over a Unix socket
+or a pipe to stdin, and the simulated time follows the wall clock, scaled by
+a factor.
+
+A line is in the format of an event file, but its timestamp may be left
+out, in which case it is stamped with the simulated time it was received
+at. The simulation is advanced to the current simulated time a slice at a
+time, letting other tasks run in between, and a snapshot of its statistics
+so far is published every so often.
+
+Lines wait in a bounded queue to be simulated, and are only taken from it
+once the simulated time has passed their timestamps, a bounded number at a
+time. A feed that runs ahead of the clock fills the queue, and then no more
+lines are read until the simulation catches up, so the stream's buffer
+fills and whoever is writing to it is made to wait.
+
+A line that cannot be parsed is dropped and reported on stderr, and a line
+earlier than one already simulated is moved forward in time. Snapshots
+count both.
+
+Running this module serves a live feed: see the --help option.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+import asyncio
+import json
+import sys
+import time
+from event import iter_events, CloseLine, CustomerArrival, Event
+from simulation import GroceryStoreSimulation
+
+# The most lines that wait to be simulated by default
+MAX_PENDING_LINES = 1024
+
+# The wall-clock seconds between snapshots by default
+SNAPSHOT_INTERVAL = 1.0
+
+# The most simulated seconds advanced before letting other tasks run
+MAX_STEP = 60
+
+# The wall-clock seconds to wait for a line before advancing the clock anyway
+TICK = 0.05
+
+
+class LiveSimulation:
+    """A GroceryStoreSimulation fed with lines as they are received.
+
+    === Attributes ===
+    time_scale: How many simulated seconds pass per wall-clock second.
+    snapshot_interval: The wall-clock seconds between snapshots.
+    lines_received: How many lines have been received.
+    most_waiting: The most lines that have waited to be simulated at once.
+    malformed_lines: How many lines have been dropped because they could not
+                     be parsed.
+    moved_forward: How many lines have been moved forward in time, because
+                   they were earlier than a line simulated before them.
+
+    === Private Attributes ===
+    _simulation: The simulation the lines are fed to.
+    _lines: The lines received that have not been taken to be simulated.
+    _held: The timestamp, the rest and the events of the line taken from
+           _lines but not fed yet, because its time has not come, or None
+           if there is none.
+    _publish: The function each snapshot is given to.
+    _clock: The function giving the wall-clock time, in seconds.
+    _started: The wall-clock time simulated time 0 corresponds to.
+    _horizon: Every event before this simulated time has been processed.
+    _latest: The latest timestamp of the events fed so far, or 0.
+    _num_lines: The number of checkout lines in the store.
+
+    === Representation Invariants ===
+    - Every event fed to _simulation that has not been processed is at or
+      after _horizon.
+    """
+    time_scale: float
+    snapshot_interval: float
+    lines_received: int
+    most_waiting: int
+    malformed_lines: int
+    moved_forward: int
+    _simulation: GroceryStoreSimulation
+    _lines: asyncio.Queue
+    _held: Optional[Tuple[int, str, List[Event]]]
+    _publish: Callable[[Dict[str, Any]], None]
+    _clock: Callable[[], float]
+    _started: float
+    _horizon: int
+    _latest: int
+    _num_lines: int
+
+    def __init__(self, store_file: TextIO, time_scale: float = 1.0,
+                 max_pending: int = MAX_PENDING_LINES,
+                 snapshot_interval: float = SNAPSHOT_INTERVAL,
+                 publish: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize a live simulation of the store configured by
+        <store_file>, in which <time_scale> simulated seconds pass per
+        second of <clock>, starting now.
+
+        At most <max_pending> lines wait to be simulated, and at most that
+        many are fed to the simulation at a time. Every
+        <snapshot_interval> seconds, a snapshot is passed to <publish>, or
+        printed as a line of JSON if it is None.
+
+        Precondition: time_scale > 0, max_pending > 0 and
+        snapshot_interval > 0.
+        """
+        self.time_scale = time_scale
+        self.snapshot_interval = snapshot_interval
+        self.lines_received = 0
+        self.most_waiting = 0
+        self.malformed_lines = 0
+        self.moved_forward = 0
+        self._simulation = GroceryStoreSimulation(store_file)
+        self._lines = asyncio.Queue(max_pending)
+        self._held = None
+        self._publish = publish if publish is not None else _print_snapshot
+        self._clock = clock
+        self._started = clock()
+        self._horizon = 0
+        self._latest = 0
+        self._num_lines = self._simulation.num_lines()
+
+    def now(self) -> int:
+        """Return the current simulated time.
+        """
+        return int((self._clock() - self._started) * self.time_scale)
+
+    async def read(self, reader: asyncio.StreamReader) -> None:
+        """Read lines from <reader> until it reaches the end of its stream,
+        and queue them to be simulated, waiting while the queue is full.
+
+        A line without a timestamp is stamped with the simulated time it was
+        read at.
+        """
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.decode('utf-8')
+            tokens = line.split(None, 1)
+            if tokens and not tokens[0].lstrip('-').isdigit():
+                line = '{} {}'.format(self.now(), line)
+            await self._lines.put(line)
+            self.lines_received += 1
+            self.most_waiting = max(self.most_waiting, self._lines.qsize())
+
+    async def simulate(self, done: asyncio.Event) -> Dict[str, int]:
+        """Simulate the lines queued by read() as the clock advances,
+        publishing snapshots, until <done> is set and every line queued has
+        been simulated. Then finish simulating the events, publish a final
+        snapshot, and return the final statistics.
+
+        A line is only fed to the simulation once the simulated time has
+        passed its timestamp, or once <done> is set, and the simulation is
+        never advanced past a line still waiting to be fed.
+        """
+        published = self._clock()
+        stats = self._simulation.advance(self._horizon)
+        while True:
+            finished = done.is_set()
+            target = None if finished else self.now()
+            fed = self._take(target)
+            if finished and self._held is None and self._lines.empty():
+                stats = self._simulation.advance()
+                self._publish(self._snapshot(stats, True))
+                return stats
+            if not fed and self._held is None:
+                try:
+                    self._hold(await asyncio.wait_for(self._lines.get(),
+                                                      TICK))
+                except asyncio.TimeoutError:
+                    pass
+            elif not fed:
+                await asyncio.sleep(TICK)
+            if target is None:
+                target = self._latest
+            elif self._held is not None:
+                target = min(target, self._stamp())
+            while self._horizon < target:
+                self._horizon = min(target, self._horizon + MAX_STEP)
+                stats = self._simulation.advance(self._horizon)
+                await asyncio.sleep(0)
+            if self._clock() - published >= self.snapshot_interval:
+                published = self._clock()
+                self._publish(self._snapshot(stats, False))
+
+    def _take(self, target: Optional[int]) -> int:
+        """Take the lines waiting to be simulated whose events are before
+        simulated time <target>, or any lines if it is None, in the order
+        they were received, and feed their events to the simulation. Return
+        how many lines were fed.
+
+        At most as many lines as can wait in the queue are fed. The next
+        line that is not fed is held, if there is one.
+        """
+        events: List[Event] = []
+        fed = 0
+        while True:
+            if self._held is None:
+                if self._lines.empty():
+                    break
+                self._hold(self._lines.get_nowait())
+            elif fed == self._lines.maxsize or \
+                    (target is not None and self._stamp() >= target):
+                break
+            else:
+                events.extend(self._release())
+                fed += 1
+        self._simulation.feed(events)
+        return fed
+
+    def _hold(self, line: str) -> None:
+        """Hold <line>, taken from the lines waiting to be simulated, until
+        its time comes, or drop it if it cannot be parsed, closes a line the
+        store does not have, or has an item without a time.
+
+        Precondition: no line is held.
+        """
+        tokens = line.split()
+        if not tokens:
+            return
+        try:
+            events = list(iter_events([line]))
+        except (ValueError, IndexError):
+            self._drop(line)
+            return
+        event = events[0]
+        if isinstance(event, CloseLine) and \
+                not 0 <= event.line_number < self._num_lines or \
+                isinstance(event, CustomerArrival) and len(tokens) % 2 == 0:
+            self._drop(line)
+        else:
+            self._held = (event.timestamp, line.split(None, 1)[1], events)
+
+    def _stamp(self) -> int:
+        """Return the time the events in the line held will be fed at.
+
+        No event can be earlier than an event fed before it, or than the
+        time the simulation has advanced to, so an earlier timestamp is
+        moved forward to the latest of those.
+
+        Precondition: a line is held.
+        """
+        return max(self._held[0], self._latest, self._horizon)
+
+    def _release(self) -> List[Event]:
+        """Return the events in the line held, at the time given by _stamp,
+        and stop holding it.
+
+        Precondition: a line is held.
+        """
+        timestamp, rest, events = self._held
+        stamp = self._stamp()
+        self._held = None
+        if stamp > timestamp:
+            self.moved_forward += 1
+            events = list(iter_events(['{} {}'.format(stamp, rest)]))
+        self._latest = stamp
+        return events
+
+    def _drop(self, line: str) -> None:
+        """Drop <line>, which cannot be parsed, and report it on stderr.
+        """
+        self.malformed_lines += 1
+        print('Dropped malformed line: {!r}'.format(line), file=sys.stderr)
+
+    def _snapshot(self, stats: Dict[str, int], final: bool
+                  ) -> Dict[str, Any]:
+        """Return a snapshot of <stats>, which are final iff <final> is True.
+
+        >>> from io import StringIO
+        >>> live = LiveSimulation(StringIO('{"regular_count": 1, '
+        ...     '"express_count": 0, "self_serve_count": 0, '
+        ...     '"line_capacity": 1}'))
+        >>> snapshot = live._snapshot({'num_customers': 0, 'total_time': 0,
+        ...                            'max_wait': -1}, False)
+        >>> snapshot['time'], snapshot['waiting_lines'], snapshot['final']
+        (0, 0, False)
+        """
+        snapshot: Dict[str, Any] = {'time': self._horizon}
+        snapshot.update(stats)
+        snapshot['lines_received'] = self.lines_received
+        snapshot['waiting_lines'] = self._lines.qsize()
+        snapshot['malformed_lines'] = self.malformed_lines
+        snapshot['moved_forward'] = self.moved_forward
+        snapshot['final'] = final
+        return snapshot
+
+
+def _print_snapshot(snapshot: Dict[str, Any]) -> None:
+    """Print <snapshot> as a line of JSON.
+    """
+    print(json.dumps(snapshot), flush=True)
+
+
+async def serve_unix(simulation: LiveSimulation, path: str,
+                     connections: Optional[int] = None) -> Dict[str, int]:
+    """Feed <simulation> the lines written to a Unix socket at <path>, and
+    return its final statistics.
+
+    If <connections> is None, the socket is served until the task is
+    cancelled. Otherwise, the simulation finishes once that many
+    connections have been made and closed.
+    """
+    done = asyncio.Event()
+    closed = 0
+
+    async def handle(reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Feed the lines from one connection to <simulation>.
+        """
+        nonlocal closed
+        try:
+            await simulation.read(reader)
+        finally:
+            writer.close()
+            closed += 1
+            if closed == connections:
+                done.set()
+
+    server = await asyncio.start_unix_server(handle, path)
+    async with server:
+        return await simulation.simulate(done)
+
+
+async def serve_stdin(simulation: LiveSimulation) -> Dict[str, int]:
+    """Feed <simulation> the lines piped to stdin until it is closed, and
+    return its final statistics.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    done = asyncio.Event()
+
+    async def read() -> None:
+        """Feed the lines from stdin to <simulation>.
+        """
+        await simulation.read(reader)
+        done.set()
+
+    stats, _ = await asyncio.gather(simulation.simulate(done), read())
+    return stats
+
+
+async def feed_socket(path: str, lines: List[str],
+                      rate: Optional[float] = None) -> None:
+    """Write <lines> to the Unix socket at <path>, <rate> lines per second,
+    or as fast as they are read if <rate> is None, and close it.
+
+    This stands in for a live store. Each line is only written once the
+    earlier ones have been taken by the socket, so a reader that falls
+    behind slows it down.
+    """
+    _, writer = await asyncio.open_unix_connection(path)
+    try:
+        for line in lines:
+            writer.write(line.encode('utf-8'))
+            await writer.drain()
+            if rate is not None:
+                await asyncio.sleep(1 / rate)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Simulate a store live, from lines of events received '
+                    'on stdin or a Unix socket.')
+    parser.add_argument('config', help='the store configuration file')
+    parser.add_argument('--socket', help='serve this Unix socket instead '
+                                         'of reading stdin')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='simulated seconds per wall-clock second')
+    arguments = parser.parse_args()
+    with open(arguments.config) as config:
+        live = LiveSimulation(config, arguments.scale)
+    if arguments.socket is None:
+        asyncio.run(serve_stdin(live))
+    else:
+        asyncio.run(serve_unix(live, arguments.socket))
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'asyncio', 'json',
+                                   'sys', 'time', 'event', 'simulation',
+                                   'argparse', 'python_ta', 'doctest']})
@@ -0,0 +1,213 @@
+"""Assignment 1 - Monte Carlo replications
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module simulates a store configuration against many independent,
+seeded arrival streams drawn from a WorkloadModel, in parallel worker
+processes, and estimates the mean of each statistic with a confidence
+interval.
+
+Replications are added to the estimates in the order of their seeds, so the
+estimates do not depend on the number of workers or on the order in which
+the replications finish. Replication can stop early, as soon as every
+interval is as narrow as requested.
+
+Running this module estimates the statistics of config_642_05.json.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Union
+from concurrent.futures import FIRST_COMPLETED, Future, \
+    ProcessPoolExecutor, wait
+from io import StringIO
+import math
+import os
+import statistics
+from simulation import GroceryStoreSimulation
+from sweep import STAT_NAMES
+from workload import WorkloadModel
+
+# The confidence level of the intervals by default
+CONFIDENCE = 0.95
+
+# The fewest replications run before stopping early, by default
+MIN_REPLICATIONS = 3
+
+
+class Estimate:
+    """An estimate of the mean of a statistic over some replications.
+
+    === Attributes ===
+    mean: The mean of the statistic over the replications.
+    half_width: Half the width of the confidence interval for the mean, which
+    is infinite if there are fewer than two replications.
+    count: The number of replications.
+
+    === Representation Invariants ===
+    - count >= 0
+    - half_width >= 0
+    """
+    mean: float
+    half_width: float
+    count: int
+
+    def __init__(self, values: Sequence[float],
+                 confidence: float = CONFIDENCE) -> None:
+        """Initialize an estimate of the mean of <values>, with a
+        <confidence> interval from Student's t distribution.
+
+        Precondition: 0 < confidence < 1
+
+        >>> estimate = Estimate([1, 2, 3])
+        >>> estimate.mean
+        2.0
+        >>> round(estimate.half_width, 2)
+        2.48
+        >>> Estimate([5]).half_width
+        inf
+        """
+        self.count = len(values)
+        self.mean = statistics.fmean(values) if values else math.nan
+        self.half_width = math.inf
+        if self.count > 1:
+            self.half_width = \
+                _t_quantile((1 + confidence) / 2, self.count - 1) \
+                * statistics.stdev(values) / math.sqrt(self.count)
+
+    def __str__(self) -> str:
+        """Return a string representation of this estimate.
+
+        >>> print(Estimate([1, 2, 3]))
+        2.000 +/- 2.484 (3 replications)
+        """
+        return '{:.3f} +/- {:.3f} ({} replications)'.format(
+            self.mean, self.half_width, self.count)
+
+    def width(self) -> float:
+        """Return the width of the confidence interval of this estimate.
+
+        >>> round(Estimate([1, 2, 3]).width(), 2)
+        4.97
+        """
+        return 2 * self.half_width
+
+
+def replicate(config_path: str, model: WorkloadModel, max_replications: int,
+              widths: Optional[Dict[str, float]] = None,
+              confidence: float = CONFIDENCE,
+              min_replications: int = MIN_REPLICATIONS,
+              max_workers: Optional[int] = None,
+              seed: Union[int, str] = 0) -> Dict[str, Estimate]:
+    """Return an Estimate of each statistic in STAT_NAMES, from simulating
+    the store configured by the file at <config_path> against arrival
+    streams drawn from <model>.
+
+    Replication i uses the arrival stream for seed '<seed>:i'. At most
+    <max_replications> are run, in <max_workers> processes, or one for each
+    core if <max_workers> is None. Once at least <min_replications> are in,
+    replication stops as soon as the <confidence> interval of every
+    statistic in <widths> is no wider than the width given for it.
+
+    Precondition: 0 < min_replications <= max_replications, and
+    0 < confidence < 1.
+    """
+    with open(config_path) as config_file:
+        config = config_file.read()
+    workers = max_workers or os.cpu_count() or 1
+    samples: Dict[str, List[float]] = {name: [] for name in STAT_NAMES}
+    finished: Dict[int, Dict[str, int]] = {}
+    pending: Dict[Future, int] = {}
+    submitted = 0
+    count = 0
+    with ProcessPoolExecutor(workers) as pool:
+        while count < max_replications:
+            while submitted < max_replications and len(pending) < 2 * workers:
+                future = pool.submit(_replication, config, model,
+                                     '{}:{}'.format(seed, submitted))
+                pending[future] = submitted
+                submitted += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[pending.pop(future)] = future.result()
+            while count in finished and count < max_replications:
+                stats = finished.pop(count)
+                for name in STAT_NAMES:
+                    samples[name].append(stats[name])
+                count += 1
+                if count >= min_replications and widths is not None and \
+                        _narrow_enough(samples, widths, confidence):
+                    max_replications = count
+        pool.shutdown(cancel_futures=True)
+    return {name: Estimate(values, confidence)
+            for name, values in samples.items()}
+
+
+def _narrow_enough(samples: Dict[str, List[float]], widths: Dict[str, float],
+                   confidence: float) -> bool:
+    """Return whether the <confidence> interval of the mean of each statistic
+    in <widths> is no wider than its width in <widths>, over its values in
+    <samples>.
+
+    >>> _narrow_enough({'max_wait': [1, 2, 3]}, {'max_wait': 5.0}, 0.95)
+    True
+    >>> _narrow_enough({'max_wait': [1, 2, 3]}, {'max_wait': 4.0}, 0.95)
+    False
+    """
+    return all(Estimate(samples[name], confidence).width() <= width
+               for name, width in widths.items())
+
+
+def _replication(config: str, model: WorkloadModel, seed: str
+                 ) -> Dict[str, int]:
+    """Return the statistics of simulating the store configured by <config>
+    against the arrival stream drawn from <model> with <seed>.
+    """
+    simulation = GroceryStoreSimulation(StringIO(config))
+    return simulation.run(StringIO(''.join(model.lines(seed))))
+
+
+def _t_quantile(p: float, df: int) -> float:
+    """Return the <p> quantile of Student's t distribution with <df> degrees
+    of freedom.
+
+    The quantile is exact for one or two degrees of freedom, and otherwise
+    comes from a Cornish-Fisher expansion about the normal quantile, which
+    is within one percent of it for three degrees of freedom, and closer
+    for more.
+
+    Precondition: 0 < p < 1, and df >= 1.
+
+    >>> round(_t_quantile(0.975, 2), 3)
+    4.303
+    >>> round(_t_quantile(0.975, 10), 3)
+    2.228
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = statistics.NormalDist().inv_cdf(p)
+    return z + (z ** 3 + z) / (4 * df) \
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2) \
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) \
+        / (384 * df ** 3) \
+        + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3
+           - 945 * z) / (92160 * df ** 4)
+
+
+if __name__ == '__main__':
+    estimates = replicate('input_files/config_642_05.json',
+                          WorkloadModel(1000, 0.5), 200,
+                          widths={'max_wait': 20.0})
+    for stat, result in estimates.items():
+        print('{}: {}'.format(stat, result))
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing',
+                                   'concurrent.futures', 'io', 'math', 'os',
+                                   'statistics', 'simulation', 'sweep',
+                                   'workload', 'python_ta', 'doctest']})
@@ -0,0 +1,66 @@
+"""CSC148 Assignment 1: Scenarios for the tests
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains the random scenarios the tests simulate, and the
+statistics GroceryStoreSimulation.run gives for them, which the tests compare
+other ways of simulating against.
+"""
+from typing import Dict, Tuple
+from io import StringIO
+import json
+import random
+from simulation import GroceryStoreSimulation
+
+
+def random_scenario(seed: int) -> Tuple[str, str]:
+    """Return a random (config, events) pair with heavy blocking, in which
+    line 0 is a regular line that never closes.
+
+    The config is the text of a config file and the events are the text of
+    an event file, not in timestamp order.
+
+    >>> random_scenario(148) == random_scenario(148)
+    True
+    """
+    rng = random.Random(seed)
+    counts = [rng.randint(1, 3), rng.randint(0, 3), rng.randint(0, 2)]
+    config = json.dumps({'regular_count': counts[0],
+                         'express_count': counts[1],
+                         'self_serve_count': counts[2],
+                         'line_capacity': rng.randint(1, 3)})
+    end = rng.randint(3, 30)
+    lines = []
+    for i in range(rng.randint(1, 40)):
+        items = ' '.join('Gum {}'.format(rng.choice([1, 1, 2, 3]))
+                         for _ in range(rng.choice([1, 2, 3, 8])))
+        lines.append('{} Arrive C{} {}'.format(rng.randint(0, end), i, items))
+    for _ in range(rng.randint(0, 3) if sum(counts) > 1 else 0):
+        lines.append('{} Close {}'.format(rng.randint(0, end),
+                                          rng.randrange(1, sum(counts))))
+    return config, '\n'.join(lines) + '\n'
+
+
+def simulate(config: str, events: str) -> Dict[str, int]:
+    """Return the statistics of simulating the event file <events> in the
+    store configured by <config>, as GroceryStoreSimulation.run gives them.
+
+    >>> config = ('{"regular_count": 1, "express_count": 0, '
+    ...           '"self_serve_count": 0, "line_capacity": 1}')
+    >>> simulate(config, '10 Arrive Tamara Bananas 7\\n'
+    ...                  '5 Arrive Jugo Bread 3 Cheese 3\\n')
+    {'num_customers': 2, 'total_time': 18, 'max_wait': 8}
+    """
+    return GroceryStoreSimulation(StringIO(config)).run(StringIO(events))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['typing', 'io', 'json', 'random',
+                                   'simulation', 'python_ta', 'doctest']})
@@ -20,10 +20,44 @@ All of the files in this directory and all subdirectories are:
 Copyright (c) 2019 Jacqueline Smith
 """
 from __future__ import annotations
-from typing import Dict, Any, TextIO
-from event import create_event_list, CustomerArrival, CheckoutCompleted
-from store import GroceryStore
-from container import PriorityQueue
+from typing import Callable, Deque, Dict, Any, Iterable, Iterator, List, \
+    Optional, TextIO, Tuple, Union
+from collections import deque
+import os
+import pickle
+import struct
+import time
+from event import event_key, BlockedArrivals, CheckoutCompleted, \
+    CheckoutStarted, CloseLine, CustomerArrival, Event
+from event_index import windowed_events
+from event_trace import EventTrace
+from store import Customer, GroceryStore
+from timeline import TimelineWriter
+from container import CalendarQueue, Container, PriorityQueue
+from event_profile import SimulationProfile
+from wait_stats import WaitStatistics
+
+# The number of events processed between checkpoints by default
+CHECKPOINT_EVENTS = 100000
+
+# The format version written by GroceryStoreSimulation.checkpoint. It goes
+# up whenever the state pickled into a checkpoint changes, so that restoring
+# a checkpoint written by an older version fails cleanly.
+CHECKPOINT_VERSION = 2
+
+# Every checkpoint starts with the magic bytes and the format version
+_CHECKPOINT_HEADER = struct.Struct('<4sH')
+_CHECKPOINT_MAGIC = b'GSCP'
+
+
+def timestamp_queue() -> PriorityQueue:
+    """Return an empty PriorityQueue that orders events by event_key, so that
+    its heap compares timestamps directly.
+
+    Events come out in the same order as from PriorityQueue(), including
+    ties, which are resolved in the order the events were added.
+    """
+    return PriorityQueue(key=event_key)
 
 
 class GroceryStoreSimulation:
@@ -41,31 +75,526 @@ class GroceryStoreSimulation:
     _events: A sequence of events arranged in priority determined by the event
              sorting order.
     _store: The store being simulated.
+    _park_blocked: True iff customers who cannot join a line are parked in
+                   BlockedArrivals events instead of retrying every second.
+    _now: The timestamp of the event being processed.
+    _latest_next: The event most recently added with timestamp _now + 1, or
+                  None if there is no such event.
+    _blocked_pending: How many BlockedArrivals events are in _events.
+    _blocked_stale: How many BlockedArrivals events in _events hold customers
+                    who have not tried to join a line since the last
+                    checkout was completed.
+    _upcoming: The events from the event file that have not been read yet,
+               in the order they happen.
+    _next_input: The next event from the event file, which is not in
+                 _events, or None if every event in the file has been
+                 processed.
+    _wait_stats: The statistics to record each customer's wait in, or None
+                 if they are not being collected.
+    _line_types: The name of the type of each line in _store.
+    _profile: The profile to record each event in, or None if the events
+              are not being profiled.
+    _timeline: The timeline to write the activity of the lines to, or None
+               if it is not being written.
+    _stats: The statistics of the current or most recent run.
+    _window: The <start> and <end> of the current or most recent run.
+    _consumed: How many events have been taken from the event file of the
+               current or most recent run, not counting _next_input.
+    _restored: True iff the state was loaded by restore(), so that the next
+               run() resumes it.
+    _fed: The events fed to the simulation that have not been processed,
+          other than _next_input, in the order they are processed.
+    _until: The time before which events are being processed, or None if
+            every event is being processed.
     """
-    _events: PriorityQueue
+    _events: Container
     _store: GroceryStore
+    _park_blocked: bool
+    _now: int
+    _latest_next: Optional[Event]
+    _blocked_pending: int
+    _blocked_stale: int
+    _upcoming: Iterator[Event]
+    _next_input: Optional[Event]
+    _wait_stats: Optional[WaitStatistics]
+    _line_types: List[str]
+    _profile: Optional[SimulationProfile]
+    _timeline: Optional[TimelineWriter]
+    _stats: Dict[str, int]
+    _window: Tuple[Optional[int], Optional[int]]
+    _consumed: int
+    _restored: bool
+    _fed: Deque[Event]
+    _until: Optional[int]
 
-    def __init__(self, store_file: TextIO) -> None:
+    def __init__(self, store_file: TextIO,
+                 queue_type: Callable[[], Container] = timestamp_queue,
+                 park_blocked: bool = True,
+                 wait_stats: Optional[WaitStatistics] = None,
+                 profile: Optional[SimulationProfile] = None,
+                 timeline: Optional[TimelineWriter] = None) -> None:
         """Initialize a GroceryStoreSimulation using configuration <store_file>.
+
+        <queue_type> is called with no arguments to create the queue that
+        holds pending events. It may be timestamp_queue, PriorityQueue,
+        IndexedPriorityQueue or CalendarQueue; all of them remove events in
+        the same order, and all of them support add_many(), peek() and len().
+
+        If <park_blocked> is True, customers who cannot join any line wait in
+        BlockedArrivals events, which only offer them a line again once a
+        checkout has completed. This gives exactly the same statistics as
+        retrying every second, without one event per customer per second.
+        The one difference is that customers who could never join a line
+        are left waiting once nothing else can happen, instead of retrying
+        forever.
+
+        If <wait_stats> is not None, each customer's wait is recorded in it as
+        they finish checking out. If <profile> is not None, each event is
+        timed and recorded in it, and each run() is timed, and profiled with
+        cProfile if the profile asks for that. If <timeline> is not None,
+        customers joining, starting and finishing checkout, and being moved
+        out of closed lines are written to it. The statistics returned by
+        run() are the same either way.
         """
-        self._events = PriorityQueue()
+        self._events = queue_type()
         self._store = GroceryStore(store_file)
+        self._park_blocked = park_blocked
+        self._now = -1
+        self._latest_next = None
+        self._blocked_pending = 0
+        self._blocked_stale = 0
+        self._upcoming = iter([])
+        self._next_input = None
+        self._wait_stats = wait_stats
+        self._line_types = [type(line).__name__
+                            for line in self._store.get_line_list()]
+        self._profile = profile
+        self._timeline = timeline
+        if timeline is not None:
+            timeline.name_lines(self._line_types)
+            self._watch_joins()
+        self._stats = {
+            'num_customers': 0,
+            'total_time': 0,
+            'max_wait': -1
+        }
+        self._window = (None, None)
+        self._consumed = 0
+        self._restored = False
+        self._fed = deque()
+        self._until = None
 
-    def run(self, file: TextIO) -> Dict[str, Any]:
+    def run(self, file: Union[TextIO, EventTrace],
+            start: Optional[int] = None, end: Optional[int] = None,
+            checkpoint_path: Optional[str] = None,
+            checkpoint_every: int = CHECKPOINT_EVENTS) -> Dict[str, Any]:
         """Run the simulation on the events stored in <initial_events>.
 
         Return a dictionary containing statistics of the simulation,
         according to the specifications in the assignment handout.
+
+        The events in <file> are read as the simulation reaches them, in
+        timestamp order, so the file does not need to be sorted or to fit
+        in memory. Each event from the file is processed before any other
+        event with the same timestamp, as if they had all been queued at the
+        start. <file> may also be an EventTrace compiled from an event file,
+        which gives the same statistics without parsing any text.
+
+        If <checkpoint_path> is not None, a checkpoint is written to it, as by
+        checkpoint(), once at least <checkpoint_every> events have been
+        processed since the last one, between one timestamp and the next.
+        If restore() was called since the last run, the run resumes from the
+        restored state instead of starting over: <file> must be the same
+        file as in the run that was checkpointed, and <start> and <end> are
+        taken from that run.
+
+        If <start> or <end> is not None, only the events in <file> from time
+        <start> up to but not including time <end> are simulated. Events
+        caused by them are still simulated after <end>. If <file> has an
+        index built by event_index.build_index, or is an EventTrace, the
+        window is found without reading the events before it.
+
+        >>> from io import StringIO
+        >>> config = StringIO('''{"regular_count": 1, "express_count": 0,
+        ...                        "self_serve_count": 0, "line_capacity": 1}''')
+        >>> sim = GroceryStoreSimulation(config, CalendarQueue)
+        >>> sim.run(StringIO('''10 Arrive Tamara Bananas 7
+        ... 5 Arrive Jugo Bread 3 Cheese 3
+        ... '''))
+        {'num_customers': 2, 'total_time': 18, 'max_wait': 8}
         """
-        # Initialize statistics
-        stats = {
-            'num_customers': 0,
-            'total_time': 0,
-            'max_wait': -1
+        if self._restored:
+            self._restored = False
+            start, end = self._window
+        else:
+            # Initialize statistics
+            self._stats = {
+                'num_customers': 0,
+                'total_time': 0,
+                'max_wait': -1
+            }
+            self._window = (start, end)
+            self._consumed = 0
+        if isinstance(file, EventTrace):
+            self._upcoming = file.events(start, end, self._consumed)
+        else:
+            self._upcoming = windowed_events(file, start, end, self._consumed)
+        self._next_input = next(self._upcoming, None)
+        self._simulate(None, checkpoint_path, checkpoint_every)
+        return self._stats
+
+    def num_lines(self) -> int:
+        """Return the number of checkout lines in the store being simulated,
+        open or closed.
+
+        >>> from io import StringIO
+        >>> config = ('{"regular_count": 2, "express_count": 1, '
+        ...           '"self_serve_count": 0, "line_capacity": 3}')
+        >>> GroceryStoreSimulation(StringIO(config)).num_lines()
+        3
+        """
+        return len(self._store.get_line_list())
+
+    def feed(self, events: Iterable[Event]) -> None:
+        """Add <events> to the end of the input of this simulation, to be
+        processed by advance() as if they had been read from an event file.
+
+        Precondition: <events> are sorted by timestamp, and none of them is
+        earlier than the events fed before them or than the <until> of the
+        last call to advance().
+        """
+        self._fed.extend(events)
+
+    def advance(self, until: Optional[int] = None) -> Dict[str, int]:
+        """Process the events fed to this simulation, and the events they
+        cause, that happen before time <until>, or all of them if <until> is
+        None, and return a copy of the statistics so far.
+
+        Since the events fed later cannot be earlier than <until>, the
+        events before it are processed exactly as run() would process them
+        with every event in one file. Events from <until> on are left
+        pending for the next call, and customers who cannot join a line are
+        kept waiting for events that may yet be fed. Once every event has
+        been fed, advance(None) gives the same statistics as run().
+
+        >>> from io import StringIO
+        >>> from event import create_event_list
+        >>> config = StringIO('{"regular_count": 1, "express_count": 0, '
+        ...                   '"self_serve_count": 0, "line_capacity": 1}')
+        >>> sim = GroceryStoreSimulation(config)
+        >>> sim.feed(create_event_list(StringIO('5 Arrive Jugo Bread 3\\n')))
+        >>> sim.advance(6)
+        {'num_customers': 1, 'total_time': 5, 'max_wait': -1}
+        >>> sim.feed(create_event_list(StringIO('7 Arrive Ann Gum 1\\n')))
+        >>> sim.advance()
+        {'num_customers': 2, 'total_time': 9, 'max_wait': 3}
+        """
+        self._restored = False
+        self._upcoming = _taken(self._fed)
+        self._next_input = next(self._upcoming, None)
+        self._simulate(until)
+        if self._next_input is not None:
+            self._fed.appendleft(self._next_input)
+            self._next_input = None
+        return dict(self._stats)
+
+    def _simulate(self, until: Optional[int],
+                  checkpoint_path: Optional[str] = None,
+                  checkpoint_every: int = CHECKPOINT_EVENTS) -> None:
+        """Process the pending events and the events from _next_input and
+        _upcoming, with the events they cause, that happen before time
+        <until>, or all of them if <until> is None, updating _stats.
+
+        Checkpoints are written as described in run().
+        """
+        self._until = until
+        stats = self._stats
+        # The number of events processed since the last checkpoint
+        processed = 0
+        queue = self._events
+        store = self._store
+        # The events caused by the event being processed
+        new_events: List[Event] = []
+        profile = self._profile
+        if profile is not None:
+            profile.start()
+
+        while True:
+            # The file's next event comes first, as if it had been queued at
+            # the start
+            upcoming = self._next_input
+            if upcoming is not None and (
+                    queue.is_empty()
+                    or upcoming.timestamp <= queue.peek().timestamp):
+                now = upcoming.timestamp
+            elif not queue.is_empty():
+                now = queue.peek().timestamp
+                upcoming = None
+            else:
+                break
+            if until is not None and now >= until:
+                break
+            if now != self._now:
+                if checkpoint_path is not None and \
+                        processed >= checkpoint_every:
+                    self.checkpoint(checkpoint_path)
+                    processed = 0
+                self._now = now
+                self._latest_next = None
+            if profile is not None:
+                taken = time.perf_counter()
+            if upcoming is not None:
+                event = upcoming
+                self._next_input = next(self._upcoming, None)
+                self._consumed += 1
+                if isinstance(event, CustomerArrival):
+                    stats['num_customers'] += 1
+            else:
+                event = queue.remove()
+            processed += 1
+            if isinstance(event, BlockedArrivals):
+                self._blocked_pending -= 1
+                if event.checkouts_seen != store.get_checkouts_completed():
+                    self._blocked_stale -= 1
+            else:
+                stats['total_time'] = now
+                if isinstance(event, CheckoutCompleted):
+                    wait = now - event.customer.arrival_time
+                    if wait > stats['max_wait']:
+                        stats['max_wait'] = wait
+                    if self._wait_stats is not None:
+                        self._wait_stats.record(
+                            now, event.customer.arrival_time,
+                            event.customer.name,
+                            self._line_types[event.line_number])
+                    self._blocked_stale = self._blocked_pending
+            if profile is not None:
+                started = time.perf_counter()
+            new_events.clear()
+            event.do_into(store, new_events)
+            if profile is not None:
+                handled = time.perf_counter()
+            if self._timeline is not None:
+                self._trace(event, new_events)
+            if new_events and new_events[0] is event and \
+                    self._park_blocked and isinstance(event, CustomerArrival):
+                self._park(event.customer)
+            else:
+                for new_event in new_events:
+                    self._add(new_event)
+                if isinstance(event, BlockedArrivals) and event.customers:
+                    self._reschedule(event)
+            if profile is not None:
+                self._record(event, new_events, handled - started,
+                             started - taken + time.perf_counter() - handled)
+
+        if profile is not None:
+            profile.stop()
+        if self._timeline is not None:
+            self._timeline.flush()
+
+    def checkpoint(self, path: str) -> None:
+        """Write a snapshot of the state of this simulation to the file at
+        <path>, replacing it, so that restore() can resume it.
+
+        The snapshot holds the store with its lines and their customers, the
+        pending events, the statistics so far, how far into its event file
+        the run has read, and the events fed but not yet processed, in a
+        binary format: the bytes b'GSCP' and the format version, followed by
+        the state as a pickle. It only grows with the number of pending
+        events and customers in the store, not with the length of the run.
+        The file is replaced in one step, so a run that dies while writing
+        it leaves the previous snapshot. Keep it where only trusted users can
+        write to it, since restore() unpickles it.
+
+        Statistics, profiles and timelines passed to the constructor are not
+        part of the snapshot.
+
+        Precondition: run() and advance() are not in progress, unless it is
+        run() that calls this method.
+        """
+        state = {
+            'store': self._store,
+            'events': self._events,
+            'blocked_pending': self._blocked_pending,
+            'blocked_stale': self._blocked_stale,
+            'stats': self._stats,
+            'window': self._window,
+            'consumed': self._consumed,
+            'fed': list(self._fed)
         }
-        # TODO: Calculate and return the correct statistics.
+        partial = path + '.partial'
+        with open(partial, 'wb') as snapshot:
+            snapshot.write(_CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC,
+                                                   CHECKPOINT_VERSION))
+            pickle.dump(state, snapshot, pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+
+    def restore(self, path: str) -> None:
+        """Replace the state of this simulation with the snapshot written to
+        <path> by checkpoint(), so that the next run() resumes it.
+
+        The store and the kind of queue come from the snapshot, not from the
+        arguments this simulation was constructed with.
+
+        The state is unpickled, and unpickling can run arbitrary code, so
+        only restore snapshots written by a trusted source, such as this
+        program's own checkpoint().
+
+        Raise ValueError if <path> does not start with the bytes b'GSCP', so
+        is not a snapshot at all, or if it is a snapshot in a format version
+        other than CHECKPOINT_VERSION, before any of it is unpickled.
+
+        >>> from io import StringIO
+        >>> import os, tempfile
+        >>> config = ('{"regular_count": 1, "express_count": 0, '
+        ...           '"self_serve_count": 0, "line_capacity": 1}')
+        >>> events = '10 Arrive Tamara Bananas 7\\n5 Arrive Jugo Bread 3\\n'
+        >>> path = os.path.join(tempfile.mkdtemp(), 'snapshot')
+        >>> sim = GroceryStoreSimulation(StringIO(config))
+        >>> sim.run(StringIO(events), checkpoint_path=path, checkpoint_every=1)
+        {'num_customers': 2, 'total_time': 17, 'max_wait': 7}
+        >>> resumed = GroceryStoreSimulation(StringIO(config))
+        >>> resumed.restore(path)
+        >>> resumed.run(StringIO(events))
+        {'num_customers': 2, 'total_time': 17, 'max_wait': 7}
+        """
+        with open(path, 'rb') as snapshot:
+            header = snapshot.read(_CHECKPOINT_HEADER.size)
+            if len(header) < _CHECKPOINT_HEADER.size or \
+                    not header.startswith(_CHECKPOINT_MAGIC):
+                raise ValueError('{} is not a checkpoint'.format(path))
+            _, version = _CHECKPOINT_HEADER.unpack(header)
+            if version != CHECKPOINT_VERSION:
+                raise ValueError(
+                    '{} is a version {} checkpoint, but only version {} '
+                    'can be restored'.format(path, version,
+                                             CHECKPOINT_VERSION))
+            state = pickle.load(snapshot)
+        self._store = state['store']
+        self._events = state['events']
+        self._blocked_pending = state['blocked_pending']
+        self._blocked_stale = state['blocked_stale']
+        self._stats = state['stats']
+        self._window = state['window']
+        self._consumed = state['consumed']
+        self._fed = deque(state['fed'])
+        self._restored = True
+        self._line_types = [type(line).__name__
+                            for line in self._store.get_line_list()]
+        if self._timeline is not None:
+            self._watch_joins()
+
+    def _watch_joins(self) -> None:
+        """Write each customer who joins a line in _store to _timeline.
+
+        Precondition: _timeline is not None.
+        """
+        timeline = self._timeline
+        self._store.watch_joins(
+            lambda customer, line_number: timeline.join(
+                self._now, customer, line_number))
+
+    def _trace(self, event: Event, new_events: List[Event]) -> None:
+        """Write the checkouts started and completed by <event>, which caused
+        <new_events>, or the customers it moved out of a closed line, to
+        _timeline.
 
-        return stats
+        Customers joining lines are written as they join.
+
+        Precondition: _timeline is not None.
+        """
+        if isinstance(event, CheckoutStarted):
+            self._timeline.start_checkout(
+                event.timestamp, new_events[0].customer, event.line_number)
+        elif isinstance(event, CheckoutCompleted):
+            self._timeline.complete_checkout(
+                event.timestamp, event.customer, event.line_number)
+        elif isinstance(event, CloseLine):
+            for moved in new_events:
+                self._timeline.requeue(event.timestamp, moved.customer,
+                                       event.line_number)
+
+    def _record(self, event: Event, new_events: List[Event],
+                handler_time: float, other_time: float) -> None:
+        """Record in _profile that <event> was processed, causing
+        <new_events>, with <handler_time> seconds spent in its handler and
+        <other_time> seconds spent outside it.
+
+        Precondition: _profile is not None.
+        """
+        retries = 0
+        if isinstance(event, BlockedArrivals):
+            retries = len(event.customers)
+        elif new_events and new_events[0] is event:
+            retries = 1
+        self._profile.record(type(event).__name__, handler_time, other_time,
+                             len(self._events), retries)
+
+    def _add(self, event: Event) -> None:
+        """Add <event> to the pending events.
+        """
+        self._events.add(event)
+        if event.timestamp == self._now + 1:
+            self._latest_next = event
+
+    def _park(self, customer: Customer) -> None:
+        """Park <customer>, who could not join a line at the current time.
+
+        The customer would have retried at the next timestamp, right after
+        the event most recently added for that timestamp. If that event is a
+        BlockedArrivals, the customer joins the end of it; otherwise, a new
+        BlockedArrivals is added in the customer's place.
+        """
+        latest = self._latest_next
+        if isinstance(latest, BlockedArrivals):
+            latest.customers.append(customer)
+        else:
+            self._add(BlockedArrivals(self._now + 1, deque([customer]),
+                                      self._store.get_checkouts_completed()))
+            self._blocked_pending += 1
+
+    def _reschedule(self, blocked: BlockedArrivals) -> None:
+        """Add <blocked> back to the pending events, for the customers in it
+        who still could not join a line.
+
+        As in _park, if the event most recently added for the next timestamp
+        is a BlockedArrivals, the customers in <blocked> join the end of it
+        instead. If no other events are pending before the next timestamp,
+        <blocked> skips ahead to the time of the next pending event, or to
+        _until if that is earlier, since its retries in between would all
+        fail. If only BlockedArrivals events are pending, none of them can
+        have room made for them, and no more events can be fed, <blocked> is
+        dropped.
+        """
+        if len(self._events) == self._blocked_pending and \
+                self._blocked_stale == 0 and self._next_input is None and \
+                self._until is None:
+            return
+        latest = self._latest_next
+        if isinstance(latest, BlockedArrivals):
+            latest.customers.extend(blocked.customers)
+            return
+        upcoming = []
+        if not self._events.is_empty():
+            upcoming.append(self._events.peek().timestamp)
+        if self._next_input is not None:
+            upcoming.append(self._next_input.timestamp)
+        if self._until is not None:
+            upcoming.append(self._until)
+        blocked.timestamp = self._now + 1
+        if upcoming:
+            blocked.timestamp = max(blocked.timestamp, min(upcoming))
+        self._add(blocked)
+        self._blocked_pending += 1
+
+
+def _taken(events: Deque[Event]) -> Iterator[Event]:
+    """Yield the events in <events>, removing each one from the front as it
+    is yielded.
+    """
+    while events:
+        yield events.popleft()
 
 
 # We have provided a bit of code to help test your work.
@@ -81,5 +610,9 @@ if __name__ == '__main__':
     doctest.testmod()
     import python_ta
     python_ta.check_all(config={
-        'allowed-import-modules': ['__future__', 'typing', 'event', 'store',
-                                   'container', 'python_ta', 'doctest']})
+        'allowed-import-modules': ['__future__', 'typing', 'collections',
+                                   'os', 'pickle', 'struct', 'time', 'event',
+                                   'event_index', 'event_profile',
+                                   'event_trace', 'store', 'container',
+                                   'timeline', 'wait_stats',
+                                   'python_ta', 'doctest']})
@@ -20,7 +20,10 @@ All of the files in this directory and all subdirectories are:
 Copyright (c) 2019 Jacqueline Smith
 """
 from __future__ import annotations
-from typing import List, Optional, TextIO
+from typing import Any, Callable, Deque, Dict, List, Optional, TextIO, \
+    Tuple
+from collections import deque
+import heapq
 import json
 # Use this constant in your code
 EXPRESS_LIMIT = 7
@@ -36,17 +39,32 @@ class GroceryStore:
     _self_serve_count: How many self-serve lines are open.
     _line_capacity: maximum amount of people allowed in each line
     _line_list: list of all the lines open, following representation invariants
+    _checkouts_completed: how many checkouts have been completed so far
+    _line_heaps: one heap per type of line, in the order the types appear in
+    _line_list, holding [queue length, line number] entries for those lines
+    _heap_of_line: the index in _line_heaps of the heap for each line
+    _live_entries: for each line, its entry in its heap, or None if the line
+    is closed or full
+    _join_listener: a function to call with each customer who joins a line
+    and the number of that line, or None
 
     === Representation Invariant ===
     - _line_list is ordered in the following order:
     RegularLine, ExpressLine, SelfServeLine
     - _line_capacity is the same for all lines
+    - every line that is open and not full has a live entry holding its
+    current queue length; entries that are not live are ignored
     """
     _regular_count: int
     _express_count: int
     _self_serve_count: int
     _line_capacity: int
     _line_list: List[Any]
+    _checkouts_completed: int
+    _line_heaps: List[List[List[int]]]
+    _heap_of_line: List[int]
+    _live_entries: List[Optional[List[int]]]
+    _join_listener: Optional[Callable[[Customer, int], None]]
 
     def __init__(self, config_file: TextIO) -> None:
         """Initialize a GroceryStore from a configuration file <config_file>.
@@ -69,6 +87,7 @@ class GroceryStore:
         self._line_capacity = working.get('line_capacity')
         self._zz = 0
         self._line_list = []
+        self._checkouts_completed = 0
 
         for _ in range(self._regular_count):
             self._line_list.append(RegularLine(self._line_capacity))
@@ -77,6 +96,28 @@ class GroceryStore:
         for _ in range(self._self_serve_count):
             self._line_list.append(SelfServeLine(self._line_capacity))
 
+        self._line_heaps = []
+        self._heap_of_line = []
+        self._live_entries = []
+        line_types = []
+        for line in self._line_list:
+            if type(line) not in line_types:
+                line_types.append(type(line))
+                self._line_heaps.append([])
+            self._heap_of_line.append(line_types.index(type(line)))
+            self._live_entries.append(None)
+        for i in range(len(self._line_list)):
+            self._update_line(i)
+        self._join_listener = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the state of this store to be pickled, which leaves out the
+        join listener, since it is not part of the store itself.
+        """
+        state = self.__dict__.copy()
+        state['_join_listener'] = None
+        return state
+
     def get_info(self, name: str) -> int:
         """Return requested info from input file. Allows indirect access to
         private attributes.
@@ -130,6 +171,10 @@ class GroceryStore:
         should go back into the container, and have its timestamp increased by
         1 (representing trying to join a line again at the next time interval.)
 
+        The open lines that have room are kept in one heap per type of line,
+        ordered by queue length and then index, so only the first line of
+        each type needs to be considered.
+
         Return -1 if there is no line available for the customer to join.
         >>> import io
         >>> enter_line_config_file = io.StringIO('{"regular_count":1,"express_count":0,"self_serve_count":1,"line_capacity":1}')
@@ -147,19 +192,118 @@ class GroceryStore:
         """
         if self._zz == 1:
             self._zz += 1
-        lowest_index = None
-        lowest_queue = 200000000
-        for i, line in enumerate(self.get_line_list()):
-            if line.can_accept(customer):
-                queue_length = len(line.queue)
-                if queue_length < lowest_queue:
-                    lowest_queue = queue_length
-                    lowest_index = i
-        if lowest_index is None:
-                return -1
+        best = None
+        for heap in self._line_heaps:
+            entry = self._first_live(heap)
+            if entry is not None and (best is None or entry < best) and \
+                    self._line_list[entry[1]].can_accept(customer):
+                best = entry
+        if best is None:
+            return -1
+        lowest_index = best[1]
         self._line_list[lowest_index].queue.append(customer)
+        self._update_line(lowest_index)
+        if self._join_listener is not None:
+            self._join_listener(customer, lowest_index)
         return lowest_index
 
+    def watch_joins(self, listener: Optional[Callable[[Customer, int], None]]
+                    ) -> None:
+        """Call <listener> with each customer who joins a line from now on,
+        and the number of the line they joined, or stop calling any
+        listener if <listener> is None.
+
+        >>> import io
+        >>> config_file = io.StringIO('{"regular_count":2,"express_count":0,"self_serve_count":0,"line_capacity":1}')
+        >>> g = GroceryStore(config_file)
+        >>> joins = []
+        >>> g.watch_joins(lambda customer, line: joins.append(line))
+        >>> g.enter_line(Customer('Bill', [Item('banana', 5)]))
+        0
+        >>> g.enter_line(Customer('Nye', [Item('apple', 6)]))
+        1
+        >>> joins
+        [0, 1]
+        """
+        self._join_listener = listener
+
+    def _first_live(self, heap: List[List[int]]) -> Optional[List[int]]:
+        """Return the live entry with the shortest queue and lowest line number
+        in <heap>, or None if it has no live entries.
+
+        Entries that are no longer live are discarded from the top of <heap>.
+        """
+        while heap and heap[0] is not self._live_entries[heap[0][1]]:
+            heapq.heappop(heap)
+        if heap:
+            return heap[0]
+        return None
+
+    def _update_line(self, line_number: int) -> None:
+        """Record the current queue length of line <line_number> in its heap.
+        """
+        line = self._line_list[line_number]
+        heap = self._line_heaps[self._heap_of_line[line_number]]
+        if line.is_open and len(line.queue) < line.capacity:
+            entry = [len(line.queue), line_number]
+            self._live_entries[line_number] = entry
+            heapq.heappush(heap, entry)
+        else:
+            self._live_entries[line_number] = None
+        if len(heap) > 2 * len(self._line_list) + 16:
+            heap[:] = [entry for entry in heap
+                       if entry is self._live_entries[entry[1]]]
+            heapq.heapify(heap)
+
+    def admit_waiting(self, customers: Deque[Customer]) -> List[int]:
+        """Let the waiting <customers> try to join a line, in order, exactly as
+        enter_line would. Remove the customers who join a line from
+        <customers>.
+
+        Return the numbers of the lines that became ready to start a
+        checkout, in the order they became ready.
+
+        Once a customer who could join any line is turned away, every line is
+        full, so the customers after them are not offered a line at all.
+        Likewise, once a customer with too many items for the express lines
+        is turned away, later customers like them are not offered a line.
+        >>> import io
+        >>> from collections import deque
+        >>> config_file = \
+        io.StringIO('{"regular_count":1,"express_count":1,"self_serve_count":0,"line_capacity":1}')
+        >>> g = GroceryStore(config_file)
+        >>> g.enter_line(Customer('bill', [Item('apple', 6)]))
+        0
+        >>> waiting = deque([Customer('nye', [Item('gum', 1)] * 9),
+        ...                  Customer('the', [Item('gum', 1)]),
+        ...                  Customer('guy', [Item('gum', 1)])])
+        >>> g.admit_waiting(waiting)
+        [1]
+        >>> [customer.name for customer in waiting]
+        ['nye', 'guy']
+        """
+        ready = []
+        turned_away = deque()
+        large_turned_away = False
+        while customers:
+            customer = customers[0]
+            large = customer.num_items() >= EXPRESS_LIMIT
+            if large and large_turned_away:
+                line_entered = -1
+            else:
+                line_entered = self.enter_line(customer)
+            if line_entered == -1:
+                if not large:
+                    break
+                large_turned_away = True
+                turned_away.append(customers.popleft())
+            else:
+                customers.popleft()
+                if self.line_is_ready(line_entered):
+                    ready.append(line_entered)
+        customers.extendleft(reversed(turned_away))
+        return ready
+
     def line_is_ready(self, line_number: int) -> bool:
         """Return True iff checkout line <line_number> is ready to start a
         checkout. Thus, line_is_ready should return True
@@ -202,11 +346,39 @@ class GroceryStore:
         >>> g = GroceryStore(config_file)
         >>> g.enter_line(Customer('the science guy', [Item('apple', 6)]))
         0
+        >>> g.enter_line(Customer('bill nye', [Item('banana', 5)]))
+        0
         >>> g.complete_checkout(0)
         True
+        >>> g.complete_checkout(0)
+        False
         """
-        line = self._line_list[line_number]
-        return len(line.queue) >= 1
+        self._checkouts_completed += 1
+        remaining = self._line_list[line_number].complete_checkout()
+        self._update_line(line_number)
+        return remaining
+
+    def get_checkouts_completed(self) -> int:
+        """Return how many checkouts have been completed in this GroceryStore.
+
+        Completing a checkout is the only way room can open up in a line, so
+        a customer who could not join any line cannot join one until this
+        number has changed.
+
+        >>> import io
+        >>> config_file = \
+        io.StringIO('{"regular_count":0,"express_count":0,"self_serve_count":1,"line_capacity":10}')
+        >>> g = GroceryStore(config_file)
+        >>> g.enter_line(Customer('the science guy', [Item('apple', 6)]))
+        0
+        >>> g.get_checkouts_completed()
+        0
+        >>> g.complete_checkout(0)
+        False
+        >>> g.get_checkouts_completed()
+        1
+        """
+        return self._checkouts_completed
 
     def close_line(self, line_number: int) -> List[Customer]:
         """Close checkout line <line_number> and return the customers from
@@ -224,8 +396,9 @@ class GroceryStore:
         >>> len(g.close_line(0)) == 2
         True
         """
-        line = self._line_list[line_number]
-        return line.close()
+        moved = self._line_list[line_number].close()
+        self._update_line(line_number)
+        return moved
 
     def get_first_in_line(self, line_number: int) -> Optional[Customer]:
         """Return the first customer in line <line_number>, or None if there
@@ -253,14 +426,28 @@ class Customer:
     === Attributes ===
     name: A unique identifier for this customer.
     arrival_time: The time this customer joined a line.
-    _items: The items this customer has.
+    _items: The items this customer has, or None if they are only held as
+            runs in _runs.
+    _runs: The items this customer has, as (item, count) pairs for runs of
+           the same item, or None if they are only held in _items.
+    _num_items: The number of items this customer has.
+    _item_time: The total time it takes to check out this customer's items.
 
     === Representation Invariant ===
     arrival_time >= 0 if this customer has joined a line, and -1 otherwise
+    Exactly one of _items and _runs is None.
+    Every count in _runs is positive.
+    _num_items is the number of items in _items or _runs
+    _item_time is the sum of the times of the items in _items or _runs
     """
     name: str
     arrival_time: int
-    _items: List[Item]
+    _items: Optional[List[Item]]
+    _runs: Optional[List[Tuple[Item, int]]]
+    _num_items: int
+    _item_time: int
+    __slots__ = ('name', 'arrival_time', '_items', '_runs', '_num_items',
+                 '_item_time')
 
     def __init__(self, name: str, items: List[Item]) -> None:
         """Initialize a customer with the given <name>, an initial arrival time
@@ -278,6 +465,42 @@ class Customer:
         self.name = name
         self.arrival_time = -1
         self._items = items
+        self._runs = None
+        self._num_items = len(items)
+        self._item_time = sum(item.get_time() for item in items)
+
+    @classmethod
+    def from_runs(cls, name: str, runs: List[Tuple[Item, int]],
+                  totals: Optional[Tuple[int, int]] = None) -> Customer:
+        """Return a customer with the given <name> whose items are the items
+        in <runs>, where each (item, count) pair stands for <count> copies of
+        item in a row.
+
+        The runs are kept as they are, so a customer with many copies of the
+        same item does not need a list entry for each copy. <runs> is not
+        copied, and may be shared with other customers, so it must not be
+        changed afterwards. Callers that share <runs> can also share
+        <totals>, the number of items in <runs> and the time they take to
+        check out, which are otherwise computed from <runs>.
+
+        Precondition: every count in <runs> is positive, and <totals> is None
+        or equal to run_totals(<runs>).
+
+        >>> gum = Item('gum', 1)
+        >>> c = Customer.from_runs('Bo', [(gum, 3), (Item('bread', 3), 1)])
+        >>> c.num_items(), c.get_item_time()
+        (4, 6)
+        >>> [item.get_item_name() for item in c.get_items()]
+        ['gum', 'gum', 'gum', 'bread']
+        """
+        customer = cls.__new__(cls)
+        customer.name = name
+        customer.arrival_time = -1
+        customer._items = None
+        customer._runs = runs
+        customer._num_items, customer._item_time = \
+            run_totals(runs) if totals is None else totals
+        return customer
 
     def num_items(self) -> int:
         """Return the number of items this customer has.
@@ -286,7 +509,7 @@ class Customer:
         >>> c.num_items()
         2
         """
-        return len(self._items)
+        return self._num_items
 
     def get_item_time(self) -> int:
         """Return the number of seconds it takes to check out this customer.
@@ -295,14 +518,14 @@ class Customer:
         >>> c.get_item_time()
         10
         """
-        total = 0
-        for item in self._items:
-            total += item.get_time()
-        return total
+        return self._item_time
 
     def get_items(self) -> List[Item]:
         """Return a list of items for this customer
 
+        If this customer was created from runs of items, a new list with every
+        item in those runs is returned.
+
         >>> c = Customer('Bo', [Item('bananas', 7), Item('cheese', 3)])
         >>> c.get_items()[0].get_item_name()
         'bananas'
@@ -313,8 +536,47 @@ class Customer:
         >>> c.get_items()[1].get_time()
         3
         """
+        if self._items is None:
+            return [item for item, count in self._runs for _ in range(count)]
         return self._items
 
+    def get_item_runs(self) -> List[Tuple[Item, int]]:
+        """Return this customer's items as (item, count) pairs, one for each
+        run of the same item in a row.
+
+        The list returned may be shared with other customers, so it must not
+        be changed.
+
+        >>> gum = Item('gum', 1)
+        >>> c = Customer('Bo', [gum, gum, Item('bread', 3)])
+        >>> runs = c.get_item_runs()
+        >>> [(item.get_item_name(), count) for item, count in runs]
+        [('gum', 2), ('bread', 1)]
+        """
+        if self._runs is not None:
+            return self._runs
+        runs = []
+        for item in self._items:
+            if runs and runs[-1][0] is item:
+                runs[-1] = (item, runs[-1][1] + 1)
+            else:
+                runs.append((item, 1))
+        return runs
+
+
+def run_totals(runs: List[Tuple[Item, int]]) -> Tuple[int, int]:
+    """Return the number of items in <runs>, a list of (item, count) pairs,
+    and the number of seconds it takes to check them all out.
+
+    >>> run_totals([(Item('gum', 1), 3), (Item('bread', 3), 2)])
+    (5, 9)
+    """
+    num_items = item_time = 0
+    for item, count in runs:
+        num_items += count
+        item_time += item.get_time() * count
+    return num_items, item_time
+
 
 # DOCSTRINGS DONE
 class Item:
@@ -328,6 +590,7 @@ class Item:
     """
     name: str
     _time: int
+    __slots__ = ('name', '_time')
 
     def __init__(self, name: str, time: int) -> None:
         """Initialize a new time with <name> and <time>.
@@ -368,7 +631,9 @@ class CheckoutLine:
     === Attributes ===
     capacity: The number of customers allowed in this CheckoutLine.
     is_open: True iff the line is open.
-    queue: Customers in this line in FIFO order.
+    queue: Customers in this line in FIFO order. A deque, so that customers
+           can leave from the front, or be moved out from the back when the
+           line closes, in constant time each.
 
     === Representation Invariants ===
     - Each customer in this line has not been checked out yet.
@@ -376,7 +641,7 @@ class CheckoutLine:
     """
     capacity: int
     is_open: bool
-    queue: List[Customer]
+    queue: Deque[Customer]
 
     def __init__(self, capacity: int) -> None:
         """Initialize an open and empty CheckoutLine.
@@ -386,12 +651,12 @@ class CheckoutLine:
         1
         >>> line.is_open
         True
-        >>> line.queue
+        >>> list(line.queue)
         []
         """
         self.capacity = capacity
         self.is_open = True
-        self.queue = []
+        self.queue = deque()
 
     def __len__(self) -> int:
         """Return the size of this CheckoutLine.
@@ -423,7 +688,7 @@ class CheckoutLine:
         True
         >>> line.accept(c2)
         False
-        >>> line.queue == [c1]
+        >>> list(line.queue) == [c1]
         True
         """
         if self.can_accept(customer):
@@ -451,7 +716,7 @@ class CheckoutLine:
         >>> line.complete_checkout()
         True
         """
-        self.queue.pop(0)
+        self.queue.popleft()
         return len(self.queue) >= 1
 
     def close(self) -> List[Customer]:
@@ -466,20 +731,21 @@ class CheckoutLine:
         True
         >>> line.accept(Customer('nye', [Item('eggs', 4)]))
         True
-        >>> line.close()[0].name == 'nye'
+        >>> line.accept(Customer('science', [Item('milk', 2)]))
         True
+        >>> [customer.name for customer in line.close()]
+        ['science', 'nye']
+        >>> [customer.name for customer in line.queue]
+        ['bill']
+        >>> line.is_open
+        False
         """
-        i = 0
+        self.is_open = False
         result = []
-        reverse_queue = self.queue[::-1]
-        while i != (len(self.queue) - 1):
-            to_move = reverse_queue.pop(i)
-            result.append(to_move)
-            i += 1
+        while len(self.queue) > 1:
+            result.append(self.queue.pop())
         return result
 
-        # logically trace through
-        # consider using for
 
 class RegularLine(CheckoutLine):
     """A regular CheckoutLine.
@@ -500,7 +766,7 @@ class RegularLine(CheckoutLine):
 
     capacity: int
     is_open: bool
-    queue: List[Customer]
+    queue: Deque[Customer]
 
     def __init__(self, capacity: int) -> None:
         """Initialize an open and empty RegularLine .
@@ -510,7 +776,7 @@ class RegularLine(CheckoutLine):
         1
         >>> line.is_open
         True
-        >>> line.queue
+        >>> list(line.queue)
         []
         """
         super().__init__(capacity)
@@ -527,14 +793,7 @@ class RegularLine(CheckoutLine):
         >>> line.start_checkout()
         3
         """
-        total_time = 0
-        customer = self.queue[0]
-        items = customer.get_items()
-        if customer is not None:
-            for item in items:
-                time = item.get_time()
-                total_time += time
-        return total_time
+        return self.queue[0].get_item_time()
 
 
 class ExpressLine(CheckoutLine):
@@ -555,7 +814,7 @@ class ExpressLine(CheckoutLine):
 
     capacity: int
     is_open: bool
-    queue: List[Customer]
+    queue: Deque[Customer]
     """
     def __init__(self, capacity: int) -> None:
         """Initialize an open and empty ExpressLine .
@@ -565,7 +824,7 @@ class ExpressLine(CheckoutLine):
         1
         >>> line.is_open
         True
-        >>> line.queue
+        >>> list(line.queue)
         []
         """
         super().__init__(capacity)
@@ -598,14 +857,7 @@ class ExpressLine(CheckoutLine):
         >>> line.start_checkout()
         3
         """
-        total_time = 0
-        customer = self.queue[0]
-        items = customer.get_items()
-        if customer is not None:
-            for item in items:
-                time = item.get_time()
-                total_time += time
-        return total_time
+        return self.queue[0].get_item_time()
 
 
 class SelfServeLine(CheckoutLine):
@@ -618,7 +870,7 @@ class SelfServeLine(CheckoutLine):
     """
     capacity: int
     is_open: bool
-    queue: List[Customer]
+    queue: Deque[Customer]
 
     def __init__(self, capacity: int) -> None:
         """Initialize an open and empty Self Serve Line.
@@ -628,7 +880,7 @@ class SelfServeLine(CheckoutLine):
         1
         >>> line.is_open
         True
-        >>> line.queue
+        >>> list(line.queue)
         []
         """
         super().__init__(capacity)
@@ -645,14 +897,7 @@ class SelfServeLine(CheckoutLine):
         >>> line.start_checkout()
         6
         """
-        total_time = 0
-        customer = self.queue[0]
-        items = customer.get_items()
-        if customer is not None:
-            for item in items:
-                time = item.get_time()
-                total_time += time
-        return total_time * 2
+        return self.queue[0].get_item_time() * 2
 
 
 if __name__ == '__main__':
@@ -660,8 +905,8 @@ if __name__ == '__main__':
     doctest.testmod()
     import python_ta
     python_ta.check_all(config={
-        'allowed-import-modules': ['__future__', 'typing', 'json',
-                                   'python_ta', 'doctest'],
+        'allowed-import-modules': ['__future__', 'typing', 'collections',
+                                   'heapq', 'json', 'python_ta', 'doctest'],
         'disable': ['W0613']})
 
 
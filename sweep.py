@@ -0,0 +1,174 @@
+"""Assignment 1 - Parameter sweeps
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module runs a GroceryStoreSimulation for every combination of a set of
+store configurations and a set of event files, using a pool of processes.
+
+Each event file is compiled into an EventTrace once, and every worker maps
+those traces instead of parsing the text again for each simulation. Results
+are given as the simulations finish, and can be collected into a table
+whose rows are always in the same order, however many workers are used.
+
+Running this module sweeps every config and event file in input_files/.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, \
+    Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import os
+import tempfile
+from event_trace import compile_events, EventTrace
+from simulation import GroceryStoreSimulation
+
+# The statistics in every row of a sweep, in the order they are shown
+STAT_NAMES = ('num_customers', 'total_time', 'max_wait')
+
+# The traces opened by this worker process, by path
+_traces: Dict[str, EventTrace] = {}
+
+
+def sweep(config_paths: Sequence[str], event_paths: Sequence[str],
+          max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Yield a row for each combination of a config in <config_paths> and an
+    event file in <event_paths>, as each simulation finishes.
+
+    Each row has the 'config' and 'events' paths, the statistics named in
+    STAT_NAMES, and an 'error' that is None, or a description of the
+    exception raised by the simulation, in which case the statistics are
+    None. The simulations run in <max_workers> processes, or in one process
+    for each core if <max_workers> is None.
+
+    Precondition: every path names a file in the format specified by the
+    assignment handout.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            ProcessPoolExecutor(max_workers) as pool:
+        traces = [os.path.join(directory, '{}.trace'.format(i))
+                  for i in range(len(event_paths))]
+        list(pool.map(_compile, event_paths, traces))
+        futures = {pool.submit(_simulate, config_path, trace):
+                   (config_path, event_path)
+                   for config_path in config_paths
+                   for event_path, trace in zip(event_paths, traces)}
+        for future in as_completed(futures):
+            config_path, event_path = futures[future]
+            row = {'config': config_path, 'events': event_path}
+            row.update(future.result())
+            yield row
+
+
+def sweep_table(config_paths: Sequence[str], event_paths: Sequence[str],
+                max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Return the rows of a sweep over <config_paths> and <event_paths>, as
+    given by sweep, in the order given by collect.
+    """
+    return collect(sweep(config_paths, event_paths, max_workers),
+                   config_paths, event_paths)
+
+
+def collect(rows: Iterable[Dict[str, Any]], config_paths: Sequence[str],
+            event_paths: Sequence[str]) -> List[Dict[str, Any]]:
+    """Return <rows> of a sweep over <config_paths> and <event_paths> ordered
+    by config and then by event file, in the order they are given.
+
+    >>> rows = [{'config': 'b', 'events': 'x'}, {'config': 'a', 'events': 'y'},
+    ...         {'config': 'a', 'events': 'x'}]
+    >>> [(row['config'], row['events'])
+    ...  for row in collect(rows, ['a', 'b'], ['x', 'y'])]
+    [('a', 'x'), ('a', 'y'), ('b', 'x')]
+    """
+    order = {}
+    for config_path in config_paths:
+        for event_path in event_paths:
+            order[(config_path, event_path)] = len(order)
+    return sorted(rows, key=lambda row: order[(row['config'], row['events'])])
+
+
+def _compile(event_path: str, trace_path: str) -> None:
+    """Compile the event file at <event_path> into a trace at <trace_path>.
+    """
+    with open(event_path) as event_file:
+        compile_events(event_file, trace_path)
+
+
+def _simulate(config_path: str, trace_path: str) -> Dict[str, Any]:
+    """Return the statistics of simulating the trace at <trace_path> in a
+    store configured by the file at <config_path>, and an 'error' of None,
+    or None for each statistic and a description of the exception raised.
+
+    The trace is opened the first time this process needs it, and kept open
+    for later simulations.
+    """
+    trace = _traces.get(trace_path)
+    if trace is None:
+        trace = EventTrace(trace_path)
+        _traces[trace_path] = trace
+    try:
+        with open(config_path) as config_file:
+            simulation = GroceryStoreSimulation(config_file)
+        stats = simulation.run(trace)
+    except Exception as error:
+        result = {name: None for name in STAT_NAMES}
+        result['error'] = '{}: {}'.format(type(error).__name__, error)
+        return result
+    result = {name: stats[name] for name in STAT_NAMES}
+    result['error'] = None
+    return result
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    """Return <row> as one line of text, with only the file names of its
+    paths.
+
+    >>> _format_row({'config': 'input_files/config_111_01.json',
+    ...              'events': 'input_files/events_one.txt',
+    ...              'num_customers': 1, 'total_time': 41, 'max_wait': 31,
+    ...              'error': None})
+    'config_111_01.json  events_one.txt  1  41  31'
+    """
+    cells = [os.path.basename(row['config']), os.path.basename(row['events'])]
+    if row['error'] is None:
+        cells.extend(str(row[name]) for name in STAT_NAMES)
+    else:
+        cells.append(row['error'])
+    return '  '.join(cells)
+
+
+def _printed(rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yield <rows>, printing each one as it is given.
+    """
+    for row in rows:
+        print(_format_row(row))
+        yield row
+
+
+def _input_files() -> Tuple[List[str], List[str]]:
+    """Return the paths of the config files and event files in input_files/,
+    in sorted order.
+    """
+    return (sorted(glob.glob(os.path.join('input_files', 'config_*.json'))),
+            sorted(glob.glob(os.path.join('input_files', 'events_*.txt'))))
+
+
+if __name__ == '__main__':
+    configs, event_files = _input_files()
+    print('As they finish:')
+    table = collect(_printed(sweep(configs, event_files)), configs,
+                    event_files)
+    print()
+    print('Table:')
+    for result in table:
+        print(_format_row(result))
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing',
+                                   'concurrent.futures', 'glob', 'os',
+                                   'tempfile', 'event_trace', 'simulation',
+                                   'python_ta', 'doctest']})
@@ -0,0 +1,142 @@
+"""CSC148 Assignment 1: Tests for the containers
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for the priority queues in container.py.
+"""
+import random
+from container import CalendarQueue, IndexedPriorityQueue, PriorityQueue, \
+    SortedListPriorityQueue
+
+
+class _Stamped:
+    """An item ordered only by its timestamp, like an Event."""
+
+    def __init__(self, timestamp: int, label: str) -> None:
+        self.timestamp = timestamp
+        self.label = label
+
+    def __eq__(self, other: '_Stamped') -> bool:
+        return self.timestamp == other.timestamp
+
+    def __lt__(self, other: '_Stamped') -> bool:
+        return self.timestamp < other.timestamp
+
+
+def test_priority_queue_ties_are_fifo() -> None:
+    """Items with equal priority come out in the order they were added."""
+    pq = PriorityQueue()
+    for label in ['a', 'b', 'c', 'd']:
+        pq.add(_Stamped(5, label))
+    pq.add(_Stamped(1, 'first'))
+    assert [pq.remove().label for _ in range(len(pq))] == \
+        ['first', 'a', 'b', 'c', 'd']
+
+
+def test_priority_queue_matches_sorted_list() -> None:
+    """The heap and the sorted list remove items in the same order."""
+    rng = random.Random(0)
+    heap, reference = PriorityQueue(), SortedListPriorityQueue()
+    for i in range(500):
+        item = _Stamped(rng.randrange(20), str(i))
+        heap.add(item)
+        reference.add(item)
+        if rng.random() < 0.3:
+            assert heap.remove() is reference.remove()
+    while not reference.is_empty():
+        assert heap.peek() is reference.peek()
+        assert heap.remove() is reference.remove()
+    assert heap.is_empty()
+
+
+def test_priority_queue_key_matches_comparisons() -> None:
+    """A PriorityQueue with a key removes items in the same order as one that
+    compares the items themselves, and never compares the items.
+    """
+    rng = random.Random(3)
+    keyed = PriorityQueue(key=lambda item: item.timestamp)
+    reference = PriorityQueue()
+    items = [_Stamped(rng.randrange(20), str(i)) for i in range(300)]
+    keyed.add_many(items[:100])
+    reference.add_many(items[:100])
+    for item in items[100:]:
+        keyed.add(item)
+        reference.add(item)
+        if rng.random() < 0.3:
+            assert keyed.remove() is reference.remove()
+    less_than = _Stamped.__lt__
+    _Stamped.__lt__ = None
+    try:
+        removed = [keyed.remove() for _ in range(len(keyed))]
+    finally:
+        _Stamped.__lt__ = less_than
+    expected = [reference.remove() for _ in range(len(reference))]
+    assert [item.label for item in removed] == \
+        [item.label for item in expected]
+
+
+def test_calendar_queue_matches_priority_queue() -> None:
+    """A CalendarQueue removes events in the same order as a PriorityQueue,
+    including events far ahead of, or behind, its current time.
+    """
+    rng = random.Random(1)
+    calendar, reference = CalendarQueue(8), PriorityQueue()
+    now = 0
+    for i in range(2000):
+        item = _Stamped(now + rng.choice([0, 1, 3, 7, 50, -5]), str(i))
+        calendar.add(item)
+        reference.add(item)
+        if rng.random() < 0.5:
+            removed = reference.remove()
+            assert calendar.remove() is removed
+            now = removed.timestamp
+    assert len(calendar) == len(reference)
+    while not reference.is_empty():
+        assert calendar.remove() is reference.remove()
+    assert calendar.is_empty()
+
+
+def test_priority_queue_bulk_load_is_fifo() -> None:
+    """Bulk-loaded items tie in the order they were given, after items that
+    were already in the queue.
+    """
+    pq = PriorityQueue.from_iterable([_Stamped(2, 'a'), _Stamped(1, 'b'),
+                                      _Stamped(2, 'c')])
+    pq.add(_Stamped(2, 'd'))
+    pq.add_many([_Stamped(2, 'e'), _Stamped(0, 'f')])
+    assert [pq.remove().label for _ in range(len(pq))] == \
+        ['f', 'b', 'a', 'c', 'd', 'e']
+
+
+def test_indexed_priority_queue_cancel_and_reschedule() -> None:
+    """Cancelled items never come out, and rescheduled items come out in
+    their new place, ties behind items already at that priority.
+    """
+    rng = random.Random(2)
+    pq = IndexedPriorityQueue()
+    expected = {}
+    handles = []
+    for i in range(300):
+        priority = rng.randrange(30)
+        handles.append(pq.add(str(i), priority))
+        expected[str(i)] = (priority, i)
+    order = 300
+    for handle in rng.sample(handles, 100):
+        if rng.random() < 0.5:
+            assert pq.cancel(handle)
+            del expected[handle[2]]
+        else:
+            priority = rng.randrange(30)
+            pq.reschedule(handle, priority)
+            expected[handle[2]] = (priority, order)
+            order += 1
+    removed = [pq.remove() for _ in range(len(pq))]
+    assert removed == sorted(expected, key=expected.get)
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['test_container.py'])
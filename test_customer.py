@@ -18,9 +18,43 @@ Author: Jacqueline Smith
 All of the files in this directory and all subdirectories are:
 Copyright (c) 2019 Jacqueline Smith
 """
-from store import Customer
+from event import iter_events
+from store import Customer, Item
 
-# TODO: write your test functions for Customer here
+
+def test_customer_totals() -> None:
+    """A customer's item count and checkout time cover all of their items."""
+    items = [Item('Gum', 1)] * 50 + [Item('Bananas', 7)]
+    customer = Customer('Jo', items)
+    assert customer.num_items() == 51
+    assert customer.get_item_time() == 57
+
+
+def test_customer_without_items() -> None:
+    """A customer with no items takes no time to check out."""
+    customer = Customer('Jo', [])
+    assert customer.num_items() == 0
+    assert customer.get_item_time() == 0
+
+
+def test_parsed_item_runs() -> None:
+    """Parsed customers hold runs of repeated items, with the same items,
+    item count and checkout time as the items listed in the event file.
+    """
+    line = '3 Arrive Jo Gum 1 Gum 1  Gum 1\tGum 10 Bread 3 Gum 1 Gum 1\n'
+    customer = next(iter_events([line])).customer
+    runs = [(item.name, item.get_time(), count)
+            for item, count in customer.get_item_runs()]
+    assert runs == [('Gum', 1, 3), ('Gum', 10, 1), ('Bread', 3, 1),
+                    ('Gum', 1, 2)]
+    assert customer.num_items() == 7
+    assert customer.get_item_time() == 18
+    assert [item.name for item in customer.get_items()] == \
+        ['Gum'] * 4 + ['Bread', 'Gum', 'Gum']
+    line = '3 Arrive Jo ' + ' '.join(['Chips 2'] * 100) + '\n'
+    customer = next(iter_events([line])).customer
+    assert [count for _, count in customer.get_item_runs()] == [100]
+    assert customer.get_item_time() == 200
 
 if __name__ == '__main__':
     import pytest
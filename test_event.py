@@ -0,0 +1,76 @@
+"""CSC148 Assignment 1: Tests for reading events
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for reading and sorting the events of an event
+file in event.py, and for seeking to a time window of it through an index in
+event_index.py.
+"""
+import random
+from io import StringIO
+from pathlib import Path
+from typing import Tuple
+import pytest
+import event
+from event import create_event_list, sorted_events, CustomerArrival, Event
+from event_index import build_index
+from scenarios import random_scenario, simulate
+from simulation import GroceryStoreSimulation
+
+
+def _describe(pending: Event) -> Tuple[int, str]:
+    """Return the timestamp of <pending> and the customer or line it is for.
+    """
+    if isinstance(pending, CustomerArrival):
+        return pending.timestamp, pending.customer.name
+    return pending.timestamp, str(pending.line_number)
+
+
+def test_sorted_events_spill_and_merge(monkeypatch: pytest.MonkeyPatch
+                                       ) -> None:
+    """Sorting the events in small runs, and merging those runs a few at a
+    time, gives them in the same order as a stable sort of the whole event
+    list.
+    """
+    monkeypatch.setattr(event, 'MAX_OPEN_RUNS', 2)
+    for seed in range(50):
+        _, events = random_scenario(seed)
+        expected = sorted(create_event_list(StringIO(events)),
+                          key=lambda e: e.timestamp)
+        merged = sorted_events(StringIO(events), run_size=3)
+        assert [_describe(e) for e in merged] == \
+            [_describe(e) for e in expected], seed
+
+
+def test_windows_match_window_files(tmp_path: Path) -> None:
+    """Simulating a window of an event file, with or without an index, gives
+    the same statistics as simulating a file with just the window's events.
+    """
+    path = str(tmp_path / 'events.txt')
+    rng = random.Random(148)
+    for seed in range(60):
+        config, events = random_scenario(seed)
+        lines = events.splitlines(keepends=True)
+        in_order = sorted(lines, key=lambda line: int(line.split()[0]))
+        if seed % 2 == 0:
+            lines = in_order
+        start, end = sorted(rng.sample(range(-1, 32), 2))
+        window = [line for line in lines
+                  if start <= int(line.split()[0]) < end]
+        expected = simulate(config, ''.join(window))
+        with open(path, 'w') as event_file:
+            event_file.writelines(lines)
+        for index in [False, True]:
+            if index:
+                assert build_index(path, stride=2) == (lines == in_order)
+            with open(path) as event_file:
+                result = GroceryStoreSimulation(StringIO(config)).run(
+                    event_file, start, end)
+            assert result == expected, (seed, index)
+
+
+if __name__ == '__main__':
+    pytest.main(['test_event.py'])
@@ -0,0 +1,60 @@
+"""CSC148 Assignment 1: Tests for simulation profiles
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for profiling simulations with the
+SimulationProfile class in event_profile.py.
+"""
+import pstats
+from io import StringIO
+from pathlib import Path
+from event_profile import SimulationProfile
+from scenarios import random_scenario, simulate
+from simulation import GroceryStoreSimulation
+
+CONFIG_FILE = '''{
+  "regular_count": 1,
+  "express_count": 0,
+  "self_serve_count": 0,
+  "line_capacity": 1
+}
+'''
+
+EVENT_FILE = '''10 Arrive Tamara Bananas 7
+5 Arrive Jugo Bread 3 Cheese 3
+'''
+
+
+def test_profile_counts_events_and_retries(tmp_path: Path) -> None:
+    """Profiling a run does not change its statistics, and when customers
+    are not parked, every arrival is either from the event file, a retry of
+    a customer who was turned away, or a customer moved from a closed line.
+    """
+    for seed in range(30):
+        config, events = random_scenario(seed)
+        expected = simulate(config, events)
+        profile = SimulationProfile()
+        simulation = GroceryStoreSimulation(StringIO(config),
+                                            park_blocked=False,
+                                            profile=profile)
+        assert simulation.run(StringIO(events)) == expected, seed
+        report = profile.report()['events']
+        arrivals = report['CustomerArrival']
+        moved = arrivals['count'] - expected['num_customers'] - \
+            arrivals['retries']
+        assert moved >= 0 if 'Close' in events else moved == 0, seed
+        assert profile.report()['queue_high_water'] >= 1
+    dump = str(tmp_path / 'run.prof')
+    profile = SimulationProfile(dump)
+    GroceryStoreSimulation(StringIO(CONFIG_FILE), profile=profile).run(
+        StringIO(EVENT_FILE))
+    assert pstats.Stats(dump).total_calls > 0
+    assert profile.report()['events']['CheckoutCompleted']['count'] == 2
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['test_event_profile.py'])
@@ -0,0 +1,49 @@
+"""CSC148 Assignment 1: Tests for compiled event traces
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for compiling event files into binary traces, and
+simulating them, in event_trace.py.
+"""
+from io import StringIO
+from pathlib import Path
+from event_trace import compile_events, EventTrace
+from scenarios import random_scenario, simulate
+from simulation import GroceryStoreSimulation
+
+
+def test_compiled_trace_matches_text(tmp_path: Path) -> None:
+    """Simulating a compiled trace gives the same statistics as simulating
+    the event file it was compiled from.
+    """
+    path = str(tmp_path / 'events.bin')
+    for seed in range(50):
+        config, events = random_scenario(seed)
+        compile_events(StringIO(events), path, run_size=4)
+        with EventTrace(path) as trace:
+            compiled = GroceryStoreSimulation(StringIO(config)).run(trace)
+        assert compiled == simulate(config, events), seed
+
+
+def test_empty_basket_before_another_basket(tmp_path: Path) -> None:
+    """A customer with no items does not give their basket to the customer
+    after them, whose runs start where the empty basket's would.
+    """
+    path = str(tmp_path / 'events.bin')
+    config = ('{"regular_count": 1, "express_count": 0, '
+              '"self_serve_count": 0, "line_capacity": 5}')
+    events = '1 Arrive Bob\n2 Arrive Ann Gum 5 Bread 3\n3 Arrive Cy\n'
+    compile_events(StringIO(events), path)
+    with EventTrace(path) as trace:
+        assert [e.customer.num_items() for e in trace.events()] == [0, 2, 0]
+        compiled = GroceryStoreSimulation(StringIO(config)).run(trace)
+    assert compiled == simulate(config, events)
+    assert compiled['total_time'] == 10 and compiled['max_wait'] == 8
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['test_event_trace.py'])
@@ -18,14 +18,53 @@ Author: Jacqueline Smith
 All of the files in this directory and all subdirectories are:
 Copyright (c) 2019 Jacqueline Smith
 """
+import random
 from io import StringIO
-from store import GroceryStore
+from store import GroceryStore, Customer, Item
 
-# TODO: write your test functions for GroceryStore here
 # Note - your tests should use StringIO to simulate opening a configuration file
 # rather than requiring separate files.
 # See the Assignment 0 sample test for an example of using StringIO in testing.
 
+CONFIG_FILE = '''{
+  "regular_count": 3,
+  "express_count": 2,
+  "self_serve_count": 2,
+  "line_capacity": 3
+}
+'''
+
+
+def _scan_for_line(store: GroceryStore, customer: Customer) -> int:
+    """Return the line <customer> should join, by checking every line."""
+    best = -1
+    for i, line in enumerate(store.get_line_list()):
+        if line.can_accept(customer) and \
+                (best == -1 or len(line) < len(store.get_line_list()[best])):
+            best = i
+    return best
+
+
+def test_enter_line_matches_scan() -> None:
+    """enter_line picks the same line as checking every line would, as lines
+    fill, empty and close.
+    """
+    rng = random.Random(0)
+    store = GroceryStore(StringIO(CONFIG_FILE))
+    lines = store.get_line_list()
+    for i in range(2000):
+        action = rng.random()
+        if action < 0.6:
+            customer = Customer(str(i), [Item('gum', 1)] * rng.choice([1, 9]))
+            expected = _scan_for_line(store, customer)
+            assert store.enter_line(customer) == expected
+        elif action < 0.99:
+            busy = [n for n, line in enumerate(lines) if len(line) > 0]
+            if busy:
+                store.complete_checkout(rng.choice(busy))
+        else:
+            store.close_line(rng.randrange(len(lines)))
+
 if __name__ == '__main__':
     import pytest
     pytest.main(['test_grocerystore.py'])
@@ -0,0 +1,44 @@
+"""CSC148 Assignment 1: Tests for incremental simulation
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for simulating a growing event log with the
+IncrementalSimulation class in incremental.py.
+"""
+import random
+from pathlib import Path
+from incremental import IncrementalSimulation
+from scenarios import random_scenario, simulate
+
+
+def test_incremental_updates_match_full_runs(tmp_path: Path) -> None:
+    """Updating an incremental simulation as its log grows, including with
+    late events and lines that are only partly written, gives the same
+    statistics as simulating the whole log.
+    """
+    config_path = tmp_path / 'config.json'
+    log_path = tmp_path / 'events.txt'
+    rollbacks = 0
+    for seed in range(20):
+        config, events = random_scenario(seed)
+        config_path.write_text(config)
+        log_path.write_text('')
+        rng = random.Random(seed)
+        with IncrementalSimulation(str(config_path), str(log_path),
+                                   rollback_events=3) as live:
+            written = 0
+            while written < len(events):
+                written = min(written + rng.randint(1, 40), len(events))
+                log_path.write_text(events[:written])
+                complete = events[:events.rfind('\n', 0, written) + 1]
+                assert live.update() == simulate(config, complete), seed
+            rollbacks += live.rollbacks
+    assert rollbacks > 0
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['test_incremental.py'])
@@ -0,0 +1,55 @@
+"""CSC148 Assignment 1: Tests for the single line fast path
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for computing single line scenarios with
+Lindley's recurrence in lindley.py.
+"""
+import json
+import random
+from pathlib import Path
+import pytest
+import lindley
+from scenarios import simulate
+
+
+def test_single_line_fast_path_matches_simulation(
+        monkeypatch: pytest.MonkeyPatch) -> None:
+    """The single line fast path gives the same statistics as simulating the
+    shipped input files, and random single line scenarios, with and without
+    NumPy.
+    """
+    inputs = Path('input_files')
+    configs = sorted(str(path) for path in inputs.glob('config_*'))
+    event_files = sorted(str(path) for path in inputs.glob('events_*'))
+    checks = lindley.cross_check(configs, event_files)
+    assert len(checks) == 4 * len(event_files)
+    assert all(same for _, _, same in checks)
+    rng = random.Random(148)
+    for numpy in [lindley.numpy, None]:
+        monkeypatch.setattr(lindley, 'numpy', numpy)
+        for kind in ['regular_count', 'express_count', 'self_serve_count']:
+            counts = {'regular_count': 0, 'express_count': 0,
+                      'self_serve_count': 0,
+                      'line_capacity': rng.randint(1, 4)}
+            counts[kind] = 1
+            config = json.dumps(counts)
+            texts = []
+            for _ in range(40):
+                end = rng.choice([10, 100])
+                texts.append(''.join(
+                    '{} Arrive C{} {}\n'.format(
+                        rng.randint(0, end), i,
+                        ' '.join('Gum {}'.format(rng.randint(0, 3))
+                                 for _ in range(rng.choice([1, 2, 8]))))
+                    for i in range(rng.randint(0, 12))))
+            for text, stats in zip(texts,
+                                   lindley.run_single_line(config, texts)):
+                assert stats == simulate(config, text), (config, text)
+
+
+if __name__ == '__main__':
+    pytest.main(['test_lindley.py'])
@@ -0,0 +1,128 @@
+"""CSC148 Assignment 1: Tests for live feeds
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for simulating lines as they are received with
+the LiveSimulation class in live_feed.py.
+"""
+import asyncio
+from io import StringIO
+from pathlib import Path
+from typing import List, Optional, Tuple
+import pytest
+import live_feed
+from live_feed import feed_socket, serve_unix, LiveSimulation
+from scenarios import random_scenario, simulate
+
+# The lines a feed sends that cannot be parsed, each with {} for a timestamp
+MALFORMED_LINES = ['{}\n', '{} Close 99\n', '{} Arrive Bob Gum\n',
+                   '{} Arrive\n', '{} Close nine\n', '{}x Close 1\n',
+                   'Arrive Bob Gum x\n']
+
+
+class _Clock:
+    """A clock that stands still until <live> has received a line, and then
+    moves on <step> seconds each time it is read.
+    """
+    step: float
+    time: float
+    live: Optional[LiveSimulation]
+
+    def __init__(self, step: float) -> None:
+        """Initialize a clock at time 0 that moves on <step> seconds a read.
+        """
+        self.step = step
+        self.time = 0.0
+        self.live = None
+
+    def __call__(self) -> float:
+        """Return the time, moving it on first if <live> has received a line.
+        """
+        if self.live is not None and self.live.lines_received:
+            self.time += self.step
+        return self.time
+
+
+def _live_lines(seed: int) -> Tuple[str, List[str], List[str], List[int]]:
+    """Return a config and the lines a live feed sends for the scenario with
+    <seed>, ten seconds apart with some lines late and some malformed.
+
+    Also return the lines of the event file the feed should be simulated as,
+    and how many lines are sent before each of those.
+    """
+    config, events = random_scenario(seed)
+    in_order = sorted(events.splitlines(keepends=True),
+                      key=lambda line: int(line.split()[0]))
+    sent = []
+    expected = []
+    sent_before = []
+    latest = 0
+    for i, line in enumerate(in_order):
+        rest = line.split(None, 1)[1]
+        timestamp = 10 * i - (25 if i % 4 == 3 else 0)
+        latest = max(latest, timestamp)
+        sent_before.append(len(sent))
+        sent.append('{} {}'.format(timestamp, rest))
+        expected.append('{} {}'.format(latest, rest))
+        if i % 5 == 2:
+            sent.append(MALFORMED_LINES[i % len(MALFORMED_LINES)].format(
+                timestamp))
+    return config, sent, expected, sent_before
+
+
+def test_live_feed_matches_simulation(tmp_path: Path,
+                                      monkeypatch: pytest.MonkeyPatch
+                                      ) -> None:
+    """A live simulation fed over a Unix socket faster than its clock gives
+    the same final statistics as simulating the lines from a file, with late
+    lines moved forward and malformed lines dropped, and stops reading lines
+    until the clock catches up with them.
+    """
+    monkeypatch.setattr(live_feed, 'TICK', 0.001)
+    for seed in range(5):
+        path = str(tmp_path / 'feed{}.sock'.format(seed))
+        config, sent, expected, sent_before = _live_lines(seed)
+        snapshots = []
+        clock = _Clock(0.25)
+        live = LiveSimulation(StringIO(config), time_scale=4.0, max_pending=4,
+                              snapshot_interval=0.5,
+                              publish=snapshots.append, clock=clock)
+        clock.live = live
+
+        async def shadow() -> dict:
+            """Serve the socket while a feeder writes the lines to it."""
+            served = asyncio.create_task(serve_unix(live, path, 1))
+            while not Path(path).exists():
+                await asyncio.sleep(0.01)
+            await feed_socket(path, sent)
+            return await served
+
+        stats = asyncio.run(shadow())
+        assert stats == simulate(config, ''.join(expected)), seed
+        assert live.lines_received == len(sent)
+        assert live.malformed_lines == len(sent) - len(expected)
+        assert live.moved_forward == sum(
+            sent[before] != line for before, line in zip(sent_before,
+                                                         expected))
+        assert live.most_waiting == 4
+        final = snapshots.pop()
+        assert final['final'] and final['lines_received'] == len(sent)
+        assert final['moved_forward'] == live.moved_forward
+        assert final['malformed_lines'] == live.malformed_lines
+        assert snapshots, seed
+        for snapshot in snapshots:
+            # Only the lines up to the first one not yet due can have been
+            # taken, and then one is held and the queue is full
+            not_due = [before for before, line in zip(sent_before, expected)
+                       if int(line.split()[0]) >= snapshot['time']]
+            if not_due:
+                assert snapshot['lines_received'] <= not_due[0] + 1 + 4, \
+                    (seed, snapshot)
+        assert snapshots[0]['lines_received'] < len(sent), seed
+
+
+if __name__ == '__main__':
+    pytest.main(['test_live_feed.py'])
@@ -0,0 +1,134 @@
+"""CSC148 Assignment 1: Tests for GroceryStoreSimulation
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for the ways GroceryStoreSimulation can process
+events, and for checkpointing and restoring it, in simulation.py.
+"""
+from io import StringIO
+from pathlib import Path
+import pytest
+from container import CalendarQueue, PriorityQueue
+from event import create_event_list, CheckoutCompleted, CustomerArrival
+from event_profile import SimulationProfile
+from event_trace import compile_events, EventTrace
+from scenarios import random_scenario, simulate
+from simulation import CHECKPOINT_VERSION, GroceryStoreSimulation
+from store import GroceryStore
+
+
+def test_parked_customers_match_retries() -> None:
+    """Parking blocked customers gives the same statistics as retrying them
+    every second.
+    """
+    for seed in range(200):
+        config, events = random_scenario(seed)
+        retried = GroceryStoreSimulation(StringIO(config), park_blocked=False)
+        assert retried.run(StringIO(events)) == simulate(config, events), seed
+
+
+def _one_at_a_time(config: str, events: str) -> dict:
+    """Return the statistics of simulating <events> in the store configured
+    by <config>, taking the events from a queue one at a time.
+    """
+    store = GroceryStore(StringIO(config))
+    queue = PriorityQueue()
+    initial = create_event_list(StringIO(events))
+    for pending in initial:
+        queue.add(pending)
+    stats = {'num_customers': sum(isinstance(pending, CustomerArrival)
+                                  for pending in initial),
+             'total_time': 0, 'max_wait': -1}
+    while not queue.is_empty():
+        pending = queue.remove()
+        stats['total_time'] = pending.timestamp
+        if isinstance(pending, CheckoutCompleted):
+            stats['max_wait'] = max(stats['max_wait'], pending.timestamp -
+                                    pending.customer.arrival_time)
+        for new_event in pending.do(store):
+            queue.add(new_event)
+    return stats
+
+
+def test_run_matches_one_event_at_a_time() -> None:
+    """run() gives the same statistics as a bare loop that takes the events
+    from a queue one at a time, whether or not customers are parked.
+    """
+    for seed in range(100):
+        config, events = random_scenario(seed)
+        expected = _one_at_a_time(config, events)
+        for park_blocked in [True, False]:
+            simulation = GroceryStoreSimulation(StringIO(config),
+                                                park_blocked=park_blocked)
+            assert simulation.run(StringIO(events)) == expected, seed
+
+
+class _Crash(SimulationProfile):
+    """A profile that raises RuntimeError once <limit> events have been
+    processed, to stand in for a run that dies partway through.
+    """
+    limit: int
+
+    def __init__(self, limit: int) -> None:
+        """Initialize a profile that crashes the run at event <limit>."""
+        super().__init__()
+        self.limit = limit
+
+    def record(self, *args: object) -> None:
+        """Count an event processed, raising RuntimeError at the limit."""
+        self.limit -= 1
+        if self.limit == 0:
+            raise RuntimeError('crashed')
+
+
+def test_restored_checkpoints_resume_runs(tmp_path: Path) -> None:
+    """A run that dies partway through, resumed from its last checkpoint,
+    gives the same statistics as a run that did not die.
+    """
+    path = str(tmp_path / 'events.bin')
+    snapshot = str(tmp_path / 'snapshot')
+    for seed in range(40):
+        config, events = random_scenario(seed)
+        compile_events(StringIO(events), path)
+        expected = simulate(config, events)
+        for queue_type in [PriorityQueue, CalendarQueue]:
+            Path(snapshot).unlink(missing_ok=True)
+            crashed = GroceryStoreSimulation(StringIO(config), queue_type,
+                                             profile=_Crash(seed + 5))
+            try:
+                crashed.run(StringIO(events), checkpoint_path=snapshot,
+                            checkpoint_every=seed % 4 + 1)
+            except RuntimeError:
+                pass
+            with EventTrace(path) as trace:
+                for file in [StringIO(events), trace]:
+                    resumed = GroceryStoreSimulation(StringIO(config))
+                    if Path(snapshot).exists():
+                        resumed.restore(snapshot)
+                    assert resumed.run(file) == expected, seed
+
+
+def test_restore_rejects_other_files_and_versions(tmp_path: Path) -> None:
+    """Restoring a file that is not a checkpoint, or a checkpoint in another
+    format version, raises ValueError without unpickling it.
+    """
+    config, events = random_scenario(0)
+    snapshot = tmp_path / 'snapshot'
+    GroceryStoreSimulation(StringIO(config)).run(
+        StringIO(events), checkpoint_path=str(snapshot), checkpoint_every=1)
+    written = snapshot.read_bytes()
+    stale = CHECKPOINT_VERSION - 1
+    for data, message in [(b'', 'is not a checkpoint'),
+                          (b'\x80\x05' + written[6:], 'is not a checkpoint'),
+                          (written[:4] + stale.to_bytes(2, 'little') +
+                           written[6:], 'is a version {} '.format(stale))]:
+        snapshot.write_bytes(data)
+        with pytest.raises(ValueError, match=message):
+            GroceryStoreSimulation(StringIO(config)).restore(str(snapshot))
+
+
+if __name__ == '__main__':
+    pytest.main(['test_simulation.py'])
@@ -0,0 +1,91 @@
+"""CSC148 Assignment 1: Tests for sweeps and replications
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for sweeping configs and event files in sweep.py,
+and for replicating random workloads in replication.py.
+"""
+from io import StringIO
+from pathlib import Path
+import pytest
+from replication import replicate
+from scenarios import random_scenario
+from simulation import GroceryStoreSimulation
+from sweep import sweep_table
+from workload import WorkloadModel
+
+
+@pytest.mark.parametrize('empty_baskets', [False, True])
+def test_sweep_matches_direct_runs(tmp_path: Path, empty_baskets: bool
+                                   ) -> None:
+    """A sweep gives the same table with one worker or several, and each row
+    has the statistics of simulating its config and event file directly, or
+    the error that simulation raised, including when some customers have no
+    items if <empty_baskets> is True.
+    """
+    configs = []
+    event_files = []
+    for seed in range(6):
+        config, events = random_scenario(seed)
+        lines = events.splitlines(keepends=True)
+        for i in range(seed % 3, len(lines), 3):
+            if empty_baskets and 'Arrive' in lines[i]:
+                lines[i] = ' '.join(lines[i].split()[:3]) + '\n'
+        configs.append(str(tmp_path / 'config_{}.json'.format(seed)))
+        event_files.append(str(tmp_path / 'events_{}.txt'.format(seed)))
+        Path(configs[-1]).write_text(config)
+        Path(event_files[-1]).write_text(''.join(lines))
+    event_files.append('input_files/events_mixtures.txt')
+    configs.append('input_files/config_001_10.json')
+    table = sweep_table(configs, event_files, max_workers=1)
+    assert sweep_table(configs, event_files, max_workers=3) == table
+    assert [(row['config'], row['events']) for row in table] == \
+        [(c, e) for c in configs for e in event_files]
+    for row in table:
+        with open(row['config']) as config_file, \
+                open(row['events']) as event_file:
+            simulation = GroceryStoreSimulation(config_file)
+            try:
+                expected = simulation.run(event_file)
+            except IndexError as error:
+                assert row['error'] == 'IndexError: {}'.format(error)
+                continue
+        assert row.pop('error') is None
+        assert {name: row[name] for name in expected} == expected, \
+            (row['config'], row['events'])
+
+
+def test_replications_stop_early_and_match_direct_runs() -> None:
+    """Replications give the same estimates with one worker or several, stop
+    as soon as the intervals are narrow enough, and average the statistics
+    of simulating each seeded arrival stream directly.
+    """
+    config = 'input_files/config_642_05.json'
+    model = WorkloadModel(50, 0.5)
+    estimates = replicate(config, model, 8, max_workers=1, seed='t')
+    parallel = replicate(config, model, 8, max_workers=3, seed='t')
+    for name, estimate in estimates.items():
+        assert vars(parallel[name]) == vars(estimate)
+        assert estimate.count == 8
+    max_waits = []
+    for i in range(8):
+        with open(config) as config_file:
+            simulation = GroceryStoreSimulation(config_file)
+        events = ''.join(model.lines('t:{}'.format(i)))
+        stats = simulation.run(StringIO(events))
+        max_waits.append(stats['max_wait'])
+    assert estimates['max_wait'].mean == sum(max_waits) / 8
+
+    wide = replicate(config, model, 8, widths={'max_wait': 1e9},
+                     min_replications=4, max_workers=2, seed='t')
+    assert wide['max_wait'].count == 4
+    narrow = replicate(config, model, 8, widths={'max_wait': 0.0},
+                       max_workers=2, seed='t')
+    assert narrow['max_wait'].count == 8
+
+
+if __name__ == '__main__':
+    pytest.main(['test_sweep.py'])
@@ -0,0 +1,80 @@
+"""CSC148 Assignment 1: Tests for wait statistics and timelines
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for collecting wait statistics in wait_stats.py,
+and for exporting line activity as a timeline in timeline.py.
+"""
+import json
+import random
+from io import StringIO
+from pathlib import Path
+from scenarios import random_scenario, simulate
+from simulation import GroceryStoreSimulation
+from timeline import TimelineWriter
+from wait_stats import QuantileSketch, WaitStatistics
+
+
+def test_wait_statistics_leave_stats_unchanged() -> None:
+    """Collecting wait statistics does not change the statistics returned by
+    run(), and they account for every customer who finished.
+    """
+    for seed in range(50):
+        config, events = random_scenario(seed)
+        expected = simulate(config, events)
+        wait_stats = WaitStatistics(top_k=3)
+        simulation = GroceryStoreSimulation(StringIO(config),
+                                            wait_stats=wait_stats)
+        assert simulation.run(StringIO(events)) == expected, seed
+        report = wait_stats.report()
+        assert sum(count for _, count in report['histogram']) == \
+            report['count'] == sum(report['completed'].values())
+        if report['count']:
+            assert report['slowest'][0][1] == expected['max_wait'], seed
+            assert len(report['slowest']) == min(3, report['count'])
+
+
+def test_quantile_sketch_relative_error() -> None:
+    """A QuantileSketch estimates quantiles to within its relative error of
+    the exact value at the same rank.
+    """
+    rng = random.Random(148)
+    values = sorted(int(rng.expovariate(0.01)) for _ in range(5000))
+    sketch = QuantileSketch(0.01)
+    for value in values:
+        sketch.add(value)
+    for q in [0, 0.1, 0.5, 0.9, 0.95, 0.99, 1]:
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact, q
+
+
+def test_timeline_spans_match_checkouts(tmp_path: Path) -> None:
+    """A timeline is valid Chrome trace JSON, even when written one event at
+    a time, in which every customer who finished checking out has one
+    checkout span, and every wait that started has ended.
+    """
+    path = str(tmp_path / 'timeline.json')
+    for seed in range(30):
+        config, events = random_scenario(seed)
+        wait_stats = WaitStatistics()
+        with TimelineWriter(path, chunk_events=1 + seed % 3) as timeline:
+            stats = GroceryStoreSimulation(
+                StringIO(config), wait_stats=wait_stats,
+                timeline=timeline).run(StringIO(events))
+        with open(path) as trace_file:
+            trace = json.load(trace_file)['traceEvents']
+        phases = [trace_event['ph'] for trace_event in trace]
+        completed = wait_stats.report()['count']
+        assert phases.count('B') == phases.count('E') == completed, seed
+        assert phases.count('b') == phases.count('e'), seed
+        if completed:
+            last = max(trace_event.get('ts', 0) for trace_event in trace)
+            assert last == stats['total_time'] * 1000000, seed
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['test_wait_stats.py'])
@@ -0,0 +1,42 @@
+"""CSC148 Assignment 1: Tests for synthetic workloads
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains tests for generating event files with the
+WorkloadModel class in workload.py.
+"""
+from pathlib import Path
+from event import create_event_list, CustomerArrival
+from workload import RANDOM_CLOSURES, UNIFORM, WorkloadModel
+
+
+def test_workload_files_are_sorted_event_files(tmp_path: Path) -> None:
+    """A generated workload is an event file in timestamp order, with the
+    customers, baskets and closures its model asks for.
+    """
+    path = str(tmp_path / 'events.txt')
+    model = WorkloadModel(500, 2.0, mean_items=3, basket=UNIFORM,
+                          num_closures=5, closures=RANDOM_CLOSURES,
+                          num_lines=4)
+    assert model.write(path, 148) == 505
+    with open(path) as event_file:
+        events = create_event_list(event_file)
+    assert [e.timestamp for e in events] == \
+        sorted(e.timestamp for e in events)
+    customers = [e.customer for e in events if isinstance(e, CustomerArrival)]
+    assert len(customers) == 500
+    assert {c.num_items() for c in customers} == {1, 2, 3, 4, 5}
+    closed = [e.line_number for e in events
+              if not isinstance(e, CustomerArrival)]
+    assert len(closed) == 5 and all(1 <= line < 4 for line in closed)
+    without_closures = WorkloadModel(500, 2.0, mean_items=3, basket=UNIFORM)
+    assert [line for line in model.lines(148) if 'Arrive' in line] == \
+        list(without_closures.lines(148))
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main(['test_workload.py'])
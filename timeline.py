@@ -0,0 +1,175 @@
+"""Assignment 1 - Line activity timelines
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module writes the activity of the checkout lines during a simulation as
+a trace in the Chrome trace event format, which can be opened in a timeline
+viewer such as Perfetto or chrome://tracing.
+
+Each line is a thread of the trace. A customer's wait in a line, from
+joining it until they start checking out or are moved out of it when it
+closes, is an async span on that line's thread, and their checkout is a
+duration span. Being moved out of a closing line is also an instant event.
+One second of the simulation is one second of the timeline.
+
+Events are written as they happen, a chunk at a time, so the trace of a long
+run is never held in memory.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, TextIO
+import json
+from store import Customer
+
+# The number of trace events buffered before they are written by default
+CHUNK_EVENTS = 4096
+
+# The number of microseconds in one second of the simulation
+MICROSECONDS = 1000000
+
+
+class TimelineWriter:
+    """A writer of a Chrome trace of the activity of checkout lines.
+
+    Pass a TimelineWriter to a GroceryStoreSimulation to have the activity of
+    its lines written as run() processes each event. Close the writer once
+    it has been used to finish the trace.
+
+    === Private Attributes ===
+    _file: The file the trace is written to, or None once it is closed.
+    _buffer: The trace events not yet written to _file.
+    _chunk_events: The number of trace events buffered before they are
+                   written.
+    _next_id: The id of the next customer to join a line.
+    _waiting: The id of each customer waiting in a line, by the id() of the
+              customer.
+    _first: True iff no trace events have been written yet.
+    """
+    _file: Optional[TextIO]
+    _buffer: List[str]
+    _chunk_events: int
+    _next_id: int
+    _waiting: Dict[int, int]
+    _first: bool
+
+    def __init__(self, path: str, chunk_events: int = CHUNK_EVENTS) -> None:
+        """Initialize a writer of a trace to the file at <path>, which writes
+        trace events <chunk_events> at a time.
+
+        Precondition: chunk_events > 0
+        """
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        self._buffer = []
+        self._chunk_events = chunk_events
+        self._next_id = 0
+        self._waiting = {}
+        self._first = True
+
+    def __enter__(self) -> TimelineWriter:
+        """Return this writer, to be closed at the end of a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close this writer.
+        """
+        self.close()
+
+    def name_lines(self, line_types: List[str]) -> None:
+        """Name the thread of each line after its number and its type in
+        <line_types>.
+        """
+        for line_number, line_type in enumerate(line_types):
+            self._add({'ph': 'M', 'name': 'thread_name', 'pid': 0,
+                       'tid': line_number,
+                       'args': {'name': 'Line {} ({})'.format(line_number,
+                                                             line_type)}})
+
+    def join(self, timestamp: int, customer: Customer, line_number: int
+             ) -> None:
+        """Record that <customer> joined line <line_number> at <timestamp>.
+        """
+        self._waiting[id(customer)] = self._next_id
+        self._add({'ph': 'b', 'cat': 'wait', 'name': customer.name,
+                   'id': self._next_id, 'pid': 0, 'tid': line_number,
+                   'ts': timestamp * MICROSECONDS})
+        self._next_id += 1
+
+    def start_checkout(self, timestamp: int, customer: Customer,
+                       line_number: int) -> None:
+        """Record that <customer> started checking out at line <line_number>
+        at <timestamp>.
+        """
+        self._end_wait(timestamp, customer, line_number)
+        self._add({'ph': 'B', 'name': customer.name, 'pid': 0,
+                   'tid': line_number, 'ts': timestamp * MICROSECONDS})
+
+    def complete_checkout(self, timestamp: int, customer: Customer,
+                          line_number: int) -> None:
+        """Record that <customer> finished checking out at line <line_number>
+        at <timestamp>.
+        """
+        self._add({'ph': 'E', 'name': customer.name, 'pid': 0,
+                   'tid': line_number, 'ts': timestamp * MICROSECONDS})
+
+    def requeue(self, timestamp: int, customer: Customer,
+                line_number: int) -> None:
+        """Record that <customer> was moved out of line <line_number> when it
+        closed at <timestamp>.
+        """
+        self._end_wait(timestamp, customer, line_number)
+        self._add({'ph': 'i', 's': 't', 'name': 'requeue', 'pid': 0,
+                   'tid': line_number, 'ts': timestamp * MICROSECONDS,
+                   'args': {'customer': customer.name}})
+
+    def flush(self) -> None:
+        """Write the buffered trace events to the file.
+        """
+        if self._buffer and self._file is not None:
+            if not self._first:
+                self._file.write(',\n')
+            self._file.write(',\n'.join(self._buffer))
+            self._file.flush()
+            self._first = False
+            self._buffer = []
+
+    def close(self) -> None:
+        """Write the buffered trace events and the end of the trace, and close
+        the file.
+        """
+        if self._file is None:
+            return
+        self.flush()
+        self._file.write('\n]}\n')
+        self._file.close()
+        self._file = None
+
+    def _end_wait(self, timestamp: int, customer: Customer,
+                  line_number: int) -> None:
+        """Record that <customer> stopped waiting in line <line_number> at
+        <timestamp>, if they were waiting in a line.
+        """
+        wait_id = self._waiting.pop(id(customer), None)
+        if wait_id is not None:
+            self._add({'ph': 'e', 'cat': 'wait', 'name': customer.name,
+                       'id': wait_id, 'pid': 0, 'tid': line_number,
+                       'ts': timestamp * MICROSECONDS})
+
+    def _add(self, trace_event: Dict[str, Any]) -> None:
+        """Buffer <trace_event>, writing the buffer out once it is full.
+        """
+        self._buffer.append(json.dumps(trace_event, separators=(',', ':')))
+        if len(self._buffer) >= self._chunk_events:
+            self.flush()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'json', 'store',
+                                   'python_ta', 'doctest']})
@@ -0,0 +1,277 @@
+"""Assignment 1 - Wait time statistics
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains an opt-in collector of statistics about how long
+customers wait, for a GroceryStoreSimulation to update as each customer
+finishes checking out.
+
+The collector never keeps the wait of every customer. Percentiles come from
+a sketch with a bounded relative error, the histogram has a fixed set of
+buckets, and only the k slowest customers are remembered, so its memory
+does not grow with the number of customers.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import bisect
+import heapq
+import math
+
+# The lower bounds of the buckets of a wait time histogram by default
+WAIT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# The relative error of a QuantileSketch by default
+RELATIVE_ACCURACY = 0.01
+
+# The number of slowest customers remembered by default
+TOP_K = 10
+
+# The percentiles reported by WaitStatistics
+PERCENTILES = (50, 95, 99)
+
+
+class QuantileSketch:
+    """A sketch of a distribution of non-negative numbers, which estimates its
+    quantiles to within a relative error.
+
+    Each positive value is counted in the bucket of values between
+    consecutive powers of a base slightly larger than one, so the number of
+    buckets only grows with the logarithm of the largest value.
+
+    === Private Attributes ===
+    _accuracy: The relative error of the estimated quantiles.
+    _log_base: The natural logarithm of the base of the buckets.
+    _buckets: How many values have been added to each bucket, by the
+              exponent of its upper bound.
+    _zeros: How many values of zero or less have been added.
+    _count: How many values have been added.
+
+    === Representation Invariants ===
+    - 0 < _accuracy < 1
+    - _count == _zeros + sum(_buckets.values())
+    """
+    _accuracy: float
+    _log_base: float
+    _buckets: Dict[int, int]
+    _zeros: int
+    _count: int
+
+    def __init__(self, accuracy: float = RELATIVE_ACCURACY) -> None:
+        """Initialize an empty sketch whose quantiles are within a relative
+        error of <accuracy>.
+
+        Precondition: 0 < accuracy < 1
+        """
+        self._accuracy = accuracy
+        self._log_base = math.log((1 + accuracy) / (1 - accuracy))
+        self._buckets = {}
+        self._zeros = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of values added to this sketch.
+        """
+        return self._count
+
+    def add(self, value: float) -> None:
+        """Add <value> to this sketch.
+        """
+        self._count += 1
+        if value <= 0:
+            self._zeros += 1
+        else:
+            exponent = math.ceil(math.log(value) / self._log_base)
+            self._buckets[exponent] = self._buckets.get(exponent, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """Return an estimate of the <q> quantile of the values added to this
+        sketch, or nan if no values have been added.
+
+        Precondition: 0 <= q <= 1
+
+        >>> sketch = QuantileSketch()
+        >>> for value in range(101):
+        ...     sketch.add(value)
+        >>> abs(sketch.quantile(0.5) - 50) <= 0.5
+        True
+        >>> sketch.quantile(0)
+        0.0
+        """
+        if self._count == 0:
+            return math.nan
+        rank = q * (self._count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.0
+        for exponent in sorted(self._buckets):
+            seen += self._buckets[exponent]
+            if rank < seen:
+                break
+        # The midpoint of the bucket, in terms of relative error
+        return 2 * math.exp(exponent * self._log_base) / \
+            (1 + math.exp(self._log_base))
+
+
+class Histogram:
+    """A histogram with a fixed set of buckets.
+
+    === Attributes ===
+    bounds: The lower bound of each bucket. Each bucket holds the values from
+            its bound up to, but not including, the next one, and the last
+            bucket has no upper bound.
+    counts: How many values are in each bucket.
+
+    === Representation Invariants ===
+    - bounds is sorted in increasing order
+    - len(counts) == len(bounds)
+    """
+    bounds: Tuple[float, ...]
+    counts: List[int]
+
+    def __init__(self, bounds: Sequence[float] = WAIT_BUCKETS) -> None:
+        """Initialize an empty histogram with buckets starting at <bounds>.
+
+        Values below the first bound are counted in the first bucket.
+
+        Precondition: <bounds> is non-empty and sorted in increasing order.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * len(self.bounds)
+
+    def add(self, value: float) -> None:
+        """Count <value> in its bucket of this histogram.
+
+        >>> histogram = Histogram([0, 10, 100])
+        >>> for value in [3, 10, 99, 1000]:
+        ...     histogram.add(value)
+        >>> histogram.counts
+        [1, 2, 1]
+        """
+        self.counts[max(bisect.bisect_right(self.bounds, value) - 1, 0)] += 1
+
+
+class WaitStatistics:
+    """Statistics about how long customers waited to finish checking out.
+
+    Pass a WaitStatistics to a GroceryStoreSimulation to have it updated as
+    each customer finishes checking out. A customer's wait is measured in
+    the same way as for max_wait in the simulation's statistics.
+
+    === Attributes ===
+    sketch: A sketch of the distribution of waits.
+    histogram: A histogram of the waits.
+
+    === Private Attributes ===
+    _top_k: How many of the slowest customers are remembered.
+    _slowest: A heap of the slowest customers so far, as (wait, -order,
+              name) entries, where order is the number of customers who
+              finished before them.
+    _total_wait: The sum of all the waits.
+    _completed: How many customers finished at each type of line.
+    _first_arrival: The earliest arrival time of a customer who finished, or
+                    None if none have.
+    _last_completion: The time the last customer finished, or None if none
+                      have.
+    """
+    sketch: QuantileSketch
+    histogram: Histogram
+    _top_k: int
+    _slowest: List[Tuple[int, int, str]]
+    _total_wait: int
+    _completed: Dict[str, int]
+    _first_arrival: Optional[int]
+    _last_completion: Optional[int]
+
+    def __init__(self, top_k: int = TOP_K,
+                 buckets: Sequence[float] = WAIT_BUCKETS,
+                 accuracy: float = RELATIVE_ACCURACY) -> None:
+        """Initialize empty statistics, which remember the <top_k> slowest
+        customers, count waits in a histogram with the lower bounds
+        <buckets>, and estimate percentiles within a relative error of
+        <accuracy>.
+
+        Precondition: top_k >= 0, and 0 < accuracy < 1.
+        """
+        self.sketch = QuantileSketch(accuracy)
+        self.histogram = Histogram(buckets)
+        self._top_k = top_k
+        self._slowest = []
+        self._total_wait = 0
+        self._completed = {}
+        self._first_arrival = None
+        self._last_completion = None
+
+    def record(self, timestamp: int, arrival_time: int, name: str,
+               line_type: str) -> None:
+        """Record that the customer <name>, who arrived at <arrival_time>,
+        finished checking out at a line of type <line_type> at <timestamp>.
+        """
+        wait = timestamp - arrival_time
+        self.sketch.add(wait)
+        self.histogram.add(wait)
+        self._total_wait += wait
+        self._completed[line_type] = self._completed.get(line_type, 0) + 1
+        if self._first_arrival is None or arrival_time < self._first_arrival:
+            self._first_arrival = arrival_time
+        self._last_completion = timestamp
+        entry = (wait, -len(self.sketch), name)
+        if len(self._slowest) < self._top_k:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def report(self) -> Dict[str, Any]:
+        """Return a dictionary of these statistics.
+
+        It holds the number of customers who finished ('count'), their mean
+        wait ('mean'), the estimated 'p50', 'p95' and 'p99' waits, the
+        'histogram' as (lower bound, count) pairs, the 'slowest' customers as
+        (name, wait) pairs, slowest first, and for each type of line, how
+        many customers finished at it ('completed') and how many finished
+        per second between the first arrival and the last checkout
+        ('throughput').
+
+        >>> stats = WaitStatistics(top_k=2, buckets=[0, 5])
+        >>> stats.record(10, 0, 'Ann', 'RegularLine')
+        >>> stats.record(12, 10, 'Bob', 'ExpressLine')
+        >>> stats.record(20, 10, 'Cy', 'RegularLine')
+        >>> report = stats.report()
+        >>> report['slowest']
+        [('Ann', 10), ('Cy', 10)]
+        >>> report['histogram']
+        [(0, 1), (5, 2)]
+        >>> report['completed']
+        {'RegularLine': 2, 'ExpressLine': 1}
+        >>> report['throughput']['RegularLine']
+        0.1
+        """
+        count = len(self.sketch)
+        span = 0 if count == 0 else self._last_completion - self._first_arrival
+        report: Dict[str, Any] = {
+            'count': count,
+            'mean': self._total_wait / count if count else math.nan
+        }
+        for percentile in PERCENTILES:
+            report['p{}'.format(percentile)] = \
+                self.sketch.quantile(percentile / 100)
+        report['histogram'] = list(zip(self.histogram.bounds,
+                                       self.histogram.counts))
+        report['slowest'] = [(name, wait) for wait, _, name in
+                             sorted(self._slowest, reverse=True)]
+        report['completed'] = dict(self._completed)
+        report['throughput'] = {
+            line_type: completed / span if span > 0 else math.nan
+            for line_type, completed in self._completed.items()}
+        return report
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'bisect', 'heapq',
+                                   'math', 'python_ta', 'doctest']})
@@ -0,0 +1,184 @@
+"""Assignment 1 - Synthetic workloads
+
+=== CSC148 Fall 2019 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module generates synthetic event files from a parametric model of the
+customers arriving at a store, so that a store configuration can be tried
+against many different arrival streams instead of a single trace.
+
+The same model and seed always give the same events. Events are generated
+one at a time, so files of millions of customers can be written without
+holding them in memory.
+"""
+from __future__ import annotations
+from typing import Iterator, List, Tuple, Union
+import math
+import random
+
+# The names of the items in a synthetic customer's basket
+ITEM_NAMES = ('Apples', 'Bananas', 'Bread', 'Cheese', 'Eggs', 'Milk', 'Rice',
+              'Soup')
+
+# The distributions of the number of items in a basket
+GEOMETRIC = 'geometric'
+UNIFORM = 'uniform'
+FIXED = 'fixed'
+
+# The patterns of line closures
+RANDOM_CLOSURES = 'random'
+STAGGERED_CLOSURES = 'staggered'
+
+
+class WorkloadModel:
+    """A model of the customers arriving at a store, and of the lines that
+    close while they do.
+
+    Customers arrive as a Poisson process, so the times between arrivals are
+    exponentially distributed. The number of items in a basket follows the
+    basket distribution, and each item takes between 1 and max_item_time
+    seconds to check out, uniformly at random.
+
+    Lines close while customers are expected to be arriving, that is, before
+    num_customers / arrival_rate seconds. With RANDOM_CLOSURES, they close
+    at random times, and each closure is of a random line. With
+    STAGGERED_CLOSURES, they close at evenly spaced times, in order of line
+    number. Line 0 never closes.
+
+    === Attributes ===
+    num_customers: The number of customers that arrive.
+    arrival_rate: The mean number of customers that arrive each second.
+    mean_items: The mean number of items in a customer's basket.
+    max_item_time: The longest time an item takes to check out.
+    basket: The distribution of the number of items in a basket: GEOMETRIC,
+            UNIFORM (from 1 to 2 * mean_items - 1) or FIXED (always
+            mean_items).
+    num_closures: The number of line closures.
+    closures: The pattern of line closures: RANDOM_CLOSURES or
+              STAGGERED_CLOSURES.
+    num_lines: The number of lines in the store being closed.
+
+    === Representation Invariants ===
+    - num_customers >= 0
+    - arrival_rate > 0
+    - mean_items >= 1, and mean_items is an integer unless basket is
+      GEOMETRIC
+    - max_item_time >= 1
+    - num_closures >= 0, and num_lines >= 2 if num_closures > 0
+    """
+    num_customers: int
+    arrival_rate: float
+    mean_items: float
+    max_item_time: int
+    basket: str
+    num_closures: int
+    closures: str
+    num_lines: int
+
+    def __init__(self, num_customers: int, arrival_rate: float,
+                 mean_items: float = 5, max_item_time: int = 5,
+                 basket: str = GEOMETRIC, num_closures: int = 0,
+                 closures: str = RANDOM_CLOSURES, num_lines: int = 1) -> None:
+        """Initialize a model of <num_customers> customers arriving at
+        <arrival_rate> customers per second, with <mean_items> items in a
+        basket on average, drawn from the <basket> distribution, each taking
+        at most <max_item_time> seconds, while <num_closures> lines out of
+        <num_lines> close in the <closures> pattern.
+
+        >>> model = WorkloadModel(100, 0.5)
+        >>> model.mean_items
+        5
+        """
+        self.num_customers = num_customers
+        self.arrival_rate = arrival_rate
+        self.mean_items = mean_items
+        self.max_item_time = max_item_time
+        self.basket = basket
+        self.num_closures = num_closures
+        self.closures = closures
+        self.num_lines = num_lines
+
+    def lines(self, seed: Union[int, str]) -> Iterator[str]:
+        """Yield the lines of an event file for a stream of customers drawn
+        from this model with <seed>, in order of timestamp.
+
+        A line that closes at the same time as a customer arrives comes
+        before that customer's line. The customers do not depend on the
+        closures, so adding closures to a model leaves its customers as
+        they were.
+
+        >>> model = WorkloadModel(3, 1.0, mean_items=1, max_item_time=1)
+        >>> lines = list(model.lines(148))
+        >>> len(lines)
+        3
+        >>> lines[0].split()[:3]
+        ['0', 'Arrive', 'C0']
+        >>> lines == list(model.lines(148))
+        True
+        >>> model = WorkloadModel(4, 1.0, num_closures=2,
+        ...                       closures=STAGGERED_CLOSURES, num_lines=3)
+        >>> [line.split() for line in model.lines(148) if 'Close' in line]
+        [['1', 'Close', '1'], ['2', 'Close', '2']]
+        """
+        rng = random.Random(seed)
+        closures = self._closures(seed)
+        closures.reverse()
+        # log(1 - p) for a geometric distribution with mean self.mean_items
+        log_miss = math.log1p(-1 / self.mean_items) \
+            if self.mean_items > 1 else None
+        now = 0.0
+        for i in range(self.num_customers):
+            while closures and closures[-1][0] <= now:
+                yield '{} Close {}\n'.format(*closures.pop())
+            if self.basket == FIXED:
+                num_items = int(self.mean_items)
+            elif self.basket == UNIFORM:
+                num_items = rng.randint(1, 2 * int(self.mean_items) - 1)
+            else:
+                num_items = 1
+                if log_miss is not None:
+                    num_items += int(math.log(1.0 - rng.random()) / log_miss)
+            items = ' '.join(
+                '{} {}'.format(ITEM_NAMES[rng.randrange(len(ITEM_NAMES))],
+                               rng.randint(1, self.max_item_time))
+                for _ in range(num_items))
+            yield '{} Arrive C{} {}\n'.format(int(now), i, items)
+            now += rng.expovariate(self.arrival_rate)
+        while closures:
+            yield '{} Close {}\n'.format(*closures.pop())
+
+    def write(self, path: str, seed: Union[int, str]) -> int:
+        """Write the event file for the stream of customers drawn from this
+        model with <seed> to <path>, and return the number of lines in it.
+        """
+        count = 0
+        with open(path, 'w') as event_file:
+            for line in self.lines(seed):
+                event_file.write(line)
+                count += 1
+        return count
+
+    def _closures(self, seed: Union[int, str]) -> List[Tuple[int, int]]:
+        """Return the (timestamp, line number) of each line closure drawn
+        from this model with <seed>, in order of timestamp.
+        """
+        horizon = self.num_customers / self.arrival_rate
+        if self.closures == STAGGERED_CLOSURES:
+            return [(int(horizon * (i + 1) / (self.num_closures + 1)),
+                     1 + i % (self.num_lines - 1))
+                    for i in range(self.num_closures)]
+        rng = random.Random('{}:closures'.format(seed))
+        return sorted((int(rng.uniform(0, horizon)),
+                       rng.randrange(1, self.num_lines))
+                      for _ in range(self.num_closures))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-import-modules': ['__future__', 'typing', 'math', 'random',
+                                   'python_ta', 'doctest']})